@@ -0,0 +1,97 @@
+""" before/after timing of the Word Search and Phrase Search queries, without and with the covering indexes of
+    word_instance added by migrations.py: idx_word_book (word searches) and idx_book_sentence (phrase searches).
+    "before" leaves word_instance with the single column indexes MySQL creates for its foreign keys.
+    runs are interleaved, thus both are measured under the same conditions, and the best run of each is reported.
+    requires a configured server (see server.py).
+    run from the repo's root: python -m benchmarks.index_benchmark [runs] """
+import sys
+from functools import partial
+from database import migrations
+from benchmarks.server import open_db, load_test_books, best_time
+
+RUNS = 3  # default number of runs of each query within each state
+WORDS = ['the', 'house', 'said', 'animals']  # words searched, from common to rare
+PHRASES = ['of the', 'it was', 'in the house']  # phrases searched
+# indexes that keep the foreign keys of word_instance indexed once the covering indexes are dropped
+FOREIGN_KEY_INDEXES = {'bench_word': ('word_id',), 'bench_book': ('book_id',)}
+COVERING_INDEXES = ['idx_word_book', 'idx_book_sentence']
+
+
+def set_covering_indexes(db, present):
+    """adds the covering indexes (as their migrations do), or drops them, leaving the foreign keys indexed"""
+    indexes = migrations.get_indexes(db, 'word_instance')
+    if present:
+        migrations.add_word_instance_word_index(db)
+        migrations.add_word_instance_sentence_index(db)
+        drop = [name for name in FOREIGN_KEY_INDEXES if name in indexes]
+    else:
+        for name, columns in FOREIGN_KEY_INDEXES.items():
+            if name not in indexes:
+                db.cursor.execute(f"ALTER TABLE word_instance ADD INDEX {name} ({','.join(columns)})")
+        drop = [name for name in COVERING_INDEXES if name in indexes]
+    if drop:
+        db.cursor.execute(f"ALTER TABLE word_instance {', '.join('DROP INDEX ' + name for name in drop)}")
+    cursor = db.connection.cursor()  # ANALYZE isn't supported by the prepared statements protocol
+    cursor.execute("ANALYZE TABLE word_instance")
+    cursor.fetchall()
+    cursor.close()
+
+
+def get_queries(db):
+    """:returns name -> callable() of every query measured, each run past the result cache"""
+    def uncached(func):
+        def run():
+            db.result_cache.clear()
+            return func()
+        return run
+
+    queries = {}
+    for word in WORDS:
+        word_id = db.get_word_id(word)
+        if not word_id:
+            continue
+        # a positional filter (line_offset) makes the word search count word_instance rather than word_freq
+        filters = ['All Books', word_id[0], 'None', '', '', '0', '']
+        queries[f"word search '{word}'"] = uncached(lambda filters=filters: db.get_wrd_res_page(filters))
+        queries[f"word instances '{word}'"] = uncached(lambda filters=filters: db.get_wrd_instances_page(filters))
+        queries[f"word count '{word}'"] = uncached(lambda filters=filters: db.count_wrd_instances(filters))
+    for phrase_txt in PHRASES:
+        phrase_id = db.insert_phrase(phrase_txt)
+        words = phrase_txt.split()
+        word_ids = db.get_word_ids(words, insert_missing=True)
+        db.insert_phrase_words(phrase_id, [word_ids[word] for word in words])
+        _, phrase_words = db.get_phrase_words(phrase_txt)
+        # the SQL phrase search (used without the PhraseIndex), and the self join it falls back on
+        queries[f"phrase search '{phrase_txt}'"] = partial(run_query, db, db.get_phrase_appear_sql(phrase_id,
+                                                                                                  phrase_words))
+        queries[f"phrase join '{phrase_txt}'"] = partial(run_query, db, db.get_phrase_appear_join(phrase_id))
+    return queries
+
+
+def run_query(db, query):
+    """:returns the rows of a query, given with its params"""
+    db.cursor.execute(*query)
+    return db.cursor.fetchall()
+
+
+def main(runs=RUNS):
+    db = open_db()
+    print("books loaded: {}".format(load_test_books(db)))
+    queries = get_queries(db)
+    best = {(name, state): float('inf') for name in queries for state in ('before', 'after')}
+    for _ in range(runs):
+        for state in ('before', 'after'):
+            set_covering_indexes(db, state == 'after')
+            for name, query in queries.items():
+                seconds, _ = best_time(query, 1)
+                best[name, state] = min(best[name, state], seconds)
+    print(f"{'query':<40}{'before':>10}{'after':>10}{'speedup':>10}")
+    for name in queries:
+        before, after = best[name, 'before'], best[name, 'after']
+        print(f"{name:<40}{before:>9.4f}s{after:>9.4f}s{before / after:>9.2f}x")
+    set_covering_indexes(db, True)
+    db.close()
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else RUNS)
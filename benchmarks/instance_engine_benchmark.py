@@ -0,0 +1,45 @@
+""" benchmark of the engines word instances are inserted by (see database.INSTANCE_ENGINE): Database.insert_rows'
+    batched multi-row INSERTs against Database.load_rows' LOAD DATA LOCAL INFILE, over the instances of the test books.
+    runs are interleaved, thus both are measured under the same conditions, and the best run of each is reported.
+    requires a configured server (see server.py) with local_infile enabled, otherwise load_rows falls back on INSERTs.
+    run from the repo's root: python -m benchmarks.instance_engine_benchmark [runs] """
+import sys
+from database import database
+from benchmarks.server import open_db, load_test_books, best_time
+
+RUNS = 5  # default number of runs of each engine
+
+
+def clear_instances(db):
+    """deletes the rows of word_instance, ahead of inserting them again"""
+    db.cursor.execute("DELETE FROM word_instance")
+    db.connection.commit()
+
+
+def main(runs=RUNS):
+    database.INSTANCE_ENGINE = 'load_data'  # the connection is opened with local infile allowed, see Database
+    db = open_db()
+    print("books loaded: {}".format(load_test_books(db)))
+    db.cursor.execute("SHOW GLOBAL VARIABLES LIKE 'local_infile'")
+    row = db.cursor.fetchone()
+    if not row or str(row[1]).upper() != 'ON':
+        print("local_infile is disabled on the server, thus load_rows falls back on INSERT statements")
+    db.cursor.execute("SELECT * FROM word_instance ORDER BY book_id, word_serial")
+    rows = db.cursor.fetchall()
+    engines = {'insert_rows': db.insert_rows, 'load_rows': db.load_rows}
+    best = {name: float('inf') for name in engines}
+    for _ in range(runs):
+        for name, engine in engines.items():
+            clear_instances(db)
+            seconds, rows_cnt = best_time(lambda: engine('word_instance', rows), 1)
+            if rows_cnt != len(rows):
+                print("{} inserted {} of {} rows".format(name, rows_cnt, len(rows)))
+            best[name] = min(best[name], seconds)
+    for name in engines:
+        print(f"{name}: {best[name]:.3f}s, {len(rows) / best[name]:.0f} rows per second (best of {runs} runs)")
+    print(f"speedup of load_rows: {best['insert_rows'] / best['load_rows']:.2f}x")
+    db.close()
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else RUNS)
@@ -0,0 +1,77 @@
+""" benchmark of the SQL phrase search (see Database.get_phrase_appear_sql): the query seeded by the phrase's rarest
+    bigram (see word_bigram) against get_phrase_appear_join's query, which joins word_instance with itself, over
+    common phrases and phrases sampled from the test books. both queries are checked to find the same occurrences.
+    requires a configured server (see server.py).
+    run from the repo's root: python -m benchmarks.phrase_query_benchmark [runs] """
+import os, random, sys
+from benchmarks.server import BOOKS_DIR, open_db, load_test_books, best_time
+from utils import txt_parser
+
+RUNS = 3  # default number of runs of each query per phrase
+COMMON_PHRASES = ['of the', 'in the', 'it was', 'there is a', 'one of the']  # phrases of many occurrences
+SAMPLED_PHRASES = 10  # number of phrases sampled from the test books, of 2 to 4 words each
+SEED = 12  # seed of the sampled phrases
+
+
+def sample_phrases(count, rand):
+    """:returns phrases of consecutive words within a sentence of the test books, picked at random"""
+    words = []
+    for name in sorted(os.listdir(BOOKS_DIR)):
+        words.extend(txt_parser.read_words(os.path.join(BOOKS_DIR, name)))
+    phrases = []
+    while len(phrases) < count:
+        length = rand.randint(2, 4)
+        start = rand.randrange(len(words) - length)
+        phrase = words[start:start + length]
+        # the words of a phrase are consecutive (wrd_cnt) within a single sentence of a single book
+        if len({sent_cnt for _, _, sent_cnt, *_ in phrase}) == 1 and phrase[-1][1] - phrase[0][1] == length - 1:
+            phrases.append(' '.join(word for word, *_ in phrase))
+    return phrases
+
+
+def add_phrase(db, phrase_txt):
+    """inserts a phrase as phrase_tab does. :returns phrase_id, or None if the phrase was inserted already"""
+    phrase_id = db.insert_phrase(phrase_txt)
+    if not phrase_id:
+        return None
+    words = phrase_txt.split()
+    word_ids = db.get_word_ids(words, insert_missing=True)
+    db.insert_phrase_words(phrase_id, [word_ids[word] for word in words])
+    return phrase_id
+
+
+def run_query(db, query):
+    """:returns the rows of a query (see get_phrase_appear_sql), sorted"""
+    db.cursor.execute(*query)
+    return sorted(db.cursor.fetchall())
+
+
+def main(runs=RUNS):
+    db = open_db()
+    print("books loaded: {}".format(load_test_books(db)))
+    phrases = COMMON_PHRASES + sample_phrases(SAMPLED_PHRASES, random.Random(SEED))
+    totals = {'join': 0, 'bigram': 0}
+    for phrase_txt in phrases:
+        phrase_id = add_phrase(db, phrase_txt)
+        if not phrase_id:
+            continue
+        _, phrase_words = db.get_phrase_words(phrase_txt)
+        queries = {'join': db.get_phrase_appear_join(phrase_id),
+                   'bigram': db.get_phrase_appear_sql(phrase_id, phrase_words)}
+        times, results = {}, {}
+        for _ in range(runs):  # interleaved, thus both are measured under the same conditions
+            for name, query in queries.items():
+                seconds, results[name] = best_time(lambda: run_query(db, query), 1)
+                times[name] = min(times.get(name, seconds), seconds)
+        for name in totals:
+            totals[name] += times[name]
+        mismatch = '' if results['join'] == results['bigram'] else ' (occurrences differ)'
+        print(f"'{phrase_txt}': {len(results['join'])} occurrences, join {times['join']:.4f}s, "
+              f"bigram {times['bigram']:.4f}s{mismatch}")
+    print(f"total: join {totals['join']:.3f}s, bigram {totals['bigram']:.3f}s "
+          f"(best of {runs} runs per phrase), speedup {totals['join'] / totals['bigram']:.2f}x")
+    db.close()
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else RUNS)
@@ -0,0 +1,52 @@
+""" helpers of the benchmarks that run against a MySQL server. the server is configured by the environment variables
+    LIBRARY_DB_HOST, LIBRARY_DB_USER, LIBRARY_DB_PASSWORD and LIBRARY_DB_DATABASE (the fields of the login form).
+    the database is reset by the benchmarks, thus it should be a scratch database rather than the library's. """
+import os, sys, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'gui'))  # for msg_box
+from database.database import Database
+from utils import ingest, txt_parser
+
+BOOKS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'test input', 'books')
+CREDENTIAL_VARIABLES = {'host': 'LIBRARY_DB_HOST', 'user': 'LIBRARY_DB_USER', 'password': 'LIBRARY_DB_PASSWORD',
+                        'database': 'LIBRARY_DB_DATABASE'}
+
+
+def get_credentials():
+    """:returns the credentials of the server (see LoginForm.get_credentials), taken from the environment.
+        exits if any is missing."""
+    missing = [variable for variable in CREDENTIAL_VARIABLES.values() if variable not in os.environ]
+    if missing:
+        sys.exit("set {} to the credentials of a scratch database".format(', '.join(missing)))
+    return {key: os.environ[variable] for key, variable in CREDENTIAL_VARIABLES.items()}
+
+
+def open_db():
+    """:returns a Database connected to the configured server, whose tables are cleared"""
+    db = Database(get_credentials())
+    db.reset_db()
+    return db
+
+
+def load_test_books(db):
+    """inserts the Gutenberg books under 'test input/books' (other files are skipped).
+       :returns number of books inserted"""
+    books = 0
+    for name in sorted(os.listdir(BOOKS_DIR)):
+        book_details = txt_parser.read_book_details(os.path.join(BOOKS_DIR, name))
+        if not book_details:
+            continue
+        with db.transaction():
+            if ingest.add_book(db, book_details):
+                books += 1
+    return books
+
+
+def best_time(func, runs):
+    """:returns seconds of the fastest of runs calls of func(), and the result of the last call"""
+    best, result = float('inf'), None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
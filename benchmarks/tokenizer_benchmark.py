@@ -0,0 +1,75 @@
+""" micro-benchmark of the tokenizer engine (txt_parser.read_word_batches) against the per-line generator it replaced
+    (see tests/reference_tokenizer.py), over the test books.
+    runs are interleaved, thus both are measured under the same conditions, and the best run of each is reported.
+    run from the repo's root: python -m benchmarks.tokenizer_benchmark [runs] """
+import os, sys, time
+from array import array
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'gui'))  # for msg_box
+from utils import txt_parser
+from tests import reference_tokenizer
+
+BOOKS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'test input', 'books')
+RUNS = 25  # default number of runs of each tokenizer
+
+
+def consume_reference(paths):
+    """tokenizes every book by the replaced generator into the columns the ingest stores, as tokenize_book did before
+        the engine. :returns number of words read"""
+    count = 0
+    for path in paths:
+        vocab_index = {}
+        word_indices, sentences, lines, offsets, paragraphs = [array('i') for _ in range(5)]
+        for word, _, sent_cnt, line_cnt, line_offset, par_cnt in reference_tokenizer.read_words(path):
+            word_indices.append(vocab_index.setdefault(word, len(vocab_index)))
+            sentences.append(sent_cnt)
+            lines.append(line_cnt)
+            offsets.append(line_offset)
+            paragraphs.append(par_cnt)
+        count += len(word_indices)
+    return count
+
+
+def consume_batches(paths):
+    """tokenizes every book by the engine's batches into the same columns, as tokenize_book does (without hashing the
+        book's content). :returns number of words read"""
+    count = 0
+    for path in paths:
+        vocab_index = {}
+        word_indices, sentences, lines, offsets, paragraphs = [array('i') for _ in range(5)]
+        for words, _, batch_sentences, batch_lines, batch_offsets, batch_paragraphs in \
+                txt_parser.read_word_batches(path):
+            word_indices.extend([vocab_index.setdefault(word, len(vocab_index)) for word in words])
+            sentences.extend(batch_sentences)
+            lines.extend(batch_lines)
+            offsets.extend(batch_offsets)
+            paragraphs.extend(batch_paragraphs)
+        count += len(word_indices)
+    return count
+
+
+def measure(func, paths):
+    """:returns seconds it took func to read the books, number of words read"""
+    start = time.perf_counter()
+    count = func(paths)
+    return time.perf_counter() - start, count
+
+
+def main(runs=RUNS):
+    paths = [os.path.join(BOOKS_DIR, name) for name in sorted(os.listdir(BOOKS_DIR))]
+    tokenizers = {'reference generator': consume_reference, 'read_word_batches': consume_batches}
+    best = {name: float('inf') for name in tokenizers}
+    counts = {}
+    for _ in range(runs):
+        for name, func in tokenizers.items():
+            seconds, counts[name] = measure(func, paths)
+            best[name] = min(best[name], seconds)
+    if len(set(counts.values())) > 1:
+        print(f"word counts differ: {counts}")
+    for name in tokenizers:
+        print(f"{name}: {best[name]:.3f}s (best of {runs} runs, {counts[name]} words)")
+    print(f"speedup: {best['reference generator'] / best['read_word_batches']:.2f}x")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else RUNS)
@@ -1,33 +1,180 @@
-import functools
+import base64, bisect, os, re, sys, tempfile, threading
+from contextlib import contextmanager
+from functools import partial
 import mysql.connector
-from database.schema import TABLES, TABLE_QUERIES
+import mysql.connector.pooling
+from database.schema import TABLES, DERIVED_TABLES, META_TABLES, TABLE_QUERIES, PRIMARY_KEYS
+from database import migrations
+from database.word_dictionary import WordDictionary
+from database.phrase_index import PhraseIndex, SERIAL_BITS, SERIAL_MASK
+from database.result_cache import ResultCache, ANY_BOOK, PHRASE_INDEX, normalize_filters
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, streams yield rows as tuples without it (see fetch_batches)
+    np = None
+
+# engine used to insert word instances: 'insert' - batched multi-row INSERTs,
+# 'load_data' - bulk load through LOAD DATA LOCAL INFILE (requires local_infile to be enabled on the server)
+INSTANCE_ENGINE = 'insert'
+TSV_ESCAPE = re.compile(r'\\(.)')  # escape sequences of a LOAD DATA file and the characters they stand for:
+TSV_UNESCAPED = {'n': '\n', 't': '\t'}
+
+INSERT_ROWS_LIMIT = 5000  # max number of rows sent within a single multi-row INSERT
+INSERT_BYTES_LIMIT = pow(2, 20)  # approximate max size of a single INSERT's values. kept well below max_allowed_packet
+INT_PARAM_BYTES = 10  # approximate size of a numeric parameter sent through the binary protocol
+WORD_IDS_CHUNK = 1000  # number of words looked up by a single query of get_word_ids
+PAGE_SIZE = 200  # default number of rows of a single page of a paginated query (see get_page)
+ITER_PAGE_SIZE = 5000  # number of rows of every page fetched by the generators of paginated queries (see iter_pages)
+FETCH_BATCH = 10000  # number of rows fetched at a time by streaming reads (see Database.stream)
+OCCURRENCE_ROWS = 16  # phrase occurrences cached at the cost of a single row, see get_phrase_occurrences
+LINE_START_BYTES = 4  # size of a line's offset within book_layout, see txt_parser.LINE_START_TYPE
+# sort keys of paginated queries: (column, whether it's sorted in descending order)
+BOOK_ORDER = [('book_id', False)]
+WRD_RES_ORDER = [('cnt', True), ('word_txt', False)]
+WRD_INSTANCES_ORDER = [('word_instance.book_id', False), ('word_instance.word_serial', False)]
+GROUP_ORDER = [('group_id', False)]
+GROUP_WORDS_ORDER = [('word.word_id', False)]
+PHRASE_ORDER = [('phrase_id', False)]
+PHRASE_APPEAR_ORDER = [('title', False), ('book_id', False), ('word_serial', False)]
+# number of pooled connections, used by workers that access the DB concurrently (32 at most). sized above the peak
+# demand: a folder import (1 + ingest.LOAD_THREADS), a book's insertion (2), searches (query_worker.QUERY_THREADS)
+# and the PhraseIndex's build (1)
+POOL_SIZE = 16
+RECONNECT_ATTEMPTS = 3  # number of attempts to reconnect a dropped connection (see Database.ping)
+RECONNECT_DELAY = 1  # seconds between attempts to reconnect
+# max execution time (in milliseconds) of every SELECT of a class of queries run by gui/query_worker.py, 0 for no limit
+QUERY_TIMEOUTS = {'word_search': 20000, 'word_instances': 20000, 'phrase_search': 60000, 'count': 30000}
 
 
 class Database:
-    def __init__(self, credentials):
+    def __init__(self, credentials, connection=None, word_dictionary=None, phrase_index=None, result_cache=None):
+        """ :param connection: a connection checked out of the pool, used by worker_db.
+            if not given, a dedicated connection is opened and the schema is initialized.
+            :param word_dictionary, phrase_index, result_cache: WordDictionary, PhraseIndex and ResultCache shared
+             with the Database that created this one (see worker_db)."""
         self.credentials = credentials  # for OS commands in menu_actions (import/export using mysqldump/mysql)
-        self.connection = mysql.connector.connect(**credentials)
-        self.cursor = self.connection.cursor(prepared=True)  # to run parameterized queries
+        self.connection = connection or mysql.connector.connect(**credentials,
+                                                                allow_local_infile=INSTANCE_ENGINE == 'load_data')
+        self.cursor = None
+        self.open_cursor()
+        self.pool = None  # created on demand by get_pool, shared with worker Databases (see worker_db)
+        self.pool_slots = threading.BoundedSemaphore(POOL_SIZE)  # connections of the pool that aren't checked out
+        self.pool_lock = threading.Lock()  # guards the pool's creation, which may be requested by several threads
+        self.word_dictionary = word_dictionary or WordDictionary()
+        self.phrase_index = phrase_index or PhraseIndex()
+        self.result_cache = result_cache or ResultCache()
         self.update_on_new_book = []
         self.update_on_import = []
         self.update_stats = []
-        self.init_schema()
+        self.stream_columns = []  # names of the columns of the latest stream
+        if not connection:
+            self.init_schema()
+
+    def open_cursor(self):
+        """opens the cursor of the connection and configures its session"""
+        self.cursor = self.connection.cursor(prepared=True)  # to run parameterized queries
+        # each read sees the latest data committed by other connections (e.g. books inserted by worker threads),
+        # rather than the snapshot taken when the connection's current transaction began
+        self.cursor.execute("SET SESSION TRANSACTION ISOLATION LEVEL READ COMMITTED")
+
+    def ping(self):
+        """checks whether the connection is alive, and reconnects it if it was dropped, e.g. by the server's
+           wait_timeout while the app was idle, or by a restart of the server. the prepared cursor is bound to the
+           connection, thus it's opened anew once reconnected. an uncommitted transaction is lost along the way.
+           :returns whether the connection was reconnected"""
+        try:
+            self.connection.ping()
+            return False
+        except mysql.connector.Error as error:
+            print("lost connection to the database ({}), reconnecting".format(error))
+        self.connection.reconnect(attempts=RECONNECT_ATTEMPTS, delay=RECONNECT_DELAY)
+        self.open_cursor()
+        return True
+
+    def get_pool(self):
+        """:returns a pool of connections to the DB, which is created upon first use."""
+        with self.pool_lock:
+            if not self.pool:
+                self.pool = mysql.connector.pooling.MySQLConnectionPool(
+                    pool_name='library', pool_size=POOL_SIZE, allow_local_infile=INSTANCE_ENGINE == 'load_data',
+                    **self.credentials)
+        return self.pool
+
+    def worker_db(self):
+        """:returns a Database that operates over its own pooled connection, so it can be used concurrently
+            with this one (e.g. by a worker thread). it shares this one's pool, thus its own sessions are checked
+            out of the same pool. Should be closed once done to return the connection to the pool.
+            raises PoolError if every pooled connection is checked out, see session."""
+        worker_db = Database(self.credentials, self.get_pool().get_connection(), self.word_dictionary,
+                             self.phrase_index, self.result_cache)
+        worker_db.pool, worker_db.pool_slots, worker_db.pool_lock = self.pool, self.pool_slots, self.pool_lock
+        return worker_db
+
+    @contextmanager
+    def session(self):
+        """checks a connection out of the pool for a single operation, e.g. a search run on a worker thread,
+           and returns it to the pool once done, even if the operation failed. the pool checks the connection is
+           alive before handing it out, and reconnects it otherwise. the pool doesn't wait for a connection to be
+           returned, thus a session waits for a free connection beforehand.
+           :returns context manager of a worker Database (see worker_db)"""
+        with self.pool_slots:
+            worker_db = self.worker_db()
+            try:
+                yield worker_db
+            finally:
+                worker_db.close()
+
+    @contextmanager
+    def transaction(self):
+        """commits the statements run within the context at once, or rolls them back if an exception was raised.
+           statements within the context should pass commit=False, where they take it."""
+        try:
+            yield self
+        except BaseException:
+            self.connection.rollback()
+            raise
+        self.connection.commit()
+
+    def close(self):
+        """closes the cursor and the connection. a pooled connection is returned to its pool."""
+        self.cursor.close()
+        self.connection.close()
 
-    def init_schema(self):
-        """Creates Schema tables unless already created."""
+    def get_connection_id(self):
+        """:returns id of the connection within the server, by which its statements are killed (see kill_query)"""
+        self.cursor.execute("SELECT CONNECTION_ID()")
+        return self.cursor.fetchone()[0]
+
+    def kill_query(self, connection_id):
+        """stops the statement another connection is running, e.g. a search superseded by a newer one.
+           the connection itself is kept, and the killed statement raises an error within its thread."""
+        self.cursor.execute(f"KILL QUERY {int(connection_id)}")
+
+    def set_max_execution_time(self, milliseconds):
+        """limits the execution time of every SELECT of this connection, see QUERY_TIMEOUTS. 0 removes the limit."""
+        self.cursor.execute(f"SET SESSION MAX_EXECUTION_TIME = {int(milliseconds)}")
+
+    def init_schema(self, rerun_migrations=False):
+        """Creates Schema tables unless already created, applies the migrations the DB hasn't applied yet,
+           and derives the derived tables of books that have none. :param rerun_migrations: see migrations.migrate"""
         for query in TABLE_QUERIES:
             self.cursor.execute(query)
         self.connection.commit()
+        migrations.migrate(self, rerun_migrations)
+        self.insert_missing_derived()
 
     def reset_db(self, clear_widgets=False):
         """Clears DB's records by dropping the tables and creating them from the schema.
             this process replaces 'delete' operation slow performance due to record logging. """
 
         # tables are cleared in reversed order due to dependent foreign keys
-        for table in list(reversed(TABLES)):
+        # schema_version is dropped as well, thus the migrations are applied again to the recreated tables
+        for table in DERIVED_TABLES + list(reversed(TABLES)) + META_TABLES:
             self.cursor.execute(f"""DROP TABLE {table} """)
         self.connection.commit()
-        self.clear_cache()
+        self.word_dictionary.invalidate()
+        self.phrase_index.invalidate()
+        self.result_cache.clear()
         self.init_schema()
         if clear_widgets:  # activating import functions from other tabs will clear widgets, since input is now None
             self.notify_import()  # piggybacking on import's functions to clear widgets
@@ -45,11 +192,13 @@ class Database:
     def notify_new_book(self):
         """notifies tabs that an import has occurred, by calling functions that have tuned_in
         called solely by "insert_book" of books_tab"""
+        self.result_cache.invalidate_book()  # results that cover every book are missing the new one
         for update_func in self.update_on_new_book:
             update_func()
 
     def notify_import(self):
         """notifies all (tuned_in) tabs that an import has occurred, by calling their tuned_in functions """
+        self.result_cache.clear()  # an import may change any table
         for update_func in self.update_on_import:
             update_func()
 
@@ -59,9 +208,11 @@ class Database:
         for update_func in self.update_stats:
             update_func()
 
-    def insert_book(self, args):
+    def insert_book(self, args, commit=True):
         """inserts new book to db. if fails (mostly due to duplicate val) returns False,
-            otherwise returns last ID of added book. """
+            otherwise returns last ID of added book.
+            :param commit: False leaves the book within the current transaction, e.g. to be committed alongside
+             its word instances (see ingest_worker)."""
         try:
             if len(args) == 6:  # used when importing existing database.
                 self.cursor.execute("INSERT INTO book (book_id,title,author,date,size,path) VALUES "
@@ -69,7 +220,8 @@ class Database:
             else:
                 self.cursor.execute("INSERT INTO book (title,author,date,size,path) VALUES "
                                     "(%s,%s,%s,%s,%s)", args)
-            self.connection.commit()
+            if commit:
+                self.connection.commit()
         except mysql.connector.Error:  # duplicate entry
             return False
         self.cursor.execute("SELECT LAST_INSERT_ID()")
@@ -77,39 +229,31 @@ class Database:
 
     def query_book_table(self, title, author):
         """:returns all columns of table book, filtered by user choice of author and title."""
-        query = "select * from book where (%s = 'ALL' or title = %s) and (%s = 'ALL' or author = %s)"
-        args = (title, title, author, author)
-        self.cursor.execute(query, args)
-        while True:
-            row = self.cursor.fetchone()
-            if not row:
-                break
-            yield row
+        return iter_pages(partial(self.query_book_table_page, title, author))
+
+    def query_book_table_page(self, title, author, after=None, page_size=PAGE_SIZE):
+        """a page of query_book_table's rows, ordered by book_id. :returns see get_page"""
+        return self.get_page("""select * from book where (%s = 'ALL' or title = %s) and (%s = 'ALL' or author = %s)
+                                and {keyset}""", (title, title, author, author), BOOK_ORDER, after, page_size,
+                             lambda row: row[:1])
 
     def get_book_titles_authors(self):
         """returns all titles and authors in DB. """
-        self.cursor.execute("SELECT title,author FROM book")
-        while True:
-            title = self.cursor.fetchone()
-            if not title:
-                break
-            yield title
+        return (row[:2] for row in iter_pages(self.get_book_titles_authors_page))
+
+    def get_book_titles_authors_page(self, after=None, page_size=PAGE_SIZE):
+        """a page of (title, author, book_id) of the books in DB, ordered by book_id. :returns see get_page"""
+        return self.get_page("SELECT title, author, book_id FROM book WHERE {keyset}", (), BOOK_ORDER, after,
+                             page_size)
 
     def get_book_authors(self, title):
         """returns all authors that matches provided title in DB. """
-        self.cursor.execute("SELECT author FROM book where (%s = 'ALL' or title = %s)", (title, title))
-        while True:
-            title = self.cursor.fetchone()
-            if not title:
-                break
-            yield title
-
-    def get_book_path(self, title, author):
-        """:returns file location of a book."""
-        self.cursor.execute("""select path 
-                               from book
-                               where title = %s and author = %s """, (title, author))
-        return self.cursor.fetchone()[0]
+        return (row[:1] for row in iter_pages(partial(self.get_book_authors_page, title)))
+
+    def get_book_authors_page(self, title, after=None, page_size=PAGE_SIZE):
+        """a page of (author, book_id) of the books of the given title, ordered by book_id. :returns see get_page"""
+        return self.get_page("SELECT author, book_id FROM book where (%s = 'ALL' or title = %s) and {keyset}",
+                             (title, title), BOOK_ORDER, after, page_size)
 
     def get_book_id(self, title, author):
         """:returns the id of a book using uniquely identifying attributes: title, author.
@@ -124,152 +268,489 @@ class Database:
         return self.cursor.fetchone()[0]
 
     def del_book(self, title, author):
-        """removes selected book including all rows related to said book within foreign tables """
+        """removes selected book including all rows related to said book within foreign tables,
+           and the words that no longer serve a role in the database (see sweep_words)"""
         book_id = self.get_book_id(title, author)[0]
+        self.del_book_rows(book_id, commit=False)
+        self.sweep_words()
+
+    def del_book_rows(self, book_id, commit=True):
+        """removes a book alongside with every row related to it through on delete cascade, but leaves its words,
+            e.g. when a book is replaced within a transaction (see ingest.add_book). the references of the book
+            to its words are dropped, thus words unique to the book are removed by sweep_words afterwards."""
+        self.del_word_refs("SELECT word_id, 1 AS cnt FROM word_book_freq WHERE book_id = %s", (book_id,))
+        self.del_book_freq(book_id)
+        self.cursor.execute("DELETE FROM book WHERE book_id = %s", (book_id,))
+        if commit:
+            self.connection.commit()
+        self.result_cache.invalidate_book(book_id)
+
+    def add_word_refs(self, refs_query, params=()):
+        """adds references to words to word_ref, e.g. of a book to each of its words once it's inserted.
+           rows are updated in the order of word_id, thus books loaded concurrently don't deadlock.
+           :param refs_query: SELECT of the references added per word, whose columns are named word_id and cnt"""
+        self.cursor.execute(f"""INSERT INTO word_ref (word_id, refcnt)
+                                SELECT word_id, cnt FROM ({refs_query}) AS refs
+                                ORDER BY word_id
+                                ON DUPLICATE KEY UPDATE refcnt = word_ref.refcnt + VALUES(refcnt)""", params)
+
+    def del_word_refs(self, refs_query, params=()):
+        """drops references to words from word_ref, ahead of removing the rows that reference them.
+           words left without references are removed by sweep_words. :param refs_query: see add_word_refs"""
+        self.cursor.execute(f"""UPDATE word_ref INNER JOIN ({refs_query}) AS refs on refs.word_id = word_ref.word_id
+                                SET refcnt = refcnt - refs.cnt""", params)
+
+    def sweep_words(self, commit=True):
+        """removes every word that's no longer referenced by a book, group or phrase (see word_ref), by set-based
+           deletes rather than probing each word. words that were just inserted have no references yet, thus they're
+           kept. a word's references are checked again as it's deleted, thus a word a concurrent ingest has referenced
+           in the meantime (e.g. a word it resolved through the dictionary) is kept as well.
+           :returns ids of the words removed"""
+        self.cursor.execute("SELECT word_id FROM word_ref WHERE refcnt <= 0")
+        candidates = [row[0] for row in self.cursor.fetchall()]
+        word_ids = []
+        for i in range(0, len(candidates), INSERT_ROWS_LIMIT):
+            batch = candidates[i:i + INSERT_ROWS_LIMIT]
+            placeholders = ','.join(['%s'] * len(batch))
+            self.cursor.execute(f"""DELETE word FROM word INNER JOIN word_ref on word_ref.word_id = word.word_id
+                                    WHERE word.word_id in ({placeholders}) and word_ref.refcnt <= 0""", batch)
+            self.cursor.execute(f"SELECT word_id FROM word WHERE word_id in ({placeholders})", batch)
+            kept = {row[0] for row in self.cursor.fetchall()}
+            word_ids.extend(word_id for word_id in batch if word_id not in kept)
+        if commit:
+            self.connection.commit()
+        self.word_dictionary.forget(word_ids)
+        return word_ids
+
+    def recount_word_refs(self):
+        """counts the references to every word anew: the books that contain it (see word_freq), the groups it belongs
+           to and its positions within phrases, then sweeps the words without any. called once word_ref can't be
+           trusted, e.g. once tables were imported, or words were left behind by an ingest that was interrupted."""
+        self.cursor.execute("DELETE FROM word_ref")
+        self.cursor.execute("""INSERT INTO word_ref (word_id, refcnt)
+                                SELECT word.word_id, COALESCE(word_freq.book_cnt, 0)
+                                    + (SELECT count(*) FROM word_in_group WHERE word_in_group.word_id = word.word_id)
+                                    + (SELECT count(*) FROM word_in_phrase WHERE word_in_phrase.word_id = word.word_id)
+                                FROM word left join word_freq on word_freq.word_id = word.word_id""")
+        self.sweep_words()
+
+    def insert_book_source(self, book_id, path, content_hash, file_size, mtime, commit=True):
+        """records the file a book was read from: its path, hash of its content, size and modification time."""
+        self.cursor.execute("INSERT INTO book_source (book_id,path,content_hash,file_size,mtime) VALUES "
+                            "(%s,%s,%s,%s,%s)", (book_id, path, content_hash, file_size, mtime))
+        if commit:
+            self.connection.commit()
+
+    def insert_book_bigrams(self, book_id, commit=True):
+        """derives the bigrams of a book from its word instances: every pair of consecutive words within a sentence,
+           keyed by their word_ids, thus a phrase search is seeded by an indexed lookup (see get_phrase_appear_sql)."""
+        self.cursor.execute("""INSERT INTO word_bigram (w1, w2, book_id, word_serial)
+                                SELECT wi1.word_id, wi2.word_id, wi1.book_id, wi1.word_serial
+                                FROM word_instance as wi1
+                                INNER JOIN word_instance as wi2 on wi2.book_id = wi1.book_id
+                                      and wi2.word_serial = wi1.word_serial + 1
+                                      and wi2.sentence_serial = wi1.sentence_serial
+                                WHERE wi1.book_id = %s""", (book_id,))
+        if commit:
+            self.connection.commit()
 
-        # delete all words unique to given book
-        self.cursor.execute("""DELETE 
-                                FROM word 
-                                WHERE word_id in (SELECT DISTINCT word_id
-                                                    FROM word_instance
-                                                    WHERE word_id in (SELECT word_id 
-                                                                      FROM word_instance
-                                                                      WHERE book_id = %s)
-                                                    GROUP BY word_id
-                                                    HAVING COUNT(DISTINCT book_id) = 1)""", (book_id,))
-
-        # remove book alongside with every word_instance by utilizing on delete cascade within the schema
-        self.cursor.execute("""DELETE FROM book
-                             WHERE book_id = %s  """, (book_id,))
+    def insert_book_freq(self, book_id, commit=True):
+        """counts the instances of every word of a book into word_book_freq, and adds them to the counts of the words
+           within all books (word_freq), thus word frequencies are looked up rather than counted over word_instance.
+           rows of word_freq are updated in the order of word_id, thus books loaded concurrently don't deadlock."""
+        self.cursor.execute("""INSERT INTO word_book_freq (word_id, book_id, cnt)
+                                SELECT word_id, book_id, count(*)
+                                FROM word_instance
+                                WHERE book_id = %s
+                                GROUP BY word_id""", (book_id,))
+        self.cursor.execute("""INSERT INTO word_freq (word_id, cnt, book_cnt)
+                                SELECT word_id, cnt, 1
+                                FROM word_book_freq
+                                WHERE book_id = %s
+                                ORDER BY word_id
+                                ON DUPLICATE KEY UPDATE cnt = word_freq.cnt + VALUES(cnt),
+                                                        book_cnt = word_freq.book_cnt + 1""", (book_id,))
+        if commit:
+            self.connection.commit()
+
+    def del_book_freq(self, book_id):
+        """subtracts the counts of a book's words from word_freq, ahead of the book's removal.
+           the book's rows of word_book_freq are then removed alongside the book by on delete cascade."""
+        self.cursor.execute("""UPDATE word_freq
+                                INNER JOIN word_book_freq on word_book_freq.word_id = word_freq.word_id
+                                SET word_freq.cnt = word_freq.cnt - word_book_freq.cnt,
+                                    word_freq.book_cnt = word_freq.book_cnt - 1
+                                WHERE word_book_freq.book_id = %s""", (book_id,))
+        self.cursor.execute("DELETE FROM word_freq WHERE cnt = 0")
+
+    def insert_book_stats(self, book_id, commit=True):
+        """sums up a book's paragraphs, lines, sentences, words and characters into book_stats, thus the statistics
+           of all books are summed per book (see get_stats) rather than per word instance."""
+        self.cursor.execute("""INSERT INTO book_stats (book_id, par_cnt, line_cnt, sent_cnt, word_cnt, char_cnt)
+                                SELECT %s, COALESCE(max(paragraph_serial), 0), COALESCE(max(line_serial), 0),
+                                       COALESCE(max(sentence_serial), 0), count(*),
+                                       COALESCE(sum(char_length(word_txt)), 0)
+                                FROM word_instance inner join word on word.word_id = word_instance.word_id
+                                WHERE book_id = %s""", (book_id, book_id))
+        if commit:
+            self.connection.commit()
+
+    def insert_book_layout(self, book_id, line_starts, commit=True):
+        """keeps the byte offset at which every line of a book's file starts (see txt_parser.get_line_starts),
+           thus a preview seeks to its lines directly (see get_line_start)."""
+        if sys.byteorder == 'big':  # offsets are kept little endian, regardless of the machine that kept them
+            line_starts = line_starts[:]
+            line_starts.byteswap()
+        self.cursor.execute("REPLACE INTO book_layout (book_id, line_starts) VALUES (%s, %s)",
+                            (book_id, line_starts.tobytes()))
+        if commit:
+            self.connection.commit()
+
+    def get_line_start(self, book_id, line):
+        """:returns path of a book's file, the byte offset at which a line (zero based) of the file starts and
+            whether the book's layout is kept (see insert_book_layout). only the offset itself is fetched, rather than
+            the layout. the offset is None if the layout isn't kept or if the file has fewer lines."""
+        self.cursor.execute("""SELECT path, line_starts is not null, SUBSTRING(line_starts, %s, %s)
+                               FROM book left join book_layout on book_layout.book_id = book.book_id
+                               WHERE book.book_id = %s""", (line * LINE_START_BYTES + 1, LINE_START_BYTES, book_id))
+        path, has_layout, offset = self.cursor.fetchone()
+        offset = int.from_bytes(offset, 'little') if offset and len(offset) == LINE_START_BYTES else None
+        return path, offset, bool(has_layout)
+
+    def insert_mult_book_chunk(self, chunks, commit=True):
+        """Inserts chunks of books' text, given as an iterable of (book_id, chunk_no, first_line, content) rows,
+           in batches. see txt_parser.get_chunks"""
+        return self.insert_rows('book_chunk', chunks, commit)
+
+    def get_book_chunks(self, book_id, start=0, end=None):
+        """:returns (number of first line, compressed text) of the chunks of a book's text that hold its lines
+            from start up to end (zero based, end excluded, None - up to the last line), in order. a preview's lines
+            are usually held by a single chunk. empty if the book's text isn't kept."""
+        self.cursor.execute("""SELECT first_line, content FROM book_chunk
+                               WHERE book_id = %s and (%s is null or first_line < %s) and
+                                     chunk_no >= (SELECT COALESCE(max(chunk_no), 0) FROM book_chunk
+                                                  WHERE book_id = %s and first_line <= %s)
+                               ORDER BY chunk_no""", (book_id, end, end, book_id, start))
+        return self.cursor.fetchall()
+
+    def insert_book_derived(self, book_id, commit=True):
+        """derives the derived tables (see DERIVED_TABLES) of a book from its word instances, and adds its references
+           to its words (see word_ref)"""
+        self.insert_book_bigrams(book_id, commit=False)
+        self.insert_book_freq(book_id, commit=False)
+        self.add_word_refs("SELECT word_id, 1 AS cnt FROM word_book_freq WHERE book_id = %s", (book_id,))
+        self.insert_book_stats(book_id, commit=commit)
+
+    def insert_missing_derived(self):
+        """derives the derived tables of books that have none, e.g. books imported (derived tables aren't exported),
+           or books inserted before the tables were kept. a book is derived once it has a row of book_stats, which
+           every book has exactly one of (unlike bigrams or word frequencies, which a book may have none of). rows
+           a book has of the other tables are derived anew alongside. word_ref is recounted as a whole once books'
+           words were derived anew, or some words have no references recorded (see recount_word_refs)."""
+        self.cursor.execute("""SELECT book_id FROM book
+                               WHERE not exists (SELECT * FROM book_stats WHERE book_stats.book_id = book.book_id)""")
+        book_ids = [row[0] for row in self.cursor.fetchall()]
+        for book_id in book_ids:
+            self.cursor.execute("DELETE FROM word_bigram WHERE book_id = %s", (book_id,))
+            self.del_book_freq(book_id)
+            self.cursor.execute("DELETE FROM word_book_freq WHERE book_id = %s", (book_id,))
+            self.insert_book_bigrams(book_id, commit=False)
+            self.insert_book_freq(book_id, commit=False)
+            self.insert_book_stats(book_id)
+        self.cursor.execute("""SELECT exists (SELECT * FROM word
+                                              WHERE not exists (SELECT * FROM word_ref
+                                                                WHERE word_ref.word_id = word.word_id))""")
+        if self.cursor.fetchone()[0] or book_ids:
+            self.recount_word_refs()
+
+    def update_book_source(self, book_id, file_size, mtime):
+        """updates the size and modification time of a book's file whose content didn't change."""
+        self.cursor.execute("UPDATE book_source SET file_size = %s, mtime = %s WHERE book_id = %s",
+                            (file_size, mtime, book_id))
         self.connection.commit()
-        self.clear_cache()
 
-    @functools.lru_cache(maxsize=pow(2, 13))
-    def get_word_id(self, word):
-        """:returns word_id of given word in the DB.
-            Using a built-in cache to expedite retrieval of word_ids."""
+    def get_book_source(self, path):
+        """:returns book_id, file_size, mtime of the latest book read from path, or None"""
+        self.cursor.execute("""SELECT book_id, file_size, mtime
+                               FROM book_source 
+                               WHERE path = %s
+                               ORDER BY book_id DESC LIMIT 1""", (path,))
+        return self.cursor.fetchone()
 
+    def get_book_hashes(self, file_size):
+        """:returns book_id, content_hash of every book whose file is of the given size"""
+        self.cursor.execute("SELECT book_id, content_hash FROM book_source WHERE file_size = %s", (file_size,))
+        return self.cursor.fetchall()
+
+    def get_word_id(self, word):
+        """:returns word_id of given word in the DB (as a single value tuple), or None.
+            resolved through the word dictionary, thus only words missing from it require a query,
+            e.g. words matched by the column's collation rather than by their exact text."""
+        word_id = self.word_dictionary.get_id(self.connection, word)
+        if word_id is not None:
+            return word_id,
         self.cursor.execute("SELECT word_id FROM word WHERE word_txt = %s", (word,))
         return self.cursor.fetchone()
 
-    def clear_cache(self):
-        self.get_word_id.cache_clear()
-
-    def insert_word(self, word, word_id=None):
-        """ used in tabs: group and phrase to insert words foreign to the DB"""
-        try:
-            if word_id:
-                self.cursor.execute("INSERT INTO word (word_id,word_txt) VALUE (%s,%s)", (word_id, word))
+    def get_word_ids(self, words, insert_missing=False):
+        """Resolves many words at once. words known to the word dictionary require no query, the rest are looked up
+           WORD_IDS_CHUNK words per query, rather than a query per word.
+           :param insert_missing: inserts the words foreign to the DB beforehand, and commits them all at once.
+           :returns a dictionary of word_txt -> word_id of the words found (or inserted)"""
+        word_ids, foreign_words = {}, []
+        for word in set(words):
+            word_id = self.word_dictionary.get_id(self.connection, word)
+            if word_id is None:
+                foreign_words.append(word)
             else:
-                self.cursor.execute("INSERT INTO word (word_txt) VALUE (%s)", (word,))
+                word_ids[word] = word_id
+        if not foreign_words:
+            return word_ids
+
+        found_ids = {}
+        for i in range(0, len(foreign_words), WORD_IDS_CHUNK):
+            chunk = foreign_words[i:i + WORD_IDS_CHUNK]
+            if insert_missing:
+                self.cursor.execute(f"INSERT IGNORE INTO word (word_txt) VALUES {','.join(['(%s)'] * len(chunk))}",
+                                    chunk)
+            self.cursor.execute(f"SELECT word_txt, word_id FROM word "
+                                f"WHERE word_txt in ({','.join(['%s'] * len(chunk))})", chunk)
+            found_ids.update(self.cursor.fetchall())
+        if insert_missing:
             self.connection.commit()
-            self.cursor.execute("SELECT LAST_INSERT_ID()")
-        except mysql.connector.Error as error:
-            """ show error massage to user"""
-            print("parameterized query failed {}".format(error))
-            return False
-        return self.cursor.fetchone()  # returns id of inserted word.
-
-    def insert_mult_word_instance(self, instances):
-        """Inserts a list of words' occurrences in the same commit instruction to improve performance """
-        values = ', '.join(map(str, instances))
-        self.cursor.execute(f"INSERT INTO word_instance VALUES {values}")
-        self.connection.commit()
-
-    def insert_mult_word(self, words, importing=False):
-        """Inserts a list of words in the same commit instruction to improve performance """
-        if importing:
-            word_list = ', '.join(map(str, words))
-            # INSERT IGNORE would be redundant since before initiating import, DB is cleared.
-            self.cursor.execute(f"INSERT INTO word VALUES {word_list}")
-        else:
-            word_list = ', '.join(words)
-            self.cursor.execute(f"INSERT IGNORE INTO word (word_txt) VALUES {word_list}")
-        self.connection.commit()
+        self.word_dictionary.add(found_ids)
+        word_ids.update(found_ids)
+
+        # words matched by the column's collation rather than by exact text are resolved individually
+        for word in foreign_words:
+            if word not in word_ids:
+                word_id = self.get_word_id(word)
+                if word_id:
+                    word_ids[word] = word_id[0]
+        return word_ids
+
+    def insert_rows(self, table, rows, commit=True):
+        """Streams rows into table using parameterized multi-row INSERT statements.
+           rows may be any iterable (e.g. a generator). they're flushed in batches bounded by both
+           number of rows and size in bytes, so memory and packet size remain flat regardless of input size.
+           :param commit: False leaves the rows within the current transaction.
+           :returns number of rows inserted"""
+        row_placeholders = None
+        params, batch_rows, batch_bytes, rows_cnt = [], 0, 0, 0
+        for row in rows:
+            if not row_placeholders:
+                row_placeholders = '(' + ','.join(['%s'] * len(row)) + ')'
+            params.extend(row)
+            batch_rows += 1
+            batch_bytes += sum(len(val) if isinstance(val, (str, bytes)) else INT_PARAM_BYTES for val in row)
+            if batch_rows >= INSERT_ROWS_LIMIT or batch_bytes >= INSERT_BYTES_LIMIT:
+                # consecutive full batches share the same statement, which is therefore prepared only once
+                self.cursor.execute(f"INSERT INTO {table} VALUES {','.join([row_placeholders] * batch_rows)}", params)
+                rows_cnt += batch_rows
+                params, batch_rows, batch_bytes = [], 0, 0
+        if batch_rows:
+            self.cursor.execute(f"INSERT INTO {table} VALUES {','.join([row_placeholders] * batch_rows)}", params)
+            rows_cnt += batch_rows
+        if commit:
+            self.connection.commit()
+        return rows_cnt
+
+    def load_rows(self, table, rows, commit=True):
+        """Bulk loads rows into table by writing them to a temporary TSV file, which is then read by the server
+           using LOAD DATA LOCAL INFILE. Falls back to batched INSERTs if the server disallows local infile.
+           :param commit: False leaves the rows within the current transaction.
+           :returns number of rows loaded"""
+        with tempfile.NamedTemporaryFile('w', suffix='.tsv', delete=False, encoding='utf-8', newline='') as file:
+            for row in rows:
+                file.write('\t'.join(tsv_field(val) for val in row) + '\n')
+        try:
+            cursor = self.connection.cursor()  # LOAD DATA isn't supported by the prepared statements protocol
+            try:
+                cursor.execute(f"""LOAD DATA LOCAL INFILE %s INTO TABLE {table} CHARACTER SET utf8mb4
+                                   FIELDS TERMINATED BY '\\t' LINES TERMINATED BY '\\n'""", (file.name,))
+                rows_cnt = cursor.rowcount
+                if commit:
+                    self.connection.commit()
+            except mysql.connector.Error as error:
+                # a failed statement is rolled back on its own, rows inserted before it within the transaction remain
+                print("LOAD DATA failed, falling back to INSERT statements {}".format(error))
+                with open(file.name, 'r', encoding='utf-8', newline='') as tsv:
+                    rows_cnt = self.insert_rows(table, read_tsv(tsv), commit)
+            finally:
+                cursor.close()
+        finally:
+            os.remove(file.name)
+        return rows_cnt
+
+    def insert_mult_word_instance(self, instances, commit=True):
+        """Inserts words' occurrences, given as an iterable of rows, in batches to improve performance.
+           Rows are either INSERTed or bulk loaded, in accordance with INSTANCE_ENGINE.
+           :returns number of instances inserted"""
+        if INSTANCE_ENGINE == 'load_data':
+            return self.load_rows('word_instance', instances, commit)
+        return self.insert_rows('word_instance', instances, commit)
+
+    def insert_mult_word(self, words):
+        """Inserts words, given as an iterable of (word_id, word_txt) rows, in batches to improve performance.
+           Used when importing, hence INSERT IGNORE is redundant since DB is cleared beforehand."""
+        return self.insert_rows('word', words)
+
+    def insert_mult_word_in_phrase(self, words_in_phrase):
+        """Inserts the words of phrases, given as an iterable of (word_id, phrase_id, offset) rows, in batches.
+           Used when importing, hence the words' references are recounted afterwards (see recount_word_refs)."""
+        return self.insert_rows('word_in_phrase', words_in_phrase)
+
+    def insert_mult_word_in_group(self, words_in_group):
+        """Inserts words into groups, given as an iterable of (word_id, group_id) rows, in batches."""
+        return self.insert_rows('word_in_group', words_in_group)
 
     def get_wrd_res(self, filters):
         """:returns a generator of words in accordance to user's chosen filters.
             called by words_tab, after user pressed "Search" button."""
+        return iter_pages(partial(self.get_wrd_res_page, filters))
+
+    def get_wrd_res_page(self, filters, after=None, page_size=PAGE_SIZE):
+        """a page of get_wrd_res's words, ordered by their number of instances (descending), then by word_txt.
+           words are grouped anew for every page, though only the page's rows are transferred.
+           :returns see get_page"""
+        if not filters:  # e.g. user typed more than a single word (see WordsTab.get_filters)
+            return [], None
+
+        def fetch_page():
+            query = self.build_wrd_res_query(list(filters))
+            if not query:
+                return [], None
+            return self.get_page(query[0] + " HAVING {keyset}", query[1], WRD_RES_ORDER, after, page_size,
+                                 lambda row: (row[1], row[0]))
+
+        return self.result_cache.get(('wrd_res', normalize_filters(filters), after, page_size), fetch_page,
+                                     partial(self.get_filters_dependencies, filters), lambda page: len(page[0]))
+
+    def get_filters_dependencies(self, filters, by_group=True):
+        """:returns dependencies (see ResultCache) of the results of a word search by filters.
+           :param by_group: see result_cache.normalize_filters"""
+        dependencies = [ANY_BOOK if filters[0] == 'All Books' else ('book', filters[0])]
+        if by_group and filters[2] != 'None':
+            dependencies.append(('group', self.get_group_id(filters[2])))
+        return dependencies
+
+    def build_wrd_res_query(self, filters):
+        """builds get_wrd_res's query, without its order, to which a HAVING clause may be appended.
+           :returns the query and its params, or None if no word can match the filters"""
         if not filters:
-            return
+            return None
+        if not any(filters[3:]):  # no positional filter, thus the words' counts are looked up rather than counted
+            return self.build_wrd_freq_query(filters)
 
         query = """SELECT word_txt, count(word_instance.word_serial) as cnt
                    FROM word,word_instance """
-        words_to_search, where_in = (), 'word_txt'
 
         if filters[2] != "None":  # user searches for words within selected group
-            words_to_search = []
-            for word_in_group in self.get_group_words(filters[2]):
-                words_to_search.append(word_in_group[0])
-            if words_to_search:  # if group isn't empty
-                where_in = ','.join(['%s'] * len(words_to_search))
-                query += ",word_in_group"
-                filters[1] = ''  # if user chose to search a group, disregard input of word
-            else:
-                return  # if group is empty, so will the result set that will be displayed to user.
+            # the group's words are joined by group_id, rather than listing their texts within the query
+            query += ",word_in_group"
+            filters[1] = ''  # if user chose to search a group, disregard input of word
 
         if filters[1] is None and filters[2] == 'None':  # if user chose no group and chose a non-existing word
-            return
+            return None
 
         query += " WHERE word.word_id = word_instance.word_id "
         query, params = self.build_query_filter(query, filters)
 
         if filters[2] != 'None':
-            query += f""" and (word.word_id = word_in_group.word_id)
-                          and (word_txt in ({where_in})) """
-            params += tuple(words_to_search)
-
-        query += """ GROUP by word_txt 
-                    ORDER BY cnt DESC"""
-        self.cursor.execute(query, params)
-
-        while True:
-            row = self.cursor.fetchone()
-            if not row:
-                break
-            yield row
-
-    def remove_word_if_redundant(self, word_id):
-        """removes given word if it doesn't server a role in the database """
-        # checks whether word has another role in the database
-        self.cursor.execute("""select word_id  
-                                from word_in_group                              
-                                where word_id = %s
-                                UNION 
-                                select word_id  
-                                from word_instance                              
-                                where word_id = %s
-                                UNION 
-                                select word_id  
-                                from word_in_phrase                              
-                                where word_id = %s
-                                LIMIT 1""", (word_id, word_id, word_id))
-        # if the word doesn't show up in the database (aside from word table) remove it
-        if not self.cursor.fetchone():
-            self.cursor.execute("""delete from word
-                                    where word_id = %s 
-                                    """, (word_id,))
-            self.connection.commit()
+            query += """ and (word.word_id = word_in_group.word_id)
+                         and (word_in_group.group_id = %s) """
+            params += (self.get_group_id(filters[2]),)
+
+        return query + " GROUP by word_txt ", params
+
+    def build_wrd_freq_query(self, filters):
+        """builds get_wrd_res's query over the counts of words within books (see insert_book_freq), when the words
+           are filtered by book, word and group only. :returns see build_wrd_res_query"""
+        if filters[1] is None and filters[2] == 'None':  # if user chose no group and chose a non-existing word
+            return None
+        table = 'word_freq' if filters[0] == 'All Books' else 'word_book_freq'
+        query = f"SELECT word_txt, {table}.cnt FROM word INNER JOIN {table} on {table}.word_id = word.word_id"
+        conditions, params = [], ()
+        if filters[0] != 'All Books':
+            conditions.append("word_book_freq.book_id = %s")
+            params += (filters[0],)
+        if filters[2] != 'None':  # the word is disregarded once user chose a group, as in build_wrd_res_query
+            query += " INNER JOIN word_in_group on word_in_group.word_id = word.word_id"
+            conditions.append("word_in_group.group_id = %s")
+            params += (self.get_group_id(filters[2]),)
+        elif filters[1]:
+            conditions.append("word.word_id = %s")
+            params += (filters[1],)
+        if conditions:
+            query += " WHERE " + " and ".join(conditions)
+        return query, params
 
     def get_wrd_instances(self, filters=None):
         """:returns a generator of occurrences of a word selected by user, in accordance with
            filters chosen by user at time of search (clicked the button 'search' in words_tab). """
         if not filters:
-            filters = ['All Books', '', '', '', '', '']
-
-        query = """select title,author,paragraph_serial, sentence_serial, line_serial, line_offset  
-        from word, word_instance, book                                   
-        where word.word_id = word_instance.word_id and word_instance.book_id=book.book_id """
-
-        query, params = self.build_query_filter(query, filters)
-        query += " ORDER BY book.book_id"
-        self.cursor.execute(query, params)
-
-        while True:
-            row = self.cursor.fetchone()
-            if not row:
-                break
-            yield row
+            filters = ['All Books', '', '', '', '', '', '']
+        return (row[:6] for row in iter_pages(partial(self.get_wrd_instances_page, filters)))
+
+    def get_wrd_instances_page(self, filters, after=None, page_size=PAGE_SIZE):
+        """a page of get_wrd_instances's occurrences, ordered by book_id and word_serial.
+           :returns rows of the page: (title, author, paragraph_serial, sentence_serial, line_serial, line_offset,
+            book_id, word_serial), and the resume token of the next page (see get_page)"""
+        def fetch_page():
+            query, params = self.build_query_filter("""select title, author, paragraph_serial, sentence_serial,
+                                                              line_serial, line_offset, word_instance.book_id,
+                                                              word_instance.word_serial
+                                                       from word, word_instance, book
+                                                       where word.word_id = word_instance.word_id
+                                                       and word_instance.book_id = book.book_id """, filters)
+            return self.get_page(query + " and {keyset}", params, WRD_INSTANCES_ORDER, after, page_size)
+
+        return self.result_cache.get(('wrd_instances', normalize_filters(filters, False), after, page_size),
+                                     fetch_page, partial(self.get_filters_dependencies, filters, False),
+                                     lambda page: len(page[0]))
+
+    def count_wrd_instances(self, filters):
+        """:returns number of occurrences get_wrd_instances returns"""
+        def count():
+            if filters[1] and not any(filters[3:]):  # looked up rather than counted, see insert_book_freq
+                if filters[0] == 'All Books':
+                    self.cursor.execute("SELECT cnt FROM word_freq WHERE word_id = %s", (filters[1],))
+                else:
+                    self.cursor.execute("SELECT cnt FROM word_book_freq WHERE word_id = %s and book_id = %s",
+                                        (filters[1], filters[0]))
+                row = self.cursor.fetchone()
+                return row[0] if row else 0
+            query, params = self.build_query_filter("""select count(*)
+                                                       from word, word_instance, book
+                                                       where word.word_id = word_instance.word_id
+                                                       and word_instance.book_id = book.book_id """, filters)
+            self.cursor.execute(query, params)
+            return self.cursor.fetchone()[0]
+
+        return self.result_cache.get(('wrd_instances_count', normalize_filters(filters, False)), count,
+                                     partial(self.get_filters_dependencies, filters, False), lambda _: 1)
+
+    def get_page(self, query, params, order, after, page_size, key=None):
+        """executes a query of a single page of rows, which follow the previous page by their sort key
+           (keyset pagination, see keyset_filter), rather than by skipping rows with OFFSET. thus every page is
+           a bounded range of the query's order (an index range scan, given a fitting index), no matter how far it is.
+           page_size + 1 rows are fetched, so the row that follows the page tells whether there's a next page.
+           :param query: query whose WHERE (or HAVING) clause holds a {keyset} placeholder, with no params after it.
+            it's completed by the condition of the page, its order and limit.
+           :param order: the query's sort key, see WRD_RES_ORDER
+           :param after: resume token returned alongside the previous page, None for the first page
+           :param key: callable(row) -> the row's sort key. defaults to the row's trailing len(order) columns
+           :returns rows of the page, and the resume token of the next page: the sort key of the page's last row,
+            or None if this is the last page"""
+        condition, after_params = keyset_filter(order, after) if after else ('true', [])
+        order_by = ', '.join(column + (' DESC' if descending else '') for column, descending in order)
+        self.cursor.execute(query.format(keyset=condition) + f" ORDER BY {order_by} LIMIT %s",
+                            tuple(params) + tuple(after_params) + (page_size + 1,))
+        rows = self.cursor.fetchall()
+        if len(rows) <= page_size:
+            return rows, None
+        last_row = rows[page_size - 1]
+        return rows[:page_size], tuple(key(last_row) if key else last_row[-len(order):])
 
     def build_query_filter(self, query, filters):
         """Auxiliary function that builds an SQL query in accordance to user's filters
@@ -302,16 +783,25 @@ class Database:
         """:returns a generator of 100 most words frequent used words
            and the number of times they've appeared within the DB.
            Called by Stats_tab."""
-        self.cursor.execute("""select word_txt, count(word_serial) as cnt
-                                from word inner join word_instance on word.word_id = word_instance.word_id
-                                group by word_txt
+        self.cursor.execute("""select word_txt, cnt
+                                from word_freq inner join word on word.word_id = word_freq.word_id
                                 ORDER BY cnt DESC
                                 LIMIT 100""")
-        while True:
-            row = self.cursor.fetchone()
-            if not row:
-                break
-            yield row
+        yield from self.cursor.fetchall()
+
+    def get_word_books(self, word_id):
+        """:returns title, author and number of instances of the word within each book it appears in,
+            most frequent first"""
+        self.cursor.execute("""SELECT title, author, cnt
+                                FROM word_book_freq inner join book on book.book_id = word_book_freq.book_id
+                                WHERE word_id = %s
+                                ORDER BY cnt DESC""", (word_id,))
+        return self.cursor.fetchall()
+
+    def get_doc_freq(self, word_id):
+        """:returns number of instances of the word within all books, and number of books it appears in"""
+        self.cursor.execute("SELECT cnt, book_cnt FROM word_freq WHERE word_id = %s", (word_id,))
+        return self.cursor.fetchone() or (0, 0)
 
     def insert_group(self, group_name, group_id=None):
         """"Insert group into group_of_words in the DB.
@@ -330,13 +820,12 @@ class Database:
     def get_groups(self):
         """:returns names of groups within the DB.
         called by words_tab to populate group selection box and by group_tab when importing/adding new book."""
+        return (row[:1] for row in iter_pages(self.get_groups_page))
 
-        self.cursor.execute("SELECT group_name FROM group_of_words")
-        while True:
-            title = self.cursor.fetchone()
-            if not title:
-                break
-            yield title
+    def get_groups_page(self, after=None, page_size=PAGE_SIZE):
+        """a page of (group_name, group_id) of the groups within the DB, ordered by group_id. :returns see get_page"""
+        return self.get_page("SELECT group_name, group_id FROM group_of_words WHERE {keyset}", (), GROUP_ORDER, after,
+                             page_size)
 
     def get_group_id(self, group_name):
         """:returns group_id of group in the DB.
@@ -350,7 +839,9 @@ class Database:
         try:
             self.cursor.execute("INSERT INTO word_in_group (word_id,group_id) VALUE (%s,%s)",
                                 (word_id, group_id))
+            self.add_word_refs("SELECT %s AS word_id, 1 AS cnt", (word_id,))
             self.connection.commit()
+            self.result_cache.invalidate(('group', group_id))
         except mysql.connector.Error as error:
             # display_msg(msg_icon.WARNING,"Warning","Duplicate entry: word already exists in group")
             return False
@@ -364,49 +855,42 @@ class Database:
             word_id = word
             group_id = group
         else:
-            word_id = self.get_word_id.__wrapped__(self, word)[0]  # bypassing cache
+            word_id = self.get_word_id(word)[0]
             group_id = self.get_group_id(group)
 
         # remove word from the group it used to belong to
+        self.del_word_refs("""SELECT word_id, 1 AS cnt FROM word_in_group
+                              WHERE group_id = %s and word_id = %s""", (group_id, word_id))
         self.cursor.execute("""delete from word_in_group
                                 where group_id = %s 
                                 and word_id = %s""", (group_id, word_id))
-        self.connection.commit()
-
-        self.remove_word_if_redundant(word_id)
+        self.sweep_words()
+        self.result_cache.invalidate(('group', group_id))
 
     def del_group(self, group):
         """removes the selected group and all words that belongs to it. """
         group_id = self.get_group_id(group)
 
-        # get all words belonging to given group
-        self.cursor.execute("""select word_id  
-                                from  word_in_group                          
-                                where group_id = %s""", (group_id,))
-        group_words = self.cursor.fetchall()
-
-        # disconnect words that used to belong to the selected group, from said group
-        if group_words:
-            for word_id in group_words:
-                self.del_wrd_in_grp(group_id, word_id[0], id_input=True)
+        # drop the references of the group to its words, which are then removed unless they serve another purpose
+        self.del_word_refs("SELECT word_id, 1 AS cnt FROM word_in_group WHERE group_id = %s", (group_id,))
 
-        # removes the group from the database
+        # removes the group from the database, alongside with its words' memberships by on delete cascade
         self.cursor.execute("""delete from group_of_words
                                 where group_id = %s """, (group_id,))
-        self.connection.commit()
+        self.sweep_words()
+        self.result_cache.invalidate(('group', group_id))
 
     def get_group_words(self, group_name):
         """:returns a generator of words that belongs to a selected group.
            Used in Group_tab to display user words within selected group. """
-        self.cursor.execute("""select word_txt
+        return (row[:1] for row in iter_pages(partial(self.get_group_words_page, group_name)))
+
+    def get_group_words_page(self, group_name, after=None, page_size=PAGE_SIZE):
+        """a page of (word_txt, word_id) of the words of a group, ordered by word_id. :returns see get_page"""
+        return self.get_page("""select word_txt, word.word_id
                 from word,word_in_group,group_of_words
-                where word.word_id = word_in_group.word_id and word_in_group.group_id = group_of_words.group_id 
-                and group_name = %s """, (group_name,))
-        while True:
-            row = self.cursor.fetchone()
-            if not row:
-                break
-            yield row
+                where word.word_id = word_in_group.word_id and word_in_group.group_id = group_of_words.group_id
+                and group_name = %s and {keyset}""", (group_name,), GROUP_WORDS_ORDER, after, page_size)
 
     def insert_phrase(self, phrase_txt, phrase_id=None):
         """Inserts a phrase chosen by user to the DB and returns id of inserted phrase.
@@ -425,54 +909,188 @@ class Database:
         self.cursor.execute("SELECT LAST_INSERT_ID()")  # returns id of phrase added
         return self.cursor.fetchone()[0]
 
-    def insert_word_in_phrase(self, word_id, phrase_id, offset):
-        """Inserts word that's belongs to a phrase newly added by user to the DB.
-           The offset (zero based index) parameter indicates the word's index within the phrase.
-           """
-        self.cursor.execute("INSERT INTO word_in_phrase (word_id,phrase_id,offset) VALUE (%s,%s,%s)",
-                            (word_id, phrase_id, offset))
+    def insert_phrase_words(self, phrase_id, word_ids):
+        """Inserts the words of a phrase newly added by user to the DB, given in their order within the phrase,
+           alongside with the phrase's references to them (see word_ref), within a single transaction."""
+        self.insert_rows('word_in_phrase', ((word_id, phrase_id, offset) for offset, word_id in enumerate(word_ids)),
+                         commit=False)
+        self.add_word_refs("""SELECT word_id, count(*) AS cnt FROM word_in_phrase
+                              WHERE phrase_id = %s GROUP BY word_id""", (phrase_id,))
         self.connection.commit()
+        self.result_cache.invalidate(('phrase', phrase_id))
 
-    def get_phrase_appear(self, phrase_txt):
-        """:returns generator of occurrences (within available books) of a phrase selected by user.
-           Query below searches for words that are sequential in book (word_serial) and in phrase(offset),
-           within the same sentence (sentence_serial), which constitute the same phrase(phrase_id)."""
-
+    def get_phrase_words(self, phrase_txt):
+        """:returns phrase_id of a phrase, and (word_id, offset) of each of its words"""
         self.cursor.execute("SELECT phrase_id from phrase where phrase_txt = %s", (phrase_txt,))
         phrase_id = self.cursor.fetchone()[0]
+        self.cursor.execute("SELECT word_id, offset FROM word_in_phrase WHERE phrase_id = %s", (phrase_id,))
+        return phrase_id, self.cursor.fetchall()
+
+    def get_phrase_appear(self, phrase_txt):
+        """:returns generator of occurrences (within available books) of a phrase selected by user, ordered by title.
+           occurrences are fetched page by page, see get_phrase_appear_page."""
+        return (row[:6] for row in iter_pages(partial(self.get_phrase_appear_page, phrase_txt)))
+
+    def get_phrase_appear_page(self, phrase_txt, after=None, page_size=PAGE_SIZE):
+        """a page of the occurrences of a phrase, ordered by title, book_id and word_serial.
+           occurrences are matched by the in-memory PhraseIndex, and only the rows of the page are fetched from the DB.
+           without numpy, they're matched by get_phrase_appear_sql's query instead.
+           :returns rows of the page: (title, author, paragraph_serial, sentence_serial, line_serial, line_offset,
+            book_id, word_serial), and the resume token of the next page (see get_page)"""
+        phrase_id, phrase_words = self.get_phrase_words(phrase_txt)
+        return self.result_cache.get(('phrase_appear', phrase_id, after, page_size),
+                                     partial(self.fetch_phrase_appear_page, phrase_id, phrase_words, after, page_size),
+                                     lambda: (ANY_BOOK, ('phrase', phrase_id), PHRASE_INDEX), lambda page: len(page[0]))
+
+    def fetch_phrase_appear_page(self, phrase_id, phrase_words, after, page_size):
+        """get_phrase_appear_page helper function, which queries the page rather than taking it from the cache"""
+        occurrences = self.get_phrase_occurrences(phrase_id, phrase_words)
+        if occurrences is None:
+            query, params = self.get_phrase_appear_sql(phrase_id, phrase_words)
+            return self.get_page(f"SELECT * FROM ({query}) AS occurrence WHERE {{keyset}}", params,
+                                 PHRASE_APPEAR_ORDER, after, page_size, lambda row: (row[0], row[6], row[7]))
+
+        keys, books = occurrences
+        first = 0
+        if after:
+            title, book_id, word_serial = after
+            rank = bisect.bisect_left(books, (title, book_id))
+            if rank < len(books) and books[rank] == (title, book_id):
+                first = int(np.searchsorted(keys, (rank << SERIAL_BITS) | word_serial, side='right'))
+            else:  # the book of the previous page is gone, thus the page starts at the book that follows it
+                first = int(np.searchsorted(keys, rank << SERIAL_BITS))
+        # (title, book_id, word_serial) of each occurrence of the page, i.e. its sort key
+        page = [books[key >> SERIAL_BITS] + (key & SERIAL_MASK,) for key in keys[first:first + page_size].tolist()]
+        if not page:
+            return [], None
+        self.cursor.execute(f"""SELECT title, author, paragraph_serial, sentence_serial, line_serial, line_offset,
+                                       word_instance.book_id, word_serial
+                                FROM word_instance
+                                INNER JOIN book on word_instance.book_id = book.book_id
+                                WHERE (word_serial, word_instance.book_id) IN ({','.join(['(%s,%s)'] * len(page))})
+                                ORDER BY title, word_instance.book_id, word_serial""",
+                            [value for _, book_id, word_serial in page for value in (word_serial, book_id)])
+        return self.cursor.fetchall(), (page[-1] if first + page_size < len(keys) else None)
+
+    def count_phrase_appear(self, phrase_txt):
+        """:returns number of occurrences of a phrase, or None if the PhraseIndex is unavailable, in which case
+            counting them costs as much as searching them."""
+        phrase_id, phrase_words = self.get_phrase_words(phrase_txt)
+        occurrences = self.get_phrase_occurrences(phrase_id, phrase_words)
+        return None if occurrences is None else len(occurrences[0])
+
+    def get_phrase_occurrences(self, phrase_id, phrase_words):
+        """matches a phrase by the PhraseIndex and sorts its occurrences, once per phrase rather than per page, since
+           the result is cached until a book or the phrase changes.
+           :param phrase_words: see get_phrase_words
+           :returns a sorted array of the keys of the phrase's occurrences: rank of the book << SERIAL_BITS |
+            word_serial, and the sorted (title, book_id) of every book, by which a book's rank is its index.
+            or None if the PhraseIndex is unavailable, e.g. while it's being built (see build_phrase_index)"""
+        if not self.phrase_index.loaded:
+            self.build_phrase_index()
+        return self.result_cache.get(('phrase_occurrences', phrase_id), partial(self.match_phrase, phrase_words),
+                                     lambda: (ANY_BOOK, ('phrase', phrase_id), PHRASE_INDEX),
+                                     lambda occurrences: 1 + (len(occurrences[0]) // OCCURRENCE_ROWS if occurrences
+                                                              else 0))
+
+    def match_phrase(self, phrase_words):
+        """get_phrase_occurrences helper function, which matches the phrase rather than taking it from the cache"""
+        occurrences = self.phrase_index.match(self.connection, phrase_words)
+        if occurrences is None:
+            return None
+        self.cursor.execute("SELECT title, book_id FROM book")
+        books = sorted(tuple(book) for book in self.cursor.fetchall())
+        book_ids, word_serials = occurrences
+        ranks = np.full(max([book_id for _, book_id in books] + [int(book_ids.max(initial=0))]) + 1, -1, np.int64)
+        ranks[[book_id for _, book_id in books]] = np.arange(len(books))
+        occurrence_ranks = ranks[book_ids]
+        kept = occurrence_ranks >= 0  # books deleted since the index was synced
+        return np.sort((occurrence_ranks[kept] << SERIAL_BITS) | word_serials[kept]), books
+
+    def build_phrase_index(self):
+        """builds the PhraseIndex on a background thread, unless it's built or being built already.
+           it's built over its own pooled connection, whose select isn't limited by MAX_EXECUTION_TIME (see
+           QUERY_TIMEOUTS), thus a search that times out or is canceled doesn't stop it."""
+        generation = self.phrase_index.start_build()
+        if generation is not None:
+            threading.Thread(target=self.load_phrase_index, args=(generation,), daemon=True).start()
+
+    def load_phrase_index(self, generation):
+        """build_phrase_index's thread. phrase results matched by SQL meanwhile are dropped once it's built."""
         try:
-            self.cursor.execute("""with selPhrase (word_id , phrase_id , offset) AS
-                                 (SELECT *
-                                 FROM word_in_phrase
-                                 WHERE phrase_id = %s
-                                ) 
-                                  select title, author, wi1.paragraph_serial, wi1.sentence_serial,
-                                                wi1.line_serial, wi1.line_offset
-                                  FROM word_instance as wi1 
-                                  INNER JOIN word_instance as wi2 on wi2.book_id = wi1.book_id 
-                                        and wi2.sentence_serial = wi1.sentence_serial
-                                  INNER JOIN selPhrase on wi2.word_id = selPhrase.word_id 
-                                  INNER JOIN book on wi1.book_id = book.book_id
-                                  WHERE wi2.word_serial = wi1.word_serial + selPhrase.offset
-                                  GROUP BY wi1.book_id, wi1.word_serial, wi1.sentence_serial
-                                  HAVING COUNT(*) = (SELECT COUNT(*) FROM selPhrase) 
-                                  ORDER BY title""", (phrase_id,))
-        except mysql.connector.Error as error:
-            print("parameterized query failed {}".format(error))
-        while True:
-            row = self.cursor.fetchone()
-            if not row:
-                break
-            yield row
+            with self.session() as worker_db:
+                worker_db.set_max_execution_time(0)
+                self.phrase_index.load(worker_db.connection, generation)
+            self.result_cache.invalidate(PHRASE_INDEX)
+        except mysql.connector.Error as error:  # the index is built again upon next search
+            print("failed to build the phrase index {}".format(error))
+        finally:
+            self.phrase_index.end_build()
+
+    def get_phrase_appear_sql(self, phrase_id, phrase_words):
+        """builds the query get_phrase_appear_page falls back on when the PhraseIndex is unavailable.
+           Query below searches for words that are sequential in book (word_serial) and in phrase(offset),
+           within the same sentence (sentence_serial), which constitute the same phrase(phrase_id).
+           the positions checked are seeded by the phrase's rarest bigram (see insert_book_bigrams), rather than being
+           every word_instance. a phrase without bigrams (i.e. of a single word) is searched by a self join instead.
+           :param phrase_words: (word_id, offset) of each word of the phrase
+           :returns the query, whose rows are those of get_phrase_appear_page (unordered), and its params"""
+        words = {offset: word_id for word_id, offset in phrase_words}
+        bigrams = []  # (number of occurrences, offset, w1, w2) of each pair of consecutive words of the phrase
+        for offset in sorted(words):
+            if offset + 1 in words:
+                self.cursor.execute("SELECT COUNT(*) FROM word_bigram WHERE w1 = %s and w2 = %s",
+                                    (words[offset], words[offset + 1]))
+                bigrams.append((self.cursor.fetchone()[0], offset, words[offset], words[offset + 1]))
+        if not bigrams:
+            return self.get_phrase_appear_join(phrase_id)
+
+        _, offset, w1, w2 = min(bigrams)
+        return """with seed (book_id, word_serial) AS
+                 (SELECT book_id, word_serial - %s
+                 FROM word_bigram
+                 WHERE w1 = %s and w2 = %s
+                )
+                  select title, author, wi1.paragraph_serial, wi1.sentence_serial,
+                                wi1.line_serial, wi1.line_offset, wi1.book_id, wi1.word_serial
+                  FROM seed
+                  INNER JOIN word_instance as wi1 on wi1.book_id = seed.book_id
+                        and wi1.word_serial = seed.word_serial
+                  INNER JOIN word_in_phrase on word_in_phrase.phrase_id = %s
+                  INNER JOIN word_instance as wi2 on wi2.book_id = wi1.book_id
+                        and wi2.word_serial = wi1.word_serial + word_in_phrase.offset
+                        and wi2.word_id = word_in_phrase.word_id
+                        and wi2.sentence_serial = wi1.sentence_serial
+                  INNER JOIN book on wi1.book_id = book.book_id
+                  GROUP BY wi1.book_id, wi1.word_serial, wi1.sentence_serial
+                  HAVING COUNT(*) = %s""", (offset, w1, w2, phrase_id, len(phrase_words))
+
+    def get_phrase_appear_join(self, phrase_id):
+        """get_phrase_appear_sql's fallback, which joins word_instance with itself. :returns the query and its params"""
+        return """with selPhrase (word_id , phrase_id , offset) AS
+                 (SELECT *
+                 FROM word_in_phrase
+                 WHERE phrase_id = %s
+                )
+                  select title, author, wi1.paragraph_serial, wi1.sentence_serial,
+                                wi1.line_serial, wi1.line_offset, wi1.book_id, wi1.word_serial
+                  FROM word_instance as wi1
+                  INNER JOIN word_instance as wi2 on wi2.book_id = wi1.book_id
+                        and wi2.sentence_serial = wi1.sentence_serial
+                  INNER JOIN selPhrase on wi2.word_id = selPhrase.word_id
+                  INNER JOIN book on wi1.book_id = book.book_id
+                  WHERE wi2.word_serial = wi1.word_serial + selPhrase.offset
+                  GROUP BY wi1.book_id, wi1.word_serial, wi1.sentence_serial
+                  HAVING COUNT(*) = (SELECT COUNT(*) FROM selPhrase)""", (phrase_id,)
 
     def get_phrases(self):
         """:returns generator of phrases currently in DB. Used when user imports DB."""
-        self.cursor.execute("SELECT phrase_txt FROM phrase")
-        while True:
-            phrase = self.cursor.fetchone()
-            if not phrase:
-                break
-            yield phrase
+        return (row[:1] for row in iter_pages(self.get_phrases_page))
+
+    def get_phrases_page(self, after=None, page_size=PAGE_SIZE):
+        """a page of (phrase_txt, phrase_id) of the phrases in DB, ordered by phrase_id. :returns see get_page"""
+        return self.get_page("SELECT phrase_txt, phrase_id FROM phrase WHERE {keyset}", (), PHRASE_ORDER, after,
+                             page_size)
 
     def del_phrase(self, phrase):
         """removes the selected group and all words that belongs to it. """
@@ -484,39 +1102,39 @@ class Database:
                                 limit 1""", (phrase,))
         phrase_id = self.cursor.fetchone()
 
-        # get all words belonging to given phrase
-        self.cursor.execute("""select word_id
-                                from word_in_phrase
-                                where phrase_id =  %s""", (phrase_id[0],))
-        phrase_words = self.cursor.fetchall()
-
-        # delete words that used to belong to the selected phrase, from said phrase
-        for word_id in phrase_words:
-            self.cursor.execute("""delete 
-                    from word_in_phrase 
-                    where phrase_id = %s 
-                    and word_id = %s""", (phrase_id[0], word_id[0]))
-            self.connection.commit()
-
-        # remove words that used to belong to given phrase from the database, unless they serve another purpose
-        if phrase_words:
-            for word_id in phrase_words:
-                self.remove_word_if_redundant(word_id[0])
+        # drop the references of the phrase to its words (one per position), which are then removed from the database
+        # unless they serve another purpose
+        self.del_word_refs("""SELECT word_id, count(*) AS cnt FROM word_in_phrase
+                              WHERE phrase_id = %s GROUP BY word_id""", (phrase_id[0],))
 
-        # finally removes the phrase from the database
+        # removes the phrase from the database, alongside with its words' positions by on delete cascade
         self.cursor.execute("""delete from phrase
                                 where phrase_id = %s """, (phrase_id[0],))
-        self.connection.commit()
+        self.sweep_words()
+        self.result_cache.invalidate(('phrase', phrase_id[0]))
 
     def table_to_json(self, table):
-        """Export helper function - generator that return rows of table given in json format """
-        self.cursor.execute(f"SELECT * from {table}")
-        row_headers = [x[0] for x in self.cursor.description]
-        while True:
-            row = self.cursor.fetchone()
-            if not row:
-                break
-            yield dict(zip(row_headers, row))  # Converting iterator to dictionary
+        """Export helper function - generator that return rows of table given in json format.
+           the table is streamed by a single select over a pooled connection (see stream), in the order of its
+           primary key, rather than paged by a query per page."""
+        with self.session() as worker_db:
+            for rows in worker_db.stream(f"SELECT * FROM {table} ORDER BY {', '.join(PRIMARY_KEYS[table])}"):
+                # Converting rows to dictionaries
+                yield from (dict(zip(worker_db.stream_columns, map(json_value, row))) for row in rows)
+
+    def stream(self, query, params=(), batch_size=FETCH_BATCH, as_array=False):
+        """executes a select over an unbuffered cursor, thus rows are transferred as they're fetched, in batches,
+           rather than buffered at once or fetched one by one. the connection can't run other statements until
+           the stream is exhausted, hence long streams should run over a session (see session).
+           :param as_array: see fetch_batches
+           :returns a generator of batches of rows. names of the columns are kept in stream_columns."""
+        cursor = self.connection.cursor()  # unbuffered, and not prepared since rows are parsed faster as text
+        try:
+            cursor.execute(query, params)
+            self.stream_columns = [column[0] for column in cursor.description]
+            yield from fetch_batches(cursor, batch_size, as_array)
+        finally:
+            cursor.close()
 
     def export_to_csv(self, table, folder_path):
         self.cursor.execute(f"SHOW columns FROM {table}")
@@ -540,11 +1158,14 @@ class Database:
         self.cursor.execute("select count(*) from book")
         return self.cursor.fetchone()[0]
 
-    def get_sum_size(self):
-        """ :returns total size of files read into the database"""
-        self.cursor.execute("select sum(size) from book")
-        res = self.cursor.fetchone()[0]
-        return res if res else 0
+    def get_table_sizes(self, tables):
+        """:returns table name, size of data and size of indexes (in bytes) of each of the given tables,
+            as estimated by information_schema"""
+        self.cursor.execute(f"""SELECT table_name, data_length, index_length
+                                FROM information_schema.tables
+                                WHERE table_schema = DATABASE() and table_name in ({','.join(['%s'] * len(tables))})""",
+                            tables)
+        return self.cursor.fetchall()
 
     def get_sum_phrases(self):
         """ :returns number of phrases in the database"""
@@ -556,107 +1177,74 @@ class Database:
         self.cursor.execute("select count(*) from group_of_words")
         return self.cursor.fetchone()[0]
 
-    def get_sum_par(self, book_id):
-        """ :returns number of paragraphs within all books in the database if book_id is None.
-            else, result corresponds to specific book provided"""
-        if not book_id:  # user cleared DB
-            return 0
-
-        params = ()
-        if book_id == 'All':  # importing, i.e calculating from scratch
-            query = """select sum(total_pars_in_book)
-                    from (select max(paragraph_serial) as total_pars_in_book
-                            from word_instance
-                            group by book_id)as tmp"""
-        else:  # user added a new book to the database
-            query = """select max(paragraph_serial) 
-                               from word_instance
-                               where book_id  = %s"""
-            params += (book_id,)
-
-        self.cursor.execute(query, params)
-        res = self.cursor.fetchone()[0]
-        return res if res else 0  # implemented this way for clear method
-
-    def get_sum_line(self, book_id):
-        """ :returns number of lines within all books in the database if book_id is None.
-            else, result corresponds to specific book provided"""
-        if not book_id:  # user cleared DB
-            return 0
-        params = ()
-        if book_id == 'All':  # importing, i.e calculating from scratch
-            query = """select sum(total_lines_in_book)
-                       from (select max(line_serial) as total_lines_in_book
-                                from word_instance
-                                group by book_id)as tmp"""
-        else:  # user added a new book to the database
-            query = """select max(line_serial) 
-                        from word_instance
-                        where book_id  = %s"""
-            params += (book_id,)
-
-        self.cursor.execute(query, params)
-        res = self.cursor.fetchone()[0]
-        return res if res else 0
-
-    def get_sum_sent(self, book_id):
-        """ :returns number of sentences within all books in the database if book_id is None.
-            else, result corresponds to specific book provided"""
-        if not book_id:  # user cleared DB
-            return 0
-
-        params = ()
-        if book_id == 'All':  # importing, i.e calculating from scratch
-            query = """select sum(total_sents_in_book)
-                       from (select max(sentence_serial) as total_sents_in_book
-                                from word_instance
-                                group by book_id)as tmp"""
-        else:  # user added a new book to the database
-            query = """select max(sentence_serial) 
-                        from word_instance
-                        where book_id  = %s"""
-            params += (book_id,)
-
-        self.cursor.execute(query, params)
-        res = self.cursor.fetchone()[0]
-        return res if res else 0
-
-    def get_overall_words(self, book_id):  # using count(*) on large tables isn't optimized well on innoDB driver
-        """ :returns number of words within all books in the database if book_id is None.
-            else, result corresponds to specific book provided"""
-        if not book_id:  # user cleared DB
-            return 0
-        # logically word_id below could have been replaced with *,
-        # but it would have negative impact on performance
-        query = """SELECT COUNT(word_id)  
-                           FROM word_instance"""
-        params = ()
-        if book_id != 'All':
-            query += " where book_id = %s "
-            params += (book_id,)
-        self.cursor.execute(query, params)
-        return self.cursor.fetchone()[0]
+    def get_stats(self):
+        """ :returns totals of all books in the database: number of books, size (in bytes), paragraphs, lines,
+            sentences, words, characters and unique words. summed up per book by a single query, see book_stats."""
+        self.cursor.execute("""SELECT count(*), COALESCE(sum(size), 0), COALESCE(sum(par_cnt), 0),
+                                      COALESCE(sum(line_cnt), 0), COALESCE(sum(sent_cnt), 0),
+                                      COALESCE(sum(word_cnt), 0), COALESCE(sum(char_cnt), 0),
+                                      (SELECT count(*) FROM word_freq)
+                               FROM book left join book_stats on book_stats.book_id = book.book_id""")
+        return tuple(int(value) for value in self.cursor.fetchone())
+
+
+def tsv_field(val):
+    """ :returns val formatted as a field of a LOAD DATA file (default escaping, NULL written as \\N) """
+    if val is None:
+        return '\\N'
+    if isinstance(val, str):
+        return val.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n')
+    return str(val)
+
+
+def json_value(val):
+    """ :returns val as it's exported to JSON. binary values (e.g. compressed text of book_chunk) are base64 encoded """
+    return base64.b64encode(val).decode('ascii') if isinstance(val, (bytes, bytearray)) else val
+
+
+def read_tsv(tsv):
+    """generator of rows read back from a file written for LOAD DATA. used when falling back to INSERTs"""
+    for line in tsv:
+        yield tuple(None if field == '\\N' else TSV_ESCAPE.sub(lambda match: TSV_UNESCAPED.get(match.group(1),
+                                                                                             match.group(1)), field)
+                    for field in line.rstrip('\n').split('\t'))
+
+
+def keyset_filter(columns, after):
+    """builds the condition of a page of a paginated query (see Database.get_page): rows that follow the given sort key.
+       e.g. for columns a, b: a > %s or (a = %s and b > %s)
+       :param columns: the query's sort keys, see WRD_RES_ORDER
+       :param after: sort key of the last row of the previous page
+       :returns the condition and its params"""
+    (column, descending), rest = columns[0], columns[1:]
+    condition, params = f"{column} {'<' if descending else '>'} %s", [after[0]]
+    if rest:
+        rest_condition, rest_params = keyset_filter(rest, after[1:])
+        condition, params = f"({condition} or ({column} = %s and {rest_condition}))", params + [after[0]] + rest_params
+    return condition, params
+
+
+def iter_pages(fetch_page, page_size=ITER_PAGE_SIZE):
+    """:returns a generator of the rows of every page of a paginated query, see Database.get_page.
+        the shared cursor isn't held in between pages, thus the caller may run other queries while iterating.
+       :param fetch_page: callable(after, page_size), e.g. Database.get_groups_page"""
+    after = None
+    while True:
+        rows, after = fetch_page(after, page_size)
+        yield from rows
+        if after is None:
+            return
 
-    def get_unique_words(self):
-        """ :returns number of unique words within all books in the database."""
-        self.cursor.execute("""select count(word_id) as unique_words
-                                from word""")
-        return self.cursor.fetchone()[0]
 
-    def get_sum_char(self, book_id):
-        """ :returns number of characters within all books in the database if book_id is None.
-            else, result corresponds to specific book provided"""
-        if not book_id:  # user cleared DB
-            return 0
-        query = """select sum(char_length(word_txt)) as num_of_char
-                                         from word,word_instance
-                                         where word.word_id = word_instance.word_id """
-        params = ()
-        if book_id != 'All':
-            query += " and book_id = %s "
-            params += (book_id,)
-        self.cursor.execute(query, params)
-        res = self.cursor.fetchone()[0]  # intended to deal with clear
-        if res:
-            return res
-        return 0
+def fetch_batches(cursor, batch_size=FETCH_BATCH, as_array=False):
+    """:returns a generator of the rows of a select executed by cursor, fetched batch_size rows at a time.
+       :param as_array: yields every batch as a NumPy record array whose fields are named after the columns,
+        rather than as a list of tuples (requires numpy)"""
+    if as_array and not np:
+        raise ImportError("numpy is required to fetch rows as arrays")
+    names = [column[0] for column in cursor.description]
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield np.rec.fromrecords(rows, names=names) if as_array else rows
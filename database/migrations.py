@@ -0,0 +1,119 @@
+""" Versioned migrations, which evolve the schema of an existing database (see Database.init_schema) """
+import re
+from itertools import groupby
+
+MB = pow(2, 20)
+
+
+def migrate(db, rerun=False):
+    """applies the migrations the DB hasn't applied yet, in order, and records the version of each in schema_version.
+       DDL statements are committed implicitly by MySQL, thus a migration can't be rolled back. instead, every
+       migration is idempotent, so one that was interrupted before its version was recorded is simply applied again.
+       :param rerun: applies every migration regardless of schema_version, e.g. once tables were replaced by an import.
+       :returns versions applied"""
+    db.cursor.execute("SELECT version FROM schema_version")
+    applied = set() if rerun else {version for version, in db.cursor.fetchall()}
+    versions = []
+    for version, migration in enumerate(MIGRATIONS, start=1):
+        if version in applied:
+            continue
+        print("migrating schema to version {}: {}".format(version, migration.__doc__))
+        migration(db)
+        db.cursor.execute("INSERT IGNORE INTO schema_version (version) VALUE (%s)", (version,))
+        db.connection.commit()
+        versions.append(version)
+    return versions
+
+
+def get_indexes(db, table):
+    """:returns a dictionary of index name -> columns of the index, of every index of the table"""
+    db.cursor.execute("""SELECT index_name, column_name
+                         FROM information_schema.statistics
+                         WHERE table_schema = DATABASE() and table_name = %s
+                         ORDER BY index_name, seq_in_index""", (table,))
+    return {name: tuple(column for _, column in rows) for name, rows in groupby(db.cursor.fetchall(),
+                                                                                  key=lambda row: row[0])}
+
+
+def add_index(db, table, name, columns):
+    """adds an index to the table, unless it already has an index that starts with the same columns
+       (e.g. the index MySQL creates for a foreign key)."""
+    if any(index[:len(columns)] == columns for index in get_indexes(db, table).values()):
+        return
+    db.cursor.execute(f"ALTER TABLE {table} ADD INDEX {name} ({','.join(columns)})")
+
+
+def get_column_types(db, table):
+    """:returns a dictionary of column name -> type of every column of the table, without display widths
+        (e.g. 'mediumint unsigned' rather than 'mediumint(8) unsigned')"""
+    db.cursor.execute("""SELECT column_name, column_type
+                         FROM information_schema.columns
+                         WHERE table_schema = DATABASE() and table_name = %s""", (table,))
+    types = {}
+    for column, column_type in db.cursor.fetchall():
+        if isinstance(column_type, (bytes, bytearray)):  # text columns of information_schema may be fetched as bytes
+            column_type = column_type.decode()
+        types[column] = re.sub(r'\(\d+\)', '', column_type).lower()
+    return types
+
+
+def modify_columns(db, table, types):
+    """changes the types of the table's columns, given as a dictionary of column name -> type, by a single ALTER
+       (i.e. a single rebuild of the table). columns that are already of the given type are left as they are."""
+    current_types = get_column_types(db, table)
+    changes = [f"MODIFY {column} {column_type}" for column, column_type in types.items()
+               if current_types.get(column) != column_type.lower()]
+    if changes:
+        db.cursor.execute(f"ALTER TABLE {table} {', '.join(changes)}")
+
+
+def print_table_sizes(db, tables):
+    """prints the size of the tables' data and indexes, as estimated by information_schema"""
+    for table, data_size, index_size in db.get_table_sizes(tables):
+        print("{}: data {:.2f}MB, indexes {:.2f}MB".format(table, data_size / MB, index_size / MB))
+
+
+def add_word_instance_word_index(db):
+    """covering index of word_instance for word searches, which filter by word_id and optionally by book_id"""
+    add_index(db, 'word_instance', 'idx_word_book', ('word_id', 'book_id', 'word_serial'))
+
+
+def add_word_instance_sentence_index(db):
+    """index of word_instance for the words of a sentence within a book, which phrase searches join on"""
+    add_index(db, 'word_instance', 'idx_book_sentence', ('book_id', 'sentence_serial'))
+
+
+def add_word_in_group_group_index(db):
+    """index of word_in_group for the words of a group"""
+    add_index(db, 'word_in_group', 'idx_group', ('group_id',))
+
+
+def compact_word_instance(db):
+    """minimal integer types for the serials of word_instance that aren't foreign keys"""
+    print_table_sizes(db, ['word_instance'])
+    # up to 16M sentences, lines and paragraphs and 64K words per line, far beyond the largest Gutenberg books.
+    # word_id and book_id must match the types of the keys they reference, and word_serial is the primary key
+    modify_columns(db, 'word_instance', {'sentence_serial': 'MEDIUMINT UNSIGNED', 'line_serial': 'MEDIUMINT UNSIGNED',
+                                         'line_offset': 'SMALLINT UNSIGNED', 'paragraph_serial': 'MEDIUMINT UNSIGNED'})
+    print_table_sizes(db, ['word_instance'])
+
+
+def book_size_in_bytes(db):
+    """book.size holds the size of the book's file in bytes (BIGINT), rather than a string such as '1.23MB'"""
+    columns = get_column_types(db, 'book')
+    if columns['size'] == 'bigint':
+        return
+    if 'size_bytes' not in columns:
+        db.cursor.execute("ALTER TABLE book ADD COLUMN size_bytes BIGINT AFTER size")
+    # the size of the file recorded alongside the book is exact, other sizes are parsed back from megabytes
+    db.cursor.execute(f"""UPDATE book LEFT JOIN book_source on book_source.book_id = book.book_id
+                          SET size_bytes = COALESCE(file_size,
+                                                    ROUND(CAST(REPLACE(size, 'MB', '') AS DECIMAL(12, 2)) * {MB}))""")
+    db.connection.commit()
+    db.cursor.execute("ALTER TABLE book DROP COLUMN size, CHANGE size_bytes size BIGINT")
+
+
+# every migration ever released, in order. a migration's version is its position within the list (starting at 1),
+# thus new migrations are appended, and released ones are never removed or reordered.
+MIGRATIONS = [add_word_instance_word_index, add_word_instance_sentence_index, add_word_in_group_group_index,
+              compact_word_instance, book_size_in_bytes]
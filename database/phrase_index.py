@@ -0,0 +1,181 @@
+""" In-memory positional index of the word instances within the database, used to search phrases """
+import threading
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, phrases are searched by SQL without it (see Database.get_phrase_appear)
+    np = None
+
+LOAD_BATCH = 50000  # number of rows fetched at a time while building the index
+SERIAL_BITS = 32  # a position is kept as a single key: book_id << SERIAL_BITS | word_serial
+SERIAL_MASK = (1 << SERIAL_BITS) - 1
+
+
+class PhraseIndex:
+    """maps each word_id to the sorted positions of its instances (as keys, see SERIAL_BITS) and their sentence_serial,
+       thus a phrase is matched by intersecting the positions of its words, each shifted back by its offset within the
+       phrase, rather than by joining word_instance with itself. it costs 12 bytes per word instance.
+       the index is built on a background thread by a single streaming select (see Database.build_phrase_index),
+       meanwhile phrases are searched by SQL. books are kept in segments: the one built
+       at first, and one per book inserted since, thus adding or removing a book doesn't rebuild the index.
+       it's synced with table book before every match (see sync), rather than being updated by every path that
+       inserts or deletes books. it's shared by a Database and the worker Databases it creates, e.g. by searches
+       run on worker threads (see gui/query_worker.py), thus it's synced and matched by a single thread at a time."""
+
+    def __init__(self):
+        self.segments = []  # (word_ids, bounds, keys, sentences, book_ids) of each segment, see build_segment
+        self.books = set()  # ids of the books indexed
+        self.removed = set()  # ids of removed books which are still held by a segment of several books
+        self.loaded = False
+        self.building = False  # whether the index is being built, see start_build
+        self.generation = 0  # number of invalidations so far, thus an index built before the last one is discarded
+        self.lock = threading.Lock()  # guards sync and match, since the index is shared by worker threads
+
+    @staticmethod
+    def available():
+        """:returns whether the index can be used, i.e. whether numpy is installed"""
+        return np is not None
+
+    def start_build(self):
+        """claims the index's build, unless it's built or being built already.
+           :returns generation to pass to load, or None if the index shouldn't be built"""
+        with self.lock:
+            if not self.available() or self.loaded or self.building:
+                return None
+            self.building = True
+            return self.generation
+
+    def end_build(self):
+        """releases the index's build claimed by start_build, whether or not it was built"""
+        with self.lock:
+            self.building = False
+
+    def load(self, connection, generation):
+        """builds the index from every word instance in the DB. rows are streamed rather than fetched at once.
+           the lock isn't held while rows are streamed, thus searches aren't blocked meanwhile.
+           :param generation: see start_build. the index is discarded if it was invalidated meanwhile."""
+        cursor = connection.cursor()
+        try:
+            cursor.execute("SELECT book_id FROM book")
+            books = {book_id for book_id, in cursor.fetchall()}
+            cursor.execute("SELECT word_id, book_id, word_serial, sentence_serial FROM word_instance")
+            segment = self.build_segment(fetch_columns(cursor))
+        finally:
+            cursor.close()
+        with self.lock:
+            if generation != self.generation:
+                return
+            # a book committed in between the two selects is held by the segment, hence it's taken from there as well
+            self.segments = [segment]
+            self.books = books | set(segment[4].tolist())
+            self.removed = set()
+            self.loaded = True
+
+    def sync(self, connection):
+        """adds books inserted to the DB since the index was built, and removes the books deleted from it.
+           a book keeps its book_id as long as it's in the DB, and edited books are inserted under a new book_id,
+           thus comparing ids is enough, unless the DB was reset or imported (see invalidate)."""
+        cursor = connection.cursor()
+        try:
+            cursor.execute("SELECT book_id FROM book")
+            books = {book_id for book_id, in cursor.fetchall()}
+            for book_id in self.books - books:
+                self.remove_book(book_id)
+            for book_id in books - self.books:
+                cursor.execute("SELECT word_id, book_id, word_serial, sentence_serial FROM word_instance "
+                               "WHERE book_id = %s", (book_id,))
+                self.segments.append(self.build_segment(fetch_columns(cursor)))
+                self.books.add(book_id)
+        finally:
+            cursor.close()
+
+    def remove_book(self, book_id):
+        """removes a book's segment. a book held by a segment of several books is skipped by match instead."""
+        self.books.discard(book_id)
+        for i, segment in enumerate(self.segments):
+            if book_id in segment[4]:
+                if len(segment[4]) == 1:
+                    del self.segments[i]
+                else:
+                    self.removed.add(book_id)
+                return
+
+    def invalidate(self):
+        """discards the index, which is rebuilt upon next use. called once the DB is reset or imported."""
+        with self.lock:
+            self.generation += 1
+            self.segments, self.books, self.removed = [], set(), set()
+            self.loaded = False
+
+    @staticmethod
+    def build_segment(columns):
+        """:param columns: arrays of word_id, book_id, word_serial and sentence_serial of the segment's instances.
+           :returns the segment's distinct word_ids, the bounds of each word's instances within the following arrays
+            (sorted by word_id then by position): keys, sentences, and the segment's distinct book_ids."""
+        word_ids, book_ids, serials, sentences = columns
+        keys = (book_ids << SERIAL_BITS) | serials
+        order = np.lexsort((keys, word_ids))
+        word_ids, keys, sentences = word_ids[order], keys[order], sentences[order].astype(np.int32)
+        distinct_word_ids, starts = np.unique(word_ids, return_index=True)
+        return distinct_word_ids, np.append(starts, len(word_ids)), keys, sentences, np.unique(book_ids)
+
+    def get_positions(self, word_id):
+        """:returns keys and sentences of the word's instances within every segment, except removed books"""
+        keys, sentences = [], []
+        for word_ids, bounds, segment_keys, segment_sentences, _ in self.segments:
+            i = np.searchsorted(word_ids, word_id)
+            if i < len(word_ids) and word_ids[i] == word_id:
+                keys.append(segment_keys[bounds[i]:bounds[i + 1]])
+                sentences.append(segment_sentences[bounds[i]:bounds[i + 1]])
+        if not keys:
+            return np.empty(0, np.int64), np.empty(0, np.int32)
+        keys, sentences = np.concatenate(keys), np.concatenate(sentences)
+        if self.removed:
+            kept = ~np.isin(keys >> SERIAL_BITS, list(self.removed))
+            keys, sentences = keys[kept], sentences[kept]
+        return keys, sentences
+
+    def match(self, connection, phrase_words):
+        """finds the occurrences of a phrase: positions at which every word of the phrase appears at its offset from
+           the position, within the position's sentence.
+           words are intersected from the rarest to the most common, thus the candidates only shrink.
+           :param phrase_words: (word_id, offset) of each word of the phrase.
+           :returns book_ids and word_serials of the occurrences (i.e. of the phrase's first word),
+            or None if the phrase can't be matched by the index, e.g. while it's being built."""
+        if not self.available() or not any(offset == 0 for _, offset in phrase_words):
+            return None
+        with self.lock:
+            if not self.loaded:
+                return None
+            self.sync(connection)
+            return self.match_positions(phrase_words)
+
+    def match_positions(self, phrase_words):
+        """match helper function, which intersects the positions of the phrase's words within the index"""
+        positions = sorted(((self.get_positions(word_id), offset) for word_id, offset in phrase_words),
+                           key=lambda item: len(item[0][0]))
+        candidates, candidate_sentences = None, None
+        for (keys, sentences), offset in positions:
+            # instances too close to the start of their book to follow a position by offset are dropped,
+            # since their shifted key would belong to the previous book
+            shifted = (keys & SERIAL_MASK) > offset
+            keys, sentences = keys[shifted] - offset, sentences[shifted]
+            if candidates is None:
+                candidates, candidate_sentences = keys, sentences
+                continue
+            candidates, i, j = np.intersect1d(candidates, keys, assume_unique=True, return_indices=True)
+            same_sentence = candidate_sentences[i] == sentences[j]
+            candidates, candidate_sentences = candidates[same_sentence], candidate_sentences[i][same_sentence]
+        # the word at offset 0 lies at the position itself, thus every word is within the position's sentence
+        return candidates >> SERIAL_BITS, candidates & SERIAL_MASK
+
+
+def fetch_columns(cursor):
+    """:returns the rows of a select executed by cursor as an array per column. rows are fetched in batches."""
+    batches = []
+    while True:
+        rows = cursor.fetchmany(LOAD_BATCH)
+        if not rows:
+            break
+        batches.append(np.array(rows, dtype=np.int64))
+    rows = np.concatenate(batches) if batches else np.empty((0, 4), np.int64)
+    return tuple(rows.T)
@@ -0,0 +1,86 @@
+""" Cache of query results, which is invalidated selectively as the database changes """
+import threading
+from collections import OrderedDict
+
+CACHE_ROWS = 100000  # max number of rows held by the cache at once, least recently used results are evicted first
+ANY_BOOK = ('book', None)  # dependency of results that cover every book, i.e. change whenever any book is added/removed
+PHRASE_INDEX = ('phrase_index', None)  # dependency of phrase results, which are matched anew once the index is built
+
+
+class ResultCache:
+    """maps a query's key (e.g. ('wrd_res', normalized filters, resume token, page size)) to its result,
+       alongside the dependencies of the result: ('book', book_id), ANY_BOOK, ('group', group_id),
+       ('phrase', phrase_id) or PHRASE_INDEX. a change to the DB invalidates only the results that depend on what was
+       changed, e.g. deleting a book drops the results of searches within that book and within all books, though
+       searches within other books are kept. results are evicted in least recently used order once they exceed max_rows.
+       it's shared by a Database and the worker Databases it creates, like WordDictionary."""
+
+    def __init__(self, max_rows=CACHE_ROWS):
+        self.entries = OrderedDict()  # key -> (result, dependencies, number of rows)
+        self.rows = 0
+        self.max_rows = max_rows
+        self.lock = threading.Lock()  # guards changes, since the cache is shared by worker threads
+        self.generation = 0  # number of invalidations so far, see get
+
+    def get(self, key, compute, dependencies, size=len):
+        """:returns the cached result of key, or the result of compute() which is cached under key.
+           :param dependencies: callable() -> dependencies of the result, called only if the result is computed.
+           :param size: callable(result) -> number of rows of the result.
+           compute runs outside the lock (e.g. a search on a worker thread), thus the DB might change meanwhile.
+           the result isn't cached then, since it might be stale by the time it's computed."""
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key][0]
+            generation = self.generation
+        result = compute()
+        self.put(key, result, set(dependencies()), size(result), generation)
+        return result
+
+    def put(self, key, result, dependencies, rows, generation=None):
+        """caches result, unless it's larger than the cache. evicts least recently used results to make room.
+           :param generation: the cache's generation before result was computed. result isn't cached if the cache
+            was invalidated since."""
+        if rows > self.max_rows:
+            return
+        with self.lock:
+            if generation is not None and generation != self.generation:
+                return
+            if key in self.entries:
+                self.rows -= self.entries.pop(key)[2]
+            self.entries[key] = (result, dependencies, rows)
+            self.rows += rows
+            while self.rows > self.max_rows:
+                self.rows -= self.entries.popitem(last=False)[1][2]
+
+    def invalidate(self, *dependencies):
+        """drops every result that depends on any of the given dependencies"""
+        with self.lock:
+            self.generation += 1
+            for key in [key for key, entry in self.entries.items() if not entry[1].isdisjoint(dependencies)]:
+                self.rows -= self.entries.pop(key)[2]
+
+    def invalidate_book(self, book_id=None):
+        """drops the results a book's insertion or removal may change: results that cover every book, and results
+           within the book itself. :param book_id: None if a book was added, since no result is within it yet."""
+        self.invalidate(ANY_BOOK, ('book', book_id))
+
+    def clear(self):
+        """drops every result. called once tables are replaced at once, i.e. when the DB is reset or imported."""
+        with self.lock:
+            self.generation += 1
+            self.entries.clear()
+            self.rows = 0
+
+
+def normalize_filters(filters, by_group=True):
+    """:returns the filters of words_tab (see WordsTab.get_filters) as a hashable key, in which equivalent filters
+        are equal, e.g. a line of ' 3' and of '3'.
+       :param by_group: whether the query filters words by group (see Database.build_wrd_res_query), in which case
+        the word filter is ignored once a group is chosen. otherwise the group is ignored (see build_query_filter)"""
+    book_id, word_id, group = filters[:3]
+    if not by_group:
+        group = 'None'
+    elif group != 'None':
+        word_id = ''
+    return (book_id, word_id, group) + tuple(str(value).strip() for value in filters[3:])
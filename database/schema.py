@@ -1,6 +1,19 @@
 """ This file holds information and constants regarding the schema """
 
-TABLES = ['book', 'word', 'word_instance', 'phrase', 'word_in_phrase', 'group_of_words', 'word_in_group']
+TABLES = ['book', 'book_source', 'book_chunk', 'word', 'word_instance', 'phrase', 'word_in_phrase',
+          'group_of_words', 'word_in_group']
+# tables derived from other tables or from books' files, which are rebuilt rather than exported
+# (see Database.insert_missing_derived, and book_layout which is rebuilt once a book is previewed)
+DERIVED_TABLES = ['word_bigram', 'word_book_freq', 'word_freq', 'book_stats', 'book_layout', 'word_ref']
+META_TABLES = ['schema_version']  # tables that describe the schema itself (see migrations.py)
+# primary key of every table, in the order of its index. tables are exported in this order (see Database.table_to_json)
+PRIMARY_KEYS = {'book': ['book_id'], 'book_source': ['book_id'], 'book_chunk': ['book_id', 'chunk_no'],
+                'word': ['word_id'], 'word_instance': ['word_serial', 'book_id'], 'phrase': ['phrase_id'],
+                'word_in_phrase': ['word_id', 'phrase_id', 'offset'], 'group_of_words': ['group_id'],
+                'word_in_group': ['word_id', 'group_id']}
+
+TBL_SCHEMA_VERSION = """CREATE TABLE IF NOT EXISTS schema_version
+            (version int(10) PRIMARY KEY, applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"""
 
 TBL_WORD = """CREATE TABLE IF NOT EXISTS word
             (word_id int(10) PRIMARY KEY AUTO_INCREMENT ,word_txt VARCHAR(40) NOT NULL UNIQUE)"""
@@ -9,6 +22,11 @@ TBL_BOOK = """ CREATE TABLE IF NOT EXISTS book
             (book_id int(10) PRIMARY KEY AUTO_INCREMENT ,title VARCHAR(40), author VARCHAR(40), date VARCHAR(20), 
             size VARCHAR(20), path VARCHAR(150), UNIQUE(title, author)) """
 
+TBL_BOOK_SOURCE = """ CREATE TABLE IF NOT EXISTS book_source
+            (book_id int(10) PRIMARY KEY, path VARCHAR(150), content_hash CHAR(64), file_size BIGINT, mtime DOUBLE,
+            CONSTRAINT fk_book_id2 FOREIGN KEY (book_id) REFERENCES book(book_id) ON DELETE CASCADE,
+            INDEX idx_path (path), INDEX idx_file_size (file_size)) """  # the file a book was read from
+
 TBL_WORD_INSTANCE = """CREATE TABLE IF NOT EXISTS word_instance 
         (word_id int(10), word_serial int(10), book_id int(10), 
         sentence_serial int(10), line_serial int(10),line_offset int(10), paragraph_serial int(10),
@@ -17,6 +35,51 @@ TBL_WORD_INSTANCE = """CREATE TABLE IF NOT EXISTS word_instance
         CONSTRAINT PK_word PRIMARY KEY (word_serial,book_id),
         INDEX idx_sentence (sentence_serial)) """  # indexing sentence to accelerate phrase query
 
+# pairs of consecutive words within a sentence, keyed by their word_ids to seed phrase searches
+TBL_WORD_BIGRAM = """CREATE TABLE IF NOT EXISTS word_bigram
+        (w1 int(10), w2 int(10), book_id int(10), word_serial int(10),
+        CONSTRAINT fk_book_id3 FOREIGN KEY (book_id) REFERENCES book(book_id) ON DELETE CASCADE,
+        CONSTRAINT PK_bigram PRIMARY KEY (w1,w2,book_id,word_serial)) """
+
+# number of instances of each word within each book, and within all books (alongside the number of books it's in),
+# thus word frequencies are looked up by index rather than counted over word_instance (see insert_book_freq)
+TBL_WORD_BOOK_FREQ = """CREATE TABLE IF NOT EXISTS word_book_freq
+        (word_id int(10), book_id int(10), cnt int(10) UNSIGNED NOT NULL,
+        CONSTRAINT fk_word_id4 FOREIGN KEY (word_id) REFERENCES word(word_id) ON DELETE CASCADE,
+        CONSTRAINT fk_book_id4 FOREIGN KEY (book_id) REFERENCES book(book_id) ON DELETE CASCADE,
+        CONSTRAINT PK_word_book PRIMARY KEY (word_id,book_id),
+        INDEX idx_book_cnt (book_id, cnt)) """
+
+TBL_WORD_FREQ = """CREATE TABLE IF NOT EXISTS word_freq
+        (word_id int(10) PRIMARY KEY, cnt int(10) UNSIGNED NOT NULL, book_cnt int(10) UNSIGNED NOT NULL,
+        CONSTRAINT fk_word_id5 FOREIGN KEY (word_id) REFERENCES word(word_id) ON DELETE CASCADE,
+        INDEX idx_cnt (cnt)) """
+
+# number of references to every word: books that contain it, groups it belongs to and its positions within phrases.
+# words left without references are removed by Database.sweep_words. words that were just inserted have no row yet
+TBL_WORD_REF = """CREATE TABLE IF NOT EXISTS word_ref
+        (word_id int(10) PRIMARY KEY, refcnt int(10) NOT NULL, INDEX idx_refcnt (refcnt),
+        CONSTRAINT fk_word_id6 FOREIGN KEY (word_id) REFERENCES word(word_id) ON DELETE CASCADE) """
+
+# totals of each book, thus the statistics of all books are summed per book rather than counted per word instance
+TBL_BOOK_STATS = """CREATE TABLE IF NOT EXISTS book_stats
+        (book_id int(10) PRIMARY KEY, par_cnt int(10) UNSIGNED NOT NULL, line_cnt int(10) UNSIGNED NOT NULL,
+        sent_cnt int(10) UNSIGNED NOT NULL, word_cnt int(10) UNSIGNED NOT NULL, char_cnt BIGINT UNSIGNED NOT NULL,
+        CONSTRAINT fk_book_id5 FOREIGN KEY (book_id) REFERENCES book(book_id) ON DELETE CASCADE) """
+
+# text of a book, split into chunks of whole lines that are compressed on their own (see txt_parser.get_chunks).
+# first_line is the number of the chunk's first line within the book (zero based)
+TBL_BOOK_CHUNK = """CREATE TABLE IF NOT EXISTS book_chunk
+        (book_id int(10), chunk_no SMALLINT UNSIGNED, first_line MEDIUMINT UNSIGNED NOT NULL,
+        content MEDIUMBLOB NOT NULL, INDEX idx_book_line (book_id, first_line),
+        CONSTRAINT fk_book_id7 FOREIGN KEY (book_id) REFERENCES book(book_id) ON DELETE CASCADE,
+        CONSTRAINT PK_book_chunk PRIMARY KEY (book_id,chunk_no)) """
+
+# byte offset at which every line of a book's file starts, as little endian unsigned ints (see Database.get_line_start)
+TBL_BOOK_LAYOUT = """CREATE TABLE IF NOT EXISTS book_layout
+        (book_id int(10) PRIMARY KEY, line_starts MEDIUMBLOB NOT NULL,
+        CONSTRAINT fk_book_id6 FOREIGN KEY (book_id) REFERENCES book(book_id) ON DELETE CASCADE) """
+
 TBL_GROUP_OF_WORDS = """ CREATE TABLE IF NOT EXISTS group_of_words 
         (group_id int(10) PRIMARY KEY AUTO_INCREMENT,group_name VARCHAR(30) NOT NULL UNIQUE)"""
 
@@ -36,6 +99,10 @@ TBL_WORD_IN_PHRASE = """ CREATE TABLE IF NOT EXISTS word_in_phrase
            CONSTRAINT fk_phrase_id FOREIGN KEY (phrase_id) REFERENCES phrase(phrase_id) ON DELETE CASCADE,
            CONSTRAINT PK_phrase_word PRIMARY KEY (word_id,phrase_id,offset) )"""
 
-TABLE_QUERIES = [TBL_WORD, TBL_BOOK, TBL_WORD_INSTANCE, TBL_GROUP_OF_WORDS, TBL_WORD_IN_GROUP, TBL_PHRASE,
-                 TBL_WORD_IN_PHRASE]
+# every table, created unless it exists (see Database.init_schema). tables that are new to the schema are declared in
+# their current layout. tables that predate migrations.py keep their original layout here (e.g. book.size, the
+# serials of word_instance), and a new DB is brought up to date by the same migrations as an existing one.
+TABLE_QUERIES = [TBL_SCHEMA_VERSION, TBL_WORD, TBL_BOOK, TBL_BOOK_SOURCE, TBL_BOOK_CHUNK, TBL_WORD_INSTANCE,
+                 TBL_WORD_BIGRAM, TBL_WORD_BOOK_FREQ, TBL_WORD_FREQ, TBL_WORD_REF, TBL_BOOK_STATS, TBL_BOOK_LAYOUT,
+                 TBL_GROUP_OF_WORDS, TBL_WORD_IN_GROUP, TBL_PHRASE, TBL_WORD_IN_PHRASE]
 
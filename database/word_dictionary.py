@@ -0,0 +1,67 @@
+""" In-memory dictionary of the words within the database """
+import threading
+
+LOAD_BATCH = 10000  # number of rows fetched at a time while loading the dictionary
+
+
+class WordDictionary:
+    """maps word_txt -> word_id and word_id -> word_txt for every word in the DB.
+       it's loaded upon first use by a single streaming select, and is then kept up to date by the insert and delete
+       paths of Database, rather than being thrown away. it's shared by a Database and the worker Databases it creates.
+       only committed words are added, thus a rolled back transaction never leaves stale entries behind."""
+
+    def __init__(self):
+        self.ids = {}  # word_txt -> word_id
+        self.words = {}  # word_id -> word_txt, by which forgotten ids are removed from ids
+        self.loaded = False
+        self.lock = threading.Lock()  # guards changes, since the dictionary is shared by worker threads
+
+    def load(self, connection):
+        """loads every word in the DB, unless already loaded. rows are streamed rather than fetched at once."""
+        with self.lock:
+            if self.loaded:
+                return
+            cursor = connection.cursor()
+            try:
+                cursor.execute("SELECT word_id, word_txt FROM word")
+                while True:
+                    rows = cursor.fetchmany(LOAD_BATCH)
+                    if not rows:
+                        break
+                    for word_id, word_txt in rows:
+                        self.ids[word_txt] = word_id
+                        self.words[word_id] = word_txt
+            finally:
+                cursor.close()
+            self.loaded = True
+
+    def get_id(self, connection, word):
+        """:returns word_id of the word, or None if the word isn't in the dictionary"""
+        if not self.loaded:
+            self.load(connection)
+        return self.ids.get(word)
+
+    def add(self, word_ids):
+        """adds committed words, given as a dictionary of word_txt -> word_id"""
+        with self.lock:
+            for word_txt, word_id in word_ids.items():
+                self.ids[word_txt] = word_id
+                self.words[word_id] = word_txt
+
+    def forget(self, word_ids):
+        """removes the given word_ids. forgetting a word that still exists is harmless, since a word missing from
+           the dictionary is looked up in the DB (see Database.get_word_id), hence deleting paths forget every word
+           they might have deleted."""
+        with self.lock:
+            for word_id in word_ids:
+                word_txt = self.words.pop(word_id, None)
+                if word_txt is not None and self.ids.get(word_txt) == word_id:
+                    del self.ids[word_txt]
+
+    def invalidate(self):
+        """discards the dictionary, which is reloaded upon next use. called once the word table is replaced at once,
+           i.e. when the DB is reset or imported."""
+        with self.lock:
+            self.ids.clear()
+            self.words.clear()
+            self.loaded = False
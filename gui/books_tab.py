@@ -1,11 +1,13 @@
 import os
+from functools import partial
 from PyQt5.QtGui import QFont, QBrush, QColor
 from PyQt5.QtWidgets import QTableWidgetItem, QFileDialog
 from PyQt5.QtCore import Qt
 from PyQt5 import QtCore, QtGui, QtWidgets
 from msg_box import MsgIcon, display_msg
-from utils import txt_parser
+from utils import txt_parser, ingest
 from utils.style_constants import STYLE_LINE, STYLE_BTN
+from ingest_worker import IngestWorker, ImportWorker
 
 
 class BooksTab(QtWidgets.QWidget):
@@ -15,6 +17,8 @@ class BooksTab(QtWidgets.QWidget):
         self.db = db
         self.db.tune_in_import(self.update_cmbs)  # updates combo boxes and table when importing
         self.book_details = None  # keeps track of current book loaded
+        self.ingest_worker = None  # inserts the last book chosen in the background
+        self.import_worker = None  # imports the last folder chosen in the background
         # Defining Gui attributes:
         self.tbl_books = QtWidgets.QTableWidget(self)
         self.cmb_title = QtWidgets.QComboBox(self)
@@ -46,24 +50,88 @@ class BooksTab(QtWidgets.QWidget):
                 display_msg(MsgIcon.WARNING, "Warning", "Please choose a Gutenberg project text file.")
 
     def insert_book(self):
-        """called by "insert" UI button. inserts a book previously chosen by user. """
-        if self.book_details:
-            book_id = self.db.insert_book(self.book_details)
+        """called by "insert" UI button. inserts a book previously chosen by user on a background worker,
+           while a progress dialog allows user to cancel the insertion. """
+        if self.ingest_worker and self.ingest_worker.isRunning():
+            display_msg(MsgIcon.WARNING, "Attention", "Please wait for the current book to be inserted.")
+        elif self.book_details:
             self.line_title.setText("")
             self.line_author.setText("")
             self.line_date.setText("")
-            if book_id:
-                self.book_details = self.book_details + book_id  # combining tuples: after successful insert, saves book_id.
-                self.cmb_title.addItem(self.book_details[0])
-                self.cmb_author.addItem(self.book_details[1])
-                self.update_book_table()
-                self.extract_words(self.book_details[4])
-                self.db.notify_new_book()  # notify relevant tabs that a new book has been added to the db.
-
+            progress_dialog = QtWidgets.QProgressDialog("Inserting book...", "Cancel", 0,
+                                                        os.path.getsize(self.book_details[4]), self)
+            progress_dialog.setWindowTitle("Insert a Book")
+            progress_dialog.setMinimumDuration(0)
+            progress_dialog.setAutoClose(False)
+            progress_dialog.setAutoReset(False)
+
+            self.ingest_worker = IngestWorker(self.db, self.book_details)
+            self.ingest_worker.progress.connect(partial(self.update_insert_progress, progress_dialog))
+            self.ingest_worker.book_inserted.connect(self.on_book_inserted)
+            self.ingest_worker.failed.connect(partial(display_msg, MsgIcon.WARNING, "Warning"))
+            self.ingest_worker.finished.connect(progress_dialog.close)
+            progress_dialog.canceled.connect(self.ingest_worker.cancel)
+            self.ingest_worker.start()
             self.book_details = None  # resets last book's details
         else:
             display_msg(MsgIcon.WARNING, "Attention", "Please choose a book first.")
 
+    @staticmethod
+    def update_insert_progress(progress_dialog, bytes_read, words_cnt, rate):
+        """updates the progress dialog of insert_book on progress signals of the ingest worker"""
+        progress_dialog.setValue(min(bytes_read, progress_dialog.maximum()))
+        progress_dialog.setLabelText(f"Inserting book... {words_cnt} words ({rate:.0f} words/sec)")
+
+    def on_book_inserted(self, book_details, words_cnt, rate, replaced):
+        """called once the ingest worker has committed the book. """
+        if replaced:  # the book's file was edited, thus its previous version was removed
+            self.db.notify_import()  # stats are recalculated from scratch
+            return
+        self.cmb_title.addItem(book_details[0])
+        self.cmb_author.addItem(book_details[1])
+        self.update_book_table()
+        self.db.notify_new_book()  # notify relevant tabs that a new book has been added to the db.
+
+    def import_folder(self):
+        """called by "Load a Folder" UI button. inserts every book within a folder chosen by user,
+           skipping books already in the database. an interrupted import resumes when the folder is chosen again.
+           the folder is imported by a background worker, while a progress dialog allows user to cancel the import."""
+        if self.import_worker and self.import_worker.isRunning():
+            display_msg(MsgIcon.WARNING, "Attention", "Please wait for the current folder to be imported.")
+            return
+        folder = QFileDialog.getExistingDirectory(self, "pick a folder of books")
+        if not folder:
+            return
+        progress_dialog = QtWidgets.QProgressDialog("Importing books...", "Cancel", 0, 0, self)
+        progress_dialog.setWindowTitle("Import a Folder")
+        progress_dialog.setWindowModality(Qt.WindowModal)
+        progress_dialog.setMinimumDuration(0)
+        progress_dialog.setAutoClose(False)
+        progress_dialog.setAutoReset(False)
+
+        self.import_worker = ImportWorker(self.db, folder)
+        self.import_worker.progress.connect(partial(self.update_import_progress, progress_dialog))
+        self.import_worker.imported.connect(self.on_folder_imported)
+        self.import_worker.failed.connect(partial(display_msg, MsgIcon.WARNING, "Warning"))
+        self.import_worker.finished.connect(progress_dialog.close)
+        progress_dialog.canceled.connect(self.import_worker.cancel)
+        self.import_worker.start()
+
+    @staticmethod
+    def update_import_progress(progress_dialog, handled, overall):
+        """updates the progress dialog of import_folder on progress signals of the import worker"""
+        progress_dialog.setMaximum(overall)
+        progress_dialog.setValue(handled)
+        progress_dialog.setLabelText(f"Importing books... ({handled}/{overall})")
+
+    def on_folder_imported(self, inserted, skipped):
+        """called once the import worker has finished importing a folder, or was canceled."""
+        msg = f"{inserted} books were inserted into the database."
+        if skipped:
+            msg += f"\n{len(skipped)} files couldn't be read and were skipped, e.g.:\n{skipped[0]}"
+        display_msg(MsgIcon.INFORMATION, "Import a Folder", msg)
+        self.db.notify_import()  # stats are recalculated from scratch, since several books were added
+
     def update_cmbs(self):
         """updates multi-selection combo boxes and table when [importing to] / [clearing the] DB.
            author's combo box is updated automatically through "update_authors_on_title_change". """
@@ -96,7 +164,8 @@ class BooksTab(QtWidgets.QWidget):
         for row_pos, row in enumerate(self.db.query_book_table(title, author)):
             self.tbl_books.setRowCount(row_pos + 1)
             for column_pos in range(1, 6):  # skipping attribute book_id.
-                item = QTableWidgetItem(row[column_pos])
+                value = txt_parser.format_size(row[column_pos]) if column_pos == 4 else row[column_pos]  # size
+                item = QTableWidgetItem(value)
                 item.setTextAlignment(Qt.AlignHCenter)
                 if column_pos == 5:  # color blue the path to a book
                     item.setForeground(QBrush(QColor(0, 128, 255)))
@@ -104,25 +173,6 @@ class BooksTab(QtWidgets.QWidget):
                 else:
                     self.tbl_books.setItem(row_pos, column_pos - 1, item)
 
-    def extract_words(self, file_name):
-        """reads words parser and inserts them into the database.
-        to facilitate insertion of values to the DB, values are first stockpiled and only then inserted"""
-        words = set()
-        instances = []
-        book_id = self.book_details[-1]
-
-        for word_data in txt_parser.get_next_word(file_name):
-            words.add('(\'' + word_data[0] + '\')')
-        self.db.insert_mult_word(words)
-
-        for word_data in txt_parser.get_next_word(file_name):
-            # finds the word's id and adds it to the instance's attributes
-            word_id = self.db.get_word_id(word_data[0])[0]
-            instances.append((word_id, word_data[1], book_id,
-                              word_data[2], word_data[3], word_data[4], word_data[5]))
-
-        self.db.insert_mult_word_instance(instances)
-
     def start_file(self):
         """Opens the book the user double clicked. """
         index = self.tbl_books.selectionModel().currentIndex()
@@ -130,6 +180,12 @@ class BooksTab(QtWidgets.QWidget):
         try:
             os.startfile(file_path)
         except WindowsError:
+            # the book's text may be kept within the DB (see ingest.STORE_CONTENT), in which case a copy is opened
+            title, author = index.sibling(index.row(), 0).data(), index.sibling(index.row(), 1).data()
+            restored_path = ingest.restore_book_file(self.db, title, author)
+            if restored_path:
+                os.startfile(restored_path)
+                return
             display_msg(MsgIcon.WARNING, "Warning", "Cannot locate file. "
                                                     "\nCheck whether it was removed from "
                                                     "it's original location")
@@ -138,7 +194,9 @@ class BooksTab(QtWidgets.QWidget):
     def explain(self):
         display_msg(MsgIcon.INFORMATION, "Information",
                     "To open a book, i.e. the original file provided, double click the associated row."
-                    "\nTo remove a book, first choose desired row from the table, then click \"Remove Book\" ")
+                    "\nTo remove a book, first choose desired row from the table, then click \"Remove Book\" "
+                    "\nTo insert every book within a folder, click \"Load a Folder\". "
+                    "An interrupted import resumes once the same folder is chosen again.")
 
     def del_book(self):
         index = self.tbl_books.selectionModel().currentIndex()
@@ -188,6 +246,12 @@ class BooksTab(QtWidgets.QWidget):
         btn_load_book.clicked.connect(self.browse_book)
         btn_load_book.setText("Load a Book")
 
+        btn_load_folder = QtWidgets.QPushButton(self)
+        btn_load_folder.setGeometry(QtCore.QRect(25, 215, 200, 40))
+        btn_load_folder.setStyleSheet(STYLE_BTN)
+        btn_load_folder.clicked.connect(self.import_folder)
+        btn_load_folder.setText("Load a Folder")
+
         btn_question = QtWidgets.QPushButton(self)
         btn_question.setGeometry(QtCore.QRect(1190, 490, 60, 50))
         btn_question.setStyleSheet(STYLE_BTN)
@@ -42,7 +42,6 @@ class GroupTab(QtWidgets.QWidget):
             later adds it to word_in_group with an appropriate id.
             called after clicking on '>>' button.
         """
-        self.db.clear_cache()
         word_txt = self.line_wrd_to_grp.text().strip().lower()  # remove spaces from the rear and the front
         self.line_wrd_to_grp.setText("")
         index = self.list_grp.selectionModel().currentIndex()
@@ -58,13 +57,11 @@ class GroupTab(QtWidgets.QWidget):
             display_msg(MsgIcon.WARNING, "Warning", "Please pick a group to insert the word into")
 
         else:
-            # bypassing the cache while to access the database directly
-            word_id = self.db.get_word_id.__wrapped__(self.db, word_txt)
-            if not word_id:  # if word doesn't exist yet in the DB insert it
-                word_id = self.db.insert_word(word_txt)
+            # inserts the word into the DB if it doesn't exist yet
+            word_id = self.db.get_word_ids([word_txt], insert_missing=True)[word_txt]
             group_id = self.db.get_group_id(group_txt)
 
-            if self.db.insert_word_in_group(word_id[0], group_id):  # if word was inserted successfully
+            if self.db.insert_word_in_group(word_id, group_id):  # if word was inserted successfully
                 self.display_grp_words()
 
     def display_grp_words(self):
@@ -1,4 +1,5 @@
 import os, sys
+import mysql.connector
 
 from PyQt5.QtGui import QFont, QIcon
 from PyQt5 import QtCore, QtGui, QtWidgets
@@ -17,6 +18,8 @@ from words_tab import WordsTab
 from phrase_tab import PhraseTab
 from stats_tab import StatsTab
 
+PING_INTERVAL = 10 * 60 * 1000  # milliseconds between health checks of the DB connection, see keep_alive
+
 
 class Manager(QtWidgets.QMainWindow):
     def __init__(self, db):
@@ -155,6 +158,15 @@ class UiMainWindow:
         self.menu_bar.addAction(menu_file.menuAction())
 
 
+def keep_alive(db):
+    """checks the DB connection periodically, thus it's reconnected if it was dropped (and isn't dropped by the
+       server's wait_timeout meanwhile), rather than failing the next action of user."""
+    try:
+        db.ping()
+    except mysql.connector.Error as error:  # server is unreachable, the connection is checked again later
+        print("failed to reconnect to the database {}".format(error))
+
+
 def start_app():
     app = QtWidgets.QApplication(sys.argv)
     login = LoginForm()
@@ -165,5 +177,9 @@ def start_app():
     manager = Manager(db)
     UiMainWindow(manager)
     manager.show()
+    ping_timer = QtCore.QTimer()
+    ping_timer.timeout.connect(partial(keep_alive, db))
+    ping_timer.start(PING_INTERVAL)
     db.notify_import()  # alerts all tabs to update their content in case database isn't empty
+    db.build_phrase_index()  # built in the background beforehand, rather than upon the first phrase search
     sys.exit(app.exec_())  # app.exec_() will run main thread on our code and the app's event loop
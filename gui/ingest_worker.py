@@ -0,0 +1,83 @@
+import mysql.connector
+from PyQt5.QtCore import QThread, pyqtSignal
+from utils import ingest
+from utils.Exceptions import Abort
+
+
+class IngestWorker(QThread):
+    """inserts a book into the database on a background thread, thus the GUI remains responsive meanwhile.
+       the worker operates over its own pooled connections, and inserts the book and its word instances
+       within a single transaction, which is rolled back if the ingest is canceled or fails."""
+    progress = pyqtSignal(int, int, float)  # bytes read, words inserted, words per second
+    # book details + book_id, words inserted, words per second, whether a previous version of the book was replaced
+    book_inserted = pyqtSignal(object, int, float, bool)
+    canceled = pyqtSignal()
+    failed = pyqtSignal(str)  # reason, to be displayed to user
+
+    def __init__(self, db, book_details):
+        super().__init__()
+        self.db = db
+        self.book_details = book_details
+        self.cancel_requested = False
+
+    def cancel(self):
+        """called from the GUI thread. the worker stops once it reports its next progress."""
+        self.cancel_requested = True
+
+    def report_progress(self, bytes_read, words_cnt, rate):
+        """ingest's progress callback. :returns False if user canceled the ingest."""
+        self.progress.emit(bytes_read, words_cnt, rate)
+        return not self.cancel_requested
+
+    def run(self):
+        try:
+            with self.db.session() as book_db, self.db.session() as words_db, book_db.transaction():
+                result = ingest.add_book(book_db, self.book_details, self.report_progress, words_db)
+            if not result:
+                self.failed.emit("The book is already in the database.")
+                return
+        except Abort:  # the book's transaction was rolled back
+            self.canceled.emit()
+        except (IOError, ValueError, mysql.connector.Error) as error:  # ValueError - the file couldn't be decoded
+            print("failed to insert book {}".format(error))
+            self.failed.emit("Failed to insert the book. could not find / open file, or write to the database.")
+        else:  # the book was committed alongside its instances
+            self.book_inserted.emit(*result)
+
+
+class ImportWorker(QThread):
+    """imports a folder of books on a background thread (see ingest.import_folder), thus the GUI remains responsive
+       meanwhile. the worker operates over its own pooled connection, and the books of each wave over connections of
+       their own. a canceled import stops before its next wave, and resumes from there once the folder is imported
+       again."""
+    progress = pyqtSignal(int, int)  # books handled, overall books
+    imported = pyqtSignal(int, list)  # number of books inserted, paths of the files skipped
+    failed = pyqtSignal(str)  # reason, to be displayed to user
+
+    def __init__(self, db, folder):
+        super().__init__()
+        self.db = db
+        self.folder = folder
+        self.cancel_requested = False
+
+    def cancel(self):
+        """called from the GUI thread. the worker stops before its next wave."""
+        self.cancel_requested = True
+
+    def report_progress(self, handled, overall):
+        """import_folder's progress callback. :returns False if user canceled the import."""
+        self.progress.emit(handled, overall)
+        return not self.cancel_requested
+
+    def run(self):
+        try:
+            with self.db.session() as import_db:
+                inserted, skipped = ingest.import_folder(import_db, self.folder, self.report_progress)
+        except (IOError, mysql.connector.Error) as error:
+            print("failed to import folder {}".format(error))
+            self.failed.emit("Failed to import the folder. could not read its files, or write to the database.")
+        except Exception as error:  # e.g. a crashed worker process, which would otherwise end the import silently
+            print("failed to import folder {}".format(error))
+            self.failed.emit("The import stopped unexpectedly. it resumes once the folder is imported again.")
+        else:
+            self.imported.emit(inserted, skipped)
@@ -0,0 +1,99 @@
+""" Table model of query results, which are fetched from the database page by page """
+import re
+from PyQt5 import QtCore
+from PyQt5.QtCore import Qt
+from database.database import PAGE_SIZE
+
+
+class LazyTableModel(QtCore.QAbstractTableModel):
+    """model of a read-only table of query results. rather than fetching every row at once, the next page of rows is
+       fetched whenever the view scrolls to the end of the rows fetched so far (see canFetchMore / fetchMore),
+       thus only rows the user has reached are ever fetched, and no widget item is created per cell.
+       rows may hold trailing columns that aren't displayed, e.g. the sort key a page resumes from.
+       given a QueryRunner, pages are fetched on a worker thread, and the rows of a page are added once it arrives."""
+
+    def __init__(self, headers, alignment=Qt.AlignCenter, numbered=False):
+        """:param headers: headers of the displayed columns
+           :param numbered: whether the first column displays the row's number (e.g. rank), rather than a value"""
+        super().__init__()
+        self.headers = headers
+        self.alignment = alignment
+        self.numbered = numbered
+        self.rows = []
+        self.fetch_page = None  # callable(after, page_size) -> rows of the page, resume token of the next page
+        self.after = None  # resume token of the next page
+        self.exhausted = True  # whether the last page was fetched
+        self.runner = None  # QueryRunner of the query, if its pages are fetched on a worker thread
+        self.fetching = False  # whether a page is being fetched by runner
+
+    def set_query(self, fetch_page, runner=None):
+        """replaces the table's rows with the results of another query, whose first page is fetched at once.
+           :param fetch_page: callable(after, page_size), e.g. Database.get_wrd_instances_page, see Database.get_page
+           :param runner: QueryRunner by which pages are fetched, in which case fetch_page is callable(db, after,
+            page_size). the page in-flight of the previous query is canceled."""
+        if self.runner:
+            self.runner.cancel()
+        self.beginResetModel()
+        self.rows, self.fetch_page, self.after, self.exhausted = [], fetch_page, None, fetch_page is None
+        self.runner, self.fetching = runner, False
+        self.endResetModel()
+        if self.canFetchMore():
+            self.fetchMore()
+
+    def clear(self):
+        self.set_query(None)
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole:
+            if self.numbered:
+                return str(index.row() + 1) if index.column() == 0 else str(self.rows[index.row()][index.column() - 1])
+            return str(self.rows[index.row()][index.column()])
+        if role == Qt.TextAlignmentRole:
+            return int(self.alignment)
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.headers[section]
+        return None
+
+    def canFetchMore(self, parent=QtCore.QModelIndex()):
+        return not parent.isValid() and not self.exhausted and not self.fetching
+
+    def fetchMore(self, parent=QtCore.QModelIndex()):
+        if not self.runner:
+            self.add_page(self.fetch_page(self.after, PAGE_SIZE))
+            return
+        fetch_page, after = self.fetch_page, self.after
+        self.fetching = True
+        self.runner.submit(lambda db: fetch_page(db, after, PAGE_SIZE), self.add_page, self.stop_fetching)
+
+    def add_page(self, page):
+        """adds the rows of a page fetched by fetchMore. :param page: rows, resume token of the next page"""
+        rows, self.after = page
+        self.fetching = False
+        self.exhausted = self.after is None
+        if rows:
+            self.beginInsertRows(QtCore.QModelIndex(), len(self.rows), len(self.rows) + len(rows) - 1)
+            self.rows.extend(rows)
+            self.endInsertRows()
+
+    def stop_fetching(self):
+        """called once a page failed to be fetched by runner. the rows fetched so far are kept."""
+        self.fetching = False
+        self.exhausted = True
+
+
+def set_label_count(label, count):
+    """displays a number of results after the colon that ends a table's title, e.g. 'Occurrences of Selected Word: 12'.
+       :param count: None clears the number"""
+    suffix = ':</span>' if count is None else f': {count}</span>'
+    label.setText(re.sub(r':[^<:]*</span>', suffix, label.text(), count=1))
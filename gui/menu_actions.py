@@ -1,12 +1,11 @@
 # Ijson is an iterative JSON parser that can process a multi GB json file without
 # encountering a memory shortage by processing the file in small chunks.
-import ijson, json, os
+import base64, ijson, json, os
 from PyQt5.QtWidgets import QFileDialog
 from msg_box import MsgIcon, display_msg
 from database.schema import TABLES
 from utils.Exceptions import Abort
-
-MEM_LIMIT = 50000  # memory capacity limit on number of values to be stored in buffer before being read off.
+from utils import txt_parser
 
 
 def is_action_confirmed(msg):
@@ -50,7 +49,9 @@ def export_db_sql(central_widget, credentials):
     path = QFileDialog.getSaveFileName(central_widget, "Choose save location and a file_name",
                                        'myBackupFile', "(*.sql)")
     if path[0]:  # if a file was selected
-        os.system(f'mysqldump -u {credentials["user"]} -p{credentials["password"]} testdatabase > "{path[0]}"')
+        # --hex-blob dumps binary columns (e.g. the compressed text of book_chunk) as hex, thus they're restored intact
+        os.system(f'mysqldump --hex-blob -u {credentials["user"]} -p{credentials["password"]} testdatabase '
+                  f'> "{path[0]}"')
 
 
 def export_db_csv(db, central_widget):
@@ -75,6 +76,10 @@ def import_to_db_sql(db, central_widget, credentials):
         if path[0]:
             db.reset_db()
             os.system(f'mysql -u {credentials["user"]} -p{credentials["password"]} testdatabase < "{path[0]}"')
+            db.word_dictionary.invalidate()  # words were replaced behind the dictionary's back
+            db.phrase_index.invalidate()  # so is the phrase index, since book_ids may have been reused
+            # tables were replaced by the file's, which may predate migrations or derived tables, thus they're updated
+            db.init_schema(rerun_migrations=True)
         db.notify_import()
 
 
@@ -97,6 +102,9 @@ def import_to_db_json(db, central_widget):
                         eval(import_funcs[i])(db, ijson.items(file, TABLES[i] + '.item'))
                         file.seek(0)  # reset cursor
 
+                db.word_dictionary.invalidate()  # words were imported in bulk, thus the dictionary is reloaded
+                db.phrase_index.invalidate()  # so is the phrase index, since book_ids may have been reused
+                db.insert_missing_derived()  # derived tables aren't exported (see DERIVED_TABLES), thus they're rebuilt
                 db.notify_import()
             except IOError:
                 display_msg(MsgIcon.WARNING, "Warning", "failed to open JSON file."
@@ -105,29 +113,17 @@ def import_to_db_json(db, central_widget):
 
 
 def import_word(db, word_generator):
-    """Reads words from the generator in batches in size equal to a pre-determent limit,
-     then inserting them to the DB, thus handling with potentially large volume of values."""
-    words = []
-    for word in word_generator:
-        words.append((word['word_id'], word['word_txt']))
-        if len(words) > MEM_LIMIT:
-            db.insert_mult_word(words, True)
-            words.clear()
-    db.insert_mult_word(words, True)
+    """Streams words from the generator into the DB, which inserts them in bounded batches,
+     thus handling with potentially large volume of values."""
+    db.insert_mult_word((word['word_id'], word['word_txt']) for word in word_generator)
 
 
 def import_word_instance(db, word_inst_generator):
-    """Reads word instances from the generator in batches of size equal to a pre-determent limit,
-       then inserting them to the DB, thus handling with potentially large volume of values."""
-    instances = []
-    for word_inst in word_inst_generator:
-        instances.append((word_inst['word_id'], word_inst['word_serial'], word_inst['book_id'],
-                          word_inst['sentence_serial'], word_inst['line_serial'], word_inst['line_offset']
-                          , word_inst['paragraph_serial']))
-        if len(instances) > MEM_LIMIT:
-            db.insert_mult_word_instance(instances)
-            instances.clear()
-    db.insert_mult_word_instance(instances)
+    """Streams word instances from the generator into the DB, which inserts them in bounded batches,
+       thus handling with potentially large volume of values."""
+    db.insert_mult_word_instance((word_inst['word_id'], word_inst['word_serial'], word_inst['book_id'],
+                                  word_inst['sentence_serial'], word_inst['line_serial'], word_inst['line_offset'],
+                                  word_inst['paragraph_serial']) for word_inst in word_inst_generator)
 
 
 # the following import functions are similar to the couple the above, other than they don't require
@@ -136,7 +132,20 @@ def import_word_instance(db, word_inst_generator):
 def import_book(db, books_generator):
     for book in books_generator:
         db.insert_book((book['book_id'], book['title'], book['author'], book['date'],
-                        book['size'], book['path']))
+                        txt_parser.size_to_bytes(book['size']), book['path']))
+
+
+def import_book_source(db, source_generator):
+    for source in source_generator:
+        db.insert_book_source(source['book_id'], source['path'], source['content_hash'], source['file_size'],
+                              source['mtime'])
+
+
+def import_book_chunk(db, chunk_generator):
+    """Streams chunks of books' text from the generator into the DB in batches, since they hold the books' whole text.
+       chunks are exported base64 encoded (see database.json_value)."""
+    db.insert_mult_book_chunk((chunk['book_id'], chunk['chunk_no'], chunk['first_line'],
+                               base64.b64decode(chunk['content'])) for chunk in chunk_generator)
 
 
 def import_phrase(db, phrase_generator):
@@ -145,8 +154,8 @@ def import_phrase(db, phrase_generator):
 
 
 def import_word_in_phrase(db, word_phrase_generator):
-    for word_phrase in word_phrase_generator:
-        db.insert_word_in_phrase(word_phrase['word_id'], word_phrase['phrase_id'], word_phrase['offset'])
+    db.insert_mult_word_in_phrase((word_phrase['word_id'], word_phrase['phrase_id'], word_phrase['offset'])
+                                  for word_phrase in word_phrase_generator)
 
 
 def import_group_of_words(db, group_generator):
@@ -155,5 +164,5 @@ def import_group_of_words(db, group_generator):
 
 
 def import_word_in_group(db, word_group_generator):
-    for word_in_group in word_group_generator:
-        db.insert_word_in_group(word_in_group['word_id'], word_in_group['group_id'])
+    db.insert_mult_word_in_group((word_in_group['word_id'], word_in_group['group_id'])
+                                 for word_in_group in word_group_generator)
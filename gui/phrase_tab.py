@@ -1,11 +1,13 @@
 import os, re
+from functools import partial
+from utils import ingest, txt_parser
 from utils.style_constants import STYLE_LINE, STYLE_BTN_TOOLTIP
 from PyQt5.QtGui import QTextCursor, QBrush, QColor
-from PyQt5.QtWidgets import QTableWidgetItem
 from PyQt5 import QtCore, QtGui, QtWidgets
-from PyQt5.QtCore import Qt
 
 from msg_box import MsgIcon, display_msg
+from lazy_table import LazyTableModel, set_label_count
+from query_worker import QueryRunner
 
 
 class PhraseTab(QtWidgets.QWidget):
@@ -16,7 +18,12 @@ class PhraseTab(QtWidgets.QWidget):
         self.db.tune_in_new_book(self.update_phrase_appear)
         self.db.tune_in_import(self.import_update)
         # Defining Gui attributes:
-        self.tbl_phrase = QtWidgets.QTableWidget(self)
+        self.tbl_phrase = QtWidgets.QTableView(self)
+        self.phrase_model = LazyTableModel(["Book", "Author", "Par.", "Sentence", "Line", "Index"])
+        # searches run on worker threads, a new search supersedes the one in-flight
+        self.phrase_runner = QueryRunner(db, 'phrase_search')
+        self.count_runner = QueryRunner(db, 'count')
+        self.lbl_res_phrs = QtWidgets.QLabel(self)
         self.cmb_phrs = QtWidgets.QComboBox(self)
         self.line_input_phrs = QtWidgets.QLineEdit(self)
         self.img = QtWidgets.QLabel(self)
@@ -41,16 +48,9 @@ class PhraseTab(QtWidgets.QWidget):
 
         phrase_id = self.db.insert_phrase(text)
         if phrase_id:  # if phrase has been added to the DB, attribute phrase_words to phrase:
-
-            for offset, word in enumerate(words):
-
-                # bypassing cache to get id straight from the DB to avoid automatically returning
-                # None values from cache, in case word was foreign to DB on last function call.
-                word_id = self.db.get_word_id.__wrapped__(self.db, word)
-
-                if not word_id:  # insert words in phrase that don't exist in DB and get their id
-                    word_id = self.db.insert_word(word)
-                self.db.insert_word_in_phrase(word_id[0], phrase_id, offset)
+            # resolves all of the phrase's words at once, inserting those that don't exist in DB
+            word_ids = self.db.get_word_ids(words, insert_missing=True)
+            self.db.insert_phrase_words(phrase_id, [word_ids[word] for word in words])
             self.cmb_phrs.addItem(text)  # update combo_box
             self.db.notify_stats()  # update stats tab
 
@@ -66,16 +66,18 @@ class PhraseTab(QtWidgets.QWidget):
     def update_phrase_appear(self):
         """ updates phrase occurrences when user selects a phrase or adds a new book. """
         self.txt_phrs_appr.clear()
-        self.tbl_phrase.setRowCount(0)
+        self.phrase_model.clear()
+        self.count_runner.cancel()
+        set_label_count(self.lbl_res_phrs, None)
         phrase_txt = self.cmb_phrs.currentText()
 
         if phrase_txt != '' and phrase_txt != 'Select a Phrase' and self.db.get_sum_books() > 0:
-            for row_pos, row in enumerate(self.db.get_phrase_appear(phrase_txt)):
-                self.tbl_phrase.setRowCount(row_pos + 1)
-                for column_pos in range(6):
-                    item = QTableWidgetItem(str(row[column_pos]))
-                    item.setTextAlignment(Qt.AlignCenter)
-                    self.tbl_phrase.setItem(row_pos, column_pos, item)
+            # occurrences are fetched page by page as user scrolls through them
+            self.phrase_model.set_query(lambda db, after, page_size: db.get_phrase_appear_page(phrase_txt, after,
+                                                                                              page_size),
+                                        self.phrase_runner)
+            self.count_runner.submit(lambda db: db.count_phrase_appear(phrase_txt),
+                                     partial(set_label_count, self.lbl_res_phrs))
 
     def update_preview(self):
         """ writes text surrounding selected word to text browser and highlights it """
@@ -85,9 +87,7 @@ class PhraseTab(QtWidgets.QWidget):
         author = index.sibling(index.row(), 1).data()
         line = int(index.sibling(index.row(), 4).data())
         line_index = int(index.sibling(index.row(), 5).data())
-        path = self.db.get_book_path(title, author)
         phrase_txt = self.cmb_phrs.currentText()  # used to set cursor at the end of the phrase
-        wrd_txt = phrase_txt.split(" ")[0]  # gets the first word of the phrase. used in get_char_offset()
 
         radius = 15
         start, end, relative_line, char_offset = line - radius, 2 * radius, radius, 1
@@ -97,47 +97,22 @@ class PhraseTab(QtWidgets.QWidget):
             relative_line = line
 
         try:
-            with open(path, 'r') as file:
-                for _ in range(start):  # skipping rows in file to starting point
-                    next(file)
-                # writing lines, surrounding the phrase, into the preview
-                for line_no, row in enumerate(file, start=1):
-                    end -= 1
-                    if end < 0:
-                        break
-                    if line_no == relative_line:
-                        char_offset = self.get_char_offset(wrd_txt, row.lower(), line_index)
-
-                    # following 3 rows replaces append() line, to abstain from adding an
-                    # empty line with every row.
-                    self.txt_phrs_appr.moveCursor(QTextCursor.End)
-                    self.txt_phrs_appr.insertPlainText(row)
-                    self.txt_phrs_appr.moveCursor(QTextCursor.End)
-
+            lines = ingest.read_book_lines(self.db, title, author, start, end)
         except IOError:
             display_msg(MsgIcon.WARNING, "Warning", "failed to load preview. \n could not find / open file")
             return
+        for line_no, row in enumerate(lines, start=1):
+            if line_no == relative_line:
+                char_offset = txt_parser.get_word_offset(row, line_index)
+
+            # following 3 rows replaces append() to abstain from adding a new line with every row.
+            self.txt_phrs_appr.moveCursor(QTextCursor.End)
+            self.txt_phrs_appr.insertPlainText(row)
+            self.txt_phrs_appr.moveCursor(QTextCursor.End)
 
         # Marks, within the text preview, the exact phrase instance the user selected:
         self.mark_selected_phrase(relative_line, char_offset, len(phrase_txt))
 
-    def get_char_offset(self, target_word, line, line_index):
-        """ :returns the character index of target_word in line provided"""
-
-        # gets occurrence number of target_word in provided line
-        occurrence = 0
-        for word_index, word in enumerate(re.findall(r'\w+', line)):
-            if word == target_word:
-                occurrence += 1
-            if word_index == line_index:
-                break
-
-        # returns the index of the required (as calculated above) occurrence of target_word
-        matches = re.finditer(r'\b' + target_word + r'\b', line, re.MULTILINE)
-        for num, match in enumerate(matches, start=1):  # start = 1, since occurrence is 1 based index.
-            if num == occurrence:
-                return match.span()[0]
-
     def mark_selected_phrase(self, relative_line, char_offset, phrase_len):
         cursor = self.txt_phrs_appr.textCursor()
         # defining format to mark selected phrase with:
@@ -187,10 +162,9 @@ class PhraseTab(QtWidgets.QWidget):
         lbl_ent_phrase.setText(
             "<html><head/><body><p><span style=\" font-size:18pt; color:#ffffd5;\">Enter a new phrase:</span></p></body></html>")
 
-        lbl_res_phrs = QtWidgets.QLabel(self)
-        lbl_res_phrs.setEnabled(True)
-        lbl_res_phrs.setGeometry(QtCore.QRect(440, 240, 490, 50))
-        lbl_res_phrs.setText(
+        self.lbl_res_phrs.setEnabled(True)
+        self.lbl_res_phrs.setGeometry(QtCore.QRect(390, 240, 590, 50))
+        self.lbl_res_phrs.setText(
             "<html><head/><body><p align=\"center\"><span style=\" font-size:19pt; text-decoration: underline; "
             "color:#ffffd5;\">Occurrences of Selected Phrase:</span></p></body></html>")
 
@@ -211,24 +185,17 @@ class PhraseTab(QtWidgets.QWidget):
         self.tbl_phrase.setStyleSheet("background-color: rgb(255, 255, 213);\n"
                                       "font: bold 16pt \"Segoe UI\";")
         self.tbl_phrase.setVerticalScrollBarPolicy(QtCore.Qt.ScrollBarAlwaysOn)
-        self.tbl_phrase.setColumnCount(6)
-        self.tbl_phrase.setRowCount(0)
-        self.tbl_phrase.setHorizontalHeaderItem(0, QTableWidgetItem("Book"))
+        self.tbl_phrase.setModel(self.phrase_model)
         self.tbl_phrase.setColumnWidth(0, 200)
-        self.tbl_phrase.setHorizontalHeaderItem(1, QTableWidgetItem("Author"))
         self.tbl_phrase.setColumnWidth(1, 200)
-        self.tbl_phrase.setHorizontalHeaderItem(2, QTableWidgetItem("Par."))
         self.tbl_phrase.setColumnWidth(2, 75)
-        self.tbl_phrase.setHorizontalHeaderItem(3, QTableWidgetItem("Sentence"))
         self.tbl_phrase.setColumnWidth(3, 110)
-        self.tbl_phrase.setHorizontalHeaderItem(4, QTableWidgetItem("Line"))
         self.tbl_phrase.setColumnWidth(4, 90)
-        self.tbl_phrase.setHorizontalHeaderItem(5, QTableWidgetItem("Index"))
         self.tbl_phrase.setColumnWidth(5, 105)
         self.tbl_phrase.verticalHeader().setVisible(False)
         self.tbl_phrase.setShowGrid(False)
-        self.tbl_phrase.setEditTriggers(QtWidgets.QTableWidget.NoEditTriggers)  # enable read-only
-        self.tbl_phrase.cellClicked.connect(self.update_preview)
+        self.tbl_phrase.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)  # enable read-only
+        self.tbl_phrase.clicked.connect(self.update_preview)
 
     def input_config(self):
         self.cmb_phrs.setGeometry(QtCore.QRect(480, 190, 511, 31))
@@ -0,0 +1,130 @@
+import threading
+import mysql.connector
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from database.database import QUERY_TIMEOUTS
+from msg_box import MsgIcon, display_msg
+
+QUERY_THREADS = 4  # max number of queries run at once, each over its own pooled connection (see POOL_SIZE)
+ER_QUERY_TIMEOUT = 3024  # error raised by MySQL once a SELECT exceeds its MAX_EXECUTION_TIME
+thread_pool = None  # created on demand by get_thread_pool
+
+
+def get_thread_pool():
+    """:returns the pool of threads queries are run on, which is created upon first use."""
+    global thread_pool
+    if not thread_pool:
+        thread_pool = QThreadPool()
+        thread_pool.setMaxThreadCount(QUERY_THREADS)
+    return thread_pool
+
+
+class QuerySignals(QObject):
+    """signals of a QueryTask, which are delivered to the GUI thread (a QRunnable can't emit signals itself)"""
+    finished = pyqtSignal(object)  # result of the query
+    failed = pyqtSignal(str)  # reason, to be displayed to user
+
+
+class QueryTask(QRunnable):
+    """runs a query on a worker thread over its own pooled connection, whose statements are limited by the
+       MAX_EXECUTION_TIME of the query's class (see QUERY_TIMEOUTS). a task is canceled by cancel, which kills the
+       statement the connection is running, thus a slow query doesn't hold the connection until it completes."""
+
+    def __init__(self, db, query_class, func):
+        """:param func: callable(db) -> result of the query, called with a worker Database (see Database.worker_db)"""
+        super().__init__()
+        self.db = db
+        self.query_class = query_class
+        self.func = func
+        self.signals = QuerySignals()
+        self.canceled = False
+        self.connection_id = None  # id of the connection the task runs over, while it runs
+        self.lock = threading.Lock()  # guards connection_id, thus a connection isn't killed once it's released
+
+    def cancel(self):
+        """called from the GUI thread. the task's result, if any, is discarded."""
+        with self.lock:
+            self.canceled = True
+            if self.connection_id is None:
+                return
+            try:
+                self.db.kill_query(self.connection_id)
+            except mysql.connector.Error as error:  # e.g. the statement has just completed
+                print("failed to kill query {}".format(error))
+
+    def run(self):
+        try:
+            with self.db.session() as worker_db:  # pooled sessions are reset once returned, along with their limit
+                result = self.run_query(worker_db)
+        except mysql.connector.Error as error:  # e.g. every pooled connection is in use
+            if self.canceled:  # the statement was killed by cancel
+                return
+            print("query failed {}".format(error))
+            if error.errno == ER_QUERY_TIMEOUT:
+                self.signals.failed.emit("The search took too long and was stopped. Please narrow it down.")
+            else:
+                self.signals.failed.emit("Failed to search the database.")
+        except Exception as error:  # any other failure, which would otherwise leave the widget awaiting a result
+            if self.canceled:
+                return
+            print("query failed {}".format(error))
+            self.signals.failed.emit("Failed to search the database.")
+        else:
+            if not self.canceled:
+                self.signals.finished.emit(result)
+
+    def run_query(self, worker_db):
+        """run helper function. the connection can be killed by cancel while the query runs."""
+        with self.lock:
+            if self.canceled:
+                return None
+            self.connection_id = worker_db.get_connection_id()
+        try:
+            worker_db.set_max_execution_time(QUERY_TIMEOUTS.get(self.query_class, 0))
+            return self.func(worker_db)
+        finally:
+            with self.lock:
+                self.connection_id = None
+
+
+class QueryRunner(QObject):
+    """runs the queries of a single widget (e.g. the search results of words_tab) on worker threads, thus the GUI
+       remains responsive meanwhile. a widget displays the result of its newest query only, thus submitting a query
+       cancels the one in-flight."""
+
+    def __init__(self, db, query_class):
+        """:param query_class: key of QUERY_TIMEOUTS, by which the queries' execution time is limited"""
+        super().__init__()
+        self.db = db
+        self.query_class = query_class
+        self.task = None  # task in-flight
+
+    def submit(self, func, on_result, on_failure=None):
+        """runs func(db) on a worker thread, superseding the query in-flight.
+           :param on_result: callback(result), called on the GUI thread unless the query was superseded.
+           :param on_failure: callback(), called on the GUI thread once the query failed and user was notified."""
+        self.cancel()
+        task = QueryTask(self.db, self.query_class, func)
+        task.signals.finished.connect(lambda result: self.on_finished(task, on_result, result))
+        task.signals.failed.connect(lambda reason: self.on_failed(task, on_failure, reason))
+        self.task = task
+        get_thread_pool().start(task)
+
+    def cancel(self):
+        """cancels the query in-flight, if any"""
+        if self.task:
+            self.task.cancel()
+            self.task = None
+
+    def on_finished(self, task, on_result, result):
+        if task is not self.task:  # result arrived after the task was superseded
+            return
+        self.task = None
+        on_result(result)
+
+    def on_failed(self, task, on_failure, reason):
+        if task is not self.task:
+            return
+        self.task = None
+        display_msg(MsgIcon.WARNING, "Warning", reason)
+        if on_failure:
+            on_failure()
@@ -1,7 +1,6 @@
 import os, re
-from PyQt5.QtWidgets import QTableWidgetItem
 from PyQt5 import QtCore, QtGui, QtWidgets
-from PyQt5.QtCore import Qt
+from lazy_table import LazyTableModel
 
 
 class StatsTab(QtWidgets.QWidget):
@@ -13,7 +12,8 @@ class StatsTab(QtWidgets.QWidget):
         self.db.tune_in_import(self.import_update)
         self.db.tune_in_stats(self.update_phrase_and_group)
         # Defining Gui attributes:
-        self.tbl_freq = QtWidgets.QTableWidget(self)
+        self.tbl_freq = QtWidgets.QTableView(self)
+        self.freq_model = LazyTableModel(["Rank", "Word", "Frequency"], numbered=True)
         self.box_stats = QtWidgets.QGroupBox(self)
         self.box_word_stats = QtWidgets.QGroupBox(self)
         self.box_char_stats = QtWidgets.QGroupBox(self)
@@ -57,66 +57,29 @@ class StatsTab(QtWidgets.QWidget):
                                   str(self.db.get_sum_phrases()))
 
     def import_update(self):
-        """Piggybacking on existing new_book_update, to update stats from scratch rather
-        than incrementally. clear utility also calls this function."""
-        self.new_book_update(True)
+        """Piggybacking on existing new_book_update, since stats are summed up from scratch either way.
+        clear utility also calls this function."""
+        self.new_book_update()
 
-    def new_book_update(self, importing=False):
-        """Updates widgets in stats_tab when user enters a new book or imports (with flag = true)"""
+    def new_book_update(self):
+        """Updates widgets in stats_tab when user enters a new book or imports"""
         self.update_tbl()
-        self.update_labels(importing)
+        self.update_labels()
 
     def update_tbl(self):
         """Updates words frequency table. """
-        self.tbl_freq.setRowCount(0)
-        for row_num, row in enumerate(self.db.get_wrd_freq()):
-            self.tbl_freq.setRowCount(row_num + 1)
-            for column_pos in range(0, 3):
-                item = QTableWidgetItem(str(row[column_pos - 1])) if column_pos \
-                    else QTableWidgetItem(str(row_num + 1))
-                item.setTextAlignment(Qt.AlignCenter)
-                self.tbl_freq.setItem(row_num, column_pos, item)
-
-    def update_labels(self, importing):
+        # the table holds the top 100 words, thus they're fetched as a single page
+        self.freq_model.set_query(lambda after, page_size: (list(self.db.get_wrd_freq()), None))
+
+    def update_labels(self):
         """Updates labels to represent statistical values regarding current DB state.
-        params: importing - flag that dictates whether stats should:
-        1. be calculated from scratch, when importing or clearing the catch
-        or
-        2. updated with latest book added, when a new book is added to the database,
-        which greatly contributes to run-time performance """
-
-        if importing:
-            last_book_inserted = 'All'
-        else:  # user added a new book to the database
-            last_book_inserted = self.db.get_last_book()
-
-        books = self.db.get_sum_books()
-        size = round(self.db.get_sum_size(), 2)
+        the totals of all books are summed up per book by a single query (see Database.get_stats), rather than
+        added to the totals displayed, thus they remain correct once a book is deleted."""
+        books, size, paragraphs, lines, sentences, words, chars, unq_words = self.db.get_stats()
+        size = round(size / pow(2, 20), 2)
         phrases = self.db.get_sum_phrases()
         groups = self.db.get_sum_groups()
 
-        paragraphs = 0 if not books else self.db.get_sum_par(last_book_inserted)
-        if not importing:
-            paragraphs += int(re.split(r':', self.lbl_par_num.text())[1])
-
-        lines = 0 if not books else self.db.get_sum_line(last_book_inserted)
-        if not importing:
-            lines += int(re.split(r':', self.lbl_line_num.text())[1])
-
-        sentences = 0 if not books else self.db.get_sum_sent(last_book_inserted)
-        if not importing:
-            sentences += int(re.split(r':', self.lbl_sen_num.text())[1])
-
-        words = 0 if not books else self.db.get_overall_words(last_book_inserted)
-        if not importing:
-            words += int(re.split(r':', self.lbl_wrd_num.text())[1])
-
-        unq_words = 0 if not books else self.db.get_unique_words()
-
-        chars = 0 if not books else self.db.get_sum_char(last_book_inserted)
-        if not importing:
-            chars += int(re.split(r':', self.lbl_chr_num.text())[1])
-
         # update the value part of 19 of labels presented to user:
 
         self.lbl_book_num.setText(re.split(r'\d', self.lbl_book_num.text())[0] + str(books))
@@ -187,17 +150,12 @@ class StatsTab(QtWidgets.QWidget):
         self.tbl_freq.setGeometry(QtCore.QRect(20, 60, 401, 751))
         self.tbl_freq.setStyleSheet("background-color: rgb(255, 255, 213); font: bold 16pt \"Segoe UI\";")
         self.tbl_freq.setVerticalScrollBarPolicy(QtCore.Qt.ScrollBarAlwaysOn)
-        self.tbl_freq.setColumnCount(3)
-        self.tbl_freq.setRowCount(0)
-
-        self.tbl_freq.setHorizontalHeaderItem(0, QTableWidgetItem("Rank"))
+        self.tbl_freq.setModel(self.freq_model)
         self.tbl_freq.setColumnWidth(0, 80)
-        self.tbl_freq.setHorizontalHeaderItem(1, QTableWidgetItem("Word"))
         self.tbl_freq.setColumnWidth(1, 160)
-        self.tbl_freq.setHorizontalHeaderItem(2, QTableWidgetItem("Frequency"))
         self.tbl_freq.setColumnWidth(2, 140)
         self.tbl_freq.verticalHeader().setVisible(False)
-        self.tbl_freq.setEditTriggers(QtWidgets.QTableWidget.NoEditTriggers)  # enable read-only
+        self.tbl_freq.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)  # enable read-only
 
     def labels_config(self):
         lbl_wrd_freq = QtWidgets.QLabel(self)
@@ -1,11 +1,14 @@
 import re,os
+from functools import partial
 from msg_box import MsgIcon, display_msg
+from lazy_table import LazyTableModel, set_label_count
+from query_worker import QueryRunner
 
 from PyQt5.QtGui import QFont, QTextCursor, QColor, QBrush
-from PyQt5.QtWidgets import QTableWidgetItem
 from PyQt5 import QtCore, QtGui, QtWidgets
 from PyQt5.QtCore import Qt
 
+from utils import ingest, txt_parser
 from utils.style_constants import STYLE_LINE_TOOLTIP, STYLE_LINE, STYLE_BTN
 
 
@@ -30,8 +33,15 @@ class WordsTab(QtWidgets.QWidget):
         self.db.tune_in_import(self.update)
         self.last_search_filters = []
         # Defining Gui attributes:
-        self.tbl_word_appr = QtWidgets.QTableWidget(self)
-        self.tbl_res = QtWidgets.QTableWidget(self)
+        self.tbl_word_appr = QtWidgets.QTableView(self)
+        self.tbl_res = QtWidgets.QTableView(self)
+        self.word_appr_model = LazyTableModel(["Book", "Author", "Par.", "Sentence", "Line", "Index"], Qt.AlignHCenter)
+        self.res_model = LazyTableModel(["Word", "Instances"])
+        # searches run on worker threads, a new search supersedes the one in-flight
+        self.res_runner = QueryRunner(db, 'word_search')
+        self.appr_runner = QueryRunner(db, 'word_instances')
+        self.appr_count_runner = QueryRunner(db, 'count')
+        self.lbl_appr = QtWidgets.QLabel(self)
         self.box_filter = QtWidgets.QGroupBox(self)
         self.cmb_books = QtWidgets.QComboBox(self.box_filter)
         self.cmb_grp = ComboBox(self.box_filter)
@@ -100,7 +110,6 @@ class WordsTab(QtWidgets.QWidget):
                             "Attention: \n1.) By opting to search for words within a selected group, the single "
                             "word you chose separately will be ignored.\n2.) In case you'd like to incorporate "
                             "it in the search alongside the group, consider adding it to said group.")
-            self.db.clear_cache()
             word_id = self.db.get_word_id(word_txt)
             if word_id:  # handles None in case word doesn't exist in DB, i.e - in the books.
                 word_id = word_id[0]
@@ -120,32 +129,30 @@ class WordsTab(QtWidgets.QWidget):
         """Updates list of results (words) filtered by user (filter func). triggered by "Search" button. """
         # after user clicks "Search" the search parameters will be saved until overridden by next search.
         self.last_search_filters = self.get_filters()
-        self.tbl_res.setRowCount(0)
-        self.tbl_word_appr.setRowCount(0)  # resets tbl_word_appr where instances of last word picked were displayed
+        self.word_appr_model.clear()  # resets tbl_word_appr where instances of last word picked were displayed
+        self.appr_count_runner.cancel()
+        set_label_count(self.lbl_appr, None)
         self.txt_wrd_appr.clear()  # clean preview text area in case it was written to during the last query
-
-        for row_pos, row in enumerate(self.db.get_wrd_res(self.last_search_filters)):
-            self.tbl_res.setRowCount(row_pos + 1)
-            for column_pos in range(0, 2):
-                item = QTableWidgetItem(str(row[column_pos]))
-                item.setTextAlignment(Qt.AlignCenter)
-                self.tbl_res.setItem(row_pos, column_pos, item)
+        # results are fetched page by page as user scrolls through them. the model is given a copy of the filters,
+        # since the word_id within last_search_filters is overridden whenever user picks a word.
+        filters = list(self.last_search_filters) if self.last_search_filters else None
+        self.res_model.set_query(lambda db, after, page_size: db.get_wrd_res_page(filters, after, page_size),
+                                 self.res_runner)
 
     def update_word_instances(self):
         """ word instances are shown based on the state of filters when Search button was pressed,
             thus allowing user to edit filters without necessarily committing to them."""
-        self.db.clear_cache()
         index = self.tbl_res.selectionModel().currentIndex()
         wrd_txt = index.sibling(index.row(), 0).data()
         filters = self.last_search_filters  # use filters user chose at the time of search
         filters[1] = self.db.get_word_id(wrd_txt)[0]  # getting word_id fitting to user's latest choice
-        self.tbl_word_appr.setRowCount(0)
-        for row_pos, row in enumerate(self.db.get_wrd_instances(filters)):
-            self.tbl_word_appr.setRowCount(row_pos + 1)
-            for column_pos in range(0, 6):
-                item = QTableWidgetItem(str(row[column_pos]))
-                item.setTextAlignment(Qt.AlignHCenter)
-                self.tbl_word_appr.setItem(row_pos, column_pos, item)
+        filters = list(filters)
+        self.word_appr_model.set_query(lambda db, after, page_size: db.get_wrd_instances_page(filters, after,
+                                                                                              page_size),
+                                       self.appr_runner)
+        set_label_count(self.lbl_appr, None)
+        self.appr_count_runner.submit(lambda db: db.count_wrd_instances(filters),
+                                      partial(set_label_count, self.lbl_appr))
 
     def update_preview(self):
         """ writes text surrounding selected word to text browser """
@@ -155,7 +162,6 @@ class WordsTab(QtWidgets.QWidget):
         author = index.sibling(index.row(), 1).data()
         line = int(index.sibling(index.row(), 4).data())
         line_index = int(index.sibling(index.row(), 5).data())
-        path = self.db.get_book_path(title, author)
         index = self.tbl_res.selectionModel().currentIndex()  # reusing the above variable "index"
         wrd_txt = index.sibling(index.row(), 0).data()
 
@@ -168,44 +174,22 @@ class WordsTab(QtWidgets.QWidget):
             relative_line = line
 
         try:
-            with open(path, 'r') as file:
-                for _ in range(start):  # skipping rows in file to starting point
-                    next(file)
-                for line_no, row in enumerate(file, start=1):
-                    end -= 1
-                    if end < 0:
-                        break
-                    if line_no == relative_line:
-                        char_offset = self.get_char_offset(wrd_txt, row.lower(), line_index)
-
-                    # following 3 rows replaces append() to abstain from adding a new line with every row.
-                    self.txt_wrd_appr.moveCursor(QTextCursor.End)
-                    self.txt_wrd_appr.insertPlainText(row)
-                    self.txt_wrd_appr.moveCursor(QTextCursor.End)
-
+            lines = ingest.read_book_lines(self.db, title, author, start, end)
         except IOError:
             display_msg(MsgIcon.WARNING, "Warning", "failed to load preview. \n could not find / open file")
             return
+        for line_no, row in enumerate(lines, start=1):
+            if line_no == relative_line:
+                char_offset = txt_parser.get_word_offset(row, line_index)
+
+            # following 3 rows replaces append() to abstain from adding a new line with every row.
+            self.txt_wrd_appr.moveCursor(QTextCursor.End)
+            self.txt_wrd_appr.insertPlainText(row)
+            self.txt_wrd_appr.moveCursor(QTextCursor.End)
 
         # Marks, within the text preview, the exact word instance the user selected:
         self.mark_selected_word(relative_line, char_offset, len(wrd_txt))
 
-    def get_char_offset(self, target_word, line, line_index):
-        """ :returns the character index of target_word in line provided. update_preview's helper func."""
-
-        # gets occurrence number of target_word
-        occurrence = 0
-        for word_index, word in enumerate(re.findall(r'\w+', line)):
-            if word == target_word:
-                occurrence += 1
-            if word_index == line_index:
-                break
-
-        matches = re.finditer(r'\b' + target_word + r'\b', line, re.MULTILINE)
-        for num, match in enumerate(matches, start=1):
-            if num == occurrence:
-                return match.span()[0]
-
     def mark_selected_word(self, relative_line, char_offset, word_len):
         cursor = self.txt_wrd_appr.textCursor()
         # defining format to mark selected word with:
@@ -235,42 +219,31 @@ class WordsTab(QtWidgets.QWidget):
         self.tbl_word_appr.setStyleSheet("background-color: rgb(255, 255, 213);\n"
                                          "font: bold 16pt \"Segoe UI\";")
         self.tbl_word_appr.setVerticalScrollBarPolicy(QtCore.Qt.ScrollBarAlwaysOn)
-        self.tbl_word_appr.setColumnCount(6)
-        self.tbl_word_appr.setRowCount(0)
-        self.tbl_word_appr.setHorizontalHeaderItem(0, QTableWidgetItem("Book"))
+        self.tbl_word_appr.setModel(self.word_appr_model)
         self.tbl_word_appr.setColumnWidth(0, 200)
-        self.tbl_word_appr.setHorizontalHeaderItem(1, QTableWidgetItem("Author"))
         self.tbl_word_appr.setColumnWidth(1, 200)
-        self.tbl_word_appr.setHorizontalHeaderItem(2, QTableWidgetItem("Par."))
         self.tbl_word_appr.setColumnWidth(2, 75)
-        self.tbl_word_appr.setHorizontalHeaderItem(3, QTableWidgetItem("Sentence"))
         self.tbl_word_appr.setColumnWidth(3, 110)
-        self.tbl_word_appr.setHorizontalHeaderItem(4, QTableWidgetItem("Line"))
         self.tbl_word_appr.setColumnWidth(4, 90)
-        self.tbl_word_appr.setHorizontalHeaderItem(5, QTableWidgetItem("Index"))
         self.tbl_word_appr.setColumnWidth(5, 95)
         self.tbl_word_appr.setShowGrid(False)
-        self.tbl_word_appr.setEditTriggers(QtWidgets.QTableWidget.NoEditTriggers)  # enable read-only
+        self.tbl_word_appr.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)  # enable read-only
 
         self.tbl_word_appr.verticalHeader().setVisible(False)
-        self.tbl_word_appr.cellClicked.connect(self.update_preview)
+        self.tbl_word_appr.clicked.connect(self.update_preview)
 
     def tbl_res_config(self):
         self.tbl_res.setGeometry(QtCore.QRect(50, 250, 311, 570))
         self.tbl_res.setStyleSheet("background-color: rgb(255, 255, 213); font: bold 16pt \"Segoe UI\"; ")
         self.tbl_res.setVerticalScrollBarPolicy(QtCore.Qt.ScrollBarAlwaysOn)
-        self.tbl_res.setColumnCount(2)
-        self.tbl_res.setRowCount(0)
+        self.tbl_res.setModel(self.res_model)
         self.tbl_res.verticalHeader().setVisible(False)
-        self.tbl_res.setHorizontalHeaderItem(0, QTableWidgetItem("Word"))
+        self.tbl_res.horizontalHeader().setFont(QFont("Segoe UI", 16, QFont.Bold))
         self.tbl_res.setColumnWidth(0, 150)
-        self.tbl_res.horizontalHeaderItem(0).setFont(QFont("Segoe UI", 16, QFont.Bold))
-        self.tbl_res.setHorizontalHeaderItem(1, QTableWidgetItem("Instances"))
         self.tbl_res.setColumnWidth(1, 140)
-        self.tbl_res.horizontalHeaderItem(1).setFont(QFont("Segoe UI", 16, QFont.Bold))
         self.tbl_res.setShowGrid(False)
-        self.tbl_res.cellClicked.connect(self.update_word_instances)
-        self.tbl_res.setEditTriggers(QtWidgets.QTableWidget.NoEditTriggers)
+        self.tbl_res.clicked.connect(self.update_word_instances)
+        self.tbl_res.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
 
     def labels_config(self):
         self.box_filter.setGeometry(QtCore.QRect(60, 10, 1171, 171))
@@ -285,9 +258,8 @@ class WordsTab(QtWidgets.QWidget):
             "<html><head/><body><p align=\"center\"><span style=\" font-size:20pt; text-decoration: underline; "
             "color:#ffffd5;\">Search Results:</span></p></body></html>")
 
-        lbl_appr = QtWidgets.QLabel(self)
-        lbl_appr.setGeometry(QtCore.QRect(590, 190, 431, 51))
-        lbl_appr.setText(
+        self.lbl_appr.setGeometry(QtCore.QRect(540, 190, 531, 51))
+        self.lbl_appr.setText(
             "<html><head/><body><p align=\"center\"><span style=\" font-size:20pt; text-decoration: underline; "
             "color:#ffffd5;\">Occurrences of Selected Word:</span></p></body></html>")
 
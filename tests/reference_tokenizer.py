@@ -0,0 +1,32 @@
+""" reference copy of the per-line tokenizer that txt_parser.read_word_batches replaced, kept to check the engine's
+    output against it (see test_txt_parser.py and benchmarks/tokenizer_benchmark.py) """
+import re
+
+
+def read_words(path):
+    """a word generator that returns a word with the following parameters analysed:
+        word = the actual word.
+        wrd_cnt, sent_cnt, line_cnt, par_cnt = word/sentence/line/paragraph number in relation to beginning of text.
+        line_offset = word index since the beginning of the line. only parameter that is zero based.
+        """
+    line_with_txt = - 1  # marks the last non empty line encountered
+    wrd_cnt = 0
+    par_cnt = 1
+    sent_cnt = 1
+    with open(path, 'r') as file:
+        for line_cnt, line in enumerate(file, start=1):
+            line_offset = -1  # initial val = -1 so index of word within line will be zero based
+            if line != '\n':
+                line_with_txt = line_cnt
+            elif line_cnt == line_with_txt + 1:  # current line == '\n' and last line wasn't
+                par_cnt += 1
+            sentences = list(filter(None, re.split(r'[!?.]', line)))  # filter removes empty elements
+            for i in range(len(sentences)):
+                if i > 0:  # if text appears after [!?.] it is considered a new sentence.
+                    sent_cnt += 1
+                words_in_sent = re.findall(r'\w+', sentences[i])
+                for word in words_in_sent:
+                    if word:
+                        line_offset += 1
+                        wrd_cnt += 1
+                        yield word.lower(), wrd_cnt, sent_cnt, line_cnt, line_offset, par_cnt
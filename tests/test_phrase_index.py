@@ -0,0 +1,181 @@
+""" checks that PhraseIndex.match finds the same occurrences as a brute-force evaluation of the phrase over the word
+    instances, once built, synced with books inserted and deleted since, and at the start of a book.
+    the DB is stood in for by a connection over in-memory rows (see FakeConnection), thus no server is required.
+    run from the repo's root: python -m unittest discover tests """
+import random, unittest
+from database.phrase_index import PhraseIndex, SERIAL_MASK
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+SEED = 11  # seed of the random books and phrases, thus a failure can be reproduced
+BOOKS = 6  # number of random books
+BOOK_WORDS = (50, 400)  # range of the number of words of a random book
+VOCABULARY = 12  # number of distinct words of the random books, few so phrases recur
+SENTENCE_WORDS = (1, 8)  # range of the number of words of a sentence
+PHRASES = 200  # number of random phrases matched per check
+
+
+class FakeCursor:
+    """cursor over the rows of a FakeConnection, which answers the selects PhraseIndex runs"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.rows = []
+
+    def execute(self, query, params=()):
+        if 'FROM book' in query:
+            self.rows = [(book_id,) for book_id in sorted(self.connection.books)]
+        elif 'WHERE book_id' in query:
+            self.rows = [row for row in self.connection.instances if row[1] == params[0]]
+        else:
+            self.rows = list(self.connection.instances)
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def fetchmany(self, size):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """stands in for a connection to the DB, whose word instances are held as rows of
+       (word_id, book_id, word_serial, sentence_serial)"""
+
+    def __init__(self):
+        self.books = set()
+        self.instances = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def add_book(self, book_id, words, first_serial=1):
+        """adds a book of words, given as a list of sentences, each a list of word_ids"""
+        serial = first_serial
+        for sentence_serial, sentence in enumerate(words, start=1):
+            for word_id in sentence:
+                self.instances.append((word_id, book_id, serial, sentence_serial))
+                serial += 1
+        self.books.add(book_id)
+
+    def remove_book(self, book_id):
+        self.books.discard(book_id)
+        self.instances = [row for row in self.instances if row[1] != book_id]
+
+
+def random_book(rand):
+    """:returns words of a random book, as a list of sentences"""
+    sentences, words = [], rand.randint(*BOOK_WORDS)
+    while words > 0:
+        sentence = [rand.randint(1, VOCABULARY) for _ in range(min(words, rand.randint(*SENTENCE_WORDS)))]
+        sentences.append(sentence)
+        words -= len(sentence)
+    return sentences
+
+
+def random_phrase(rand, connection):
+    """:returns (word_id, offset) of each word of a phrase: either words that follow an instance of the DB, thus the
+        phrase occurs at least once, or random words"""
+    length = rand.randint(1, 4)
+    if rand.random() < 0.7 and connection.instances:
+        start = rand.randrange(len(connection.instances))
+        rows = connection.instances[start:start + length]
+        return [(row[0], offset) for offset, row in enumerate(rows)]
+    return [(rand.randint(1, VOCABULARY), offset) for offset in range(length)]
+
+
+def brute_force(connection, phrase_words):
+    """:returns sorted (book_id, word_serial) of the positions at which every word of the phrase appears at its
+        offset from the position, within the position's sentence"""
+    instances = {(book_id, serial): (word_id, sentence) for word_id, book_id, serial, sentence in connection.instances}
+    occurrences = []
+    for (book_id, serial), (_, sentence) in instances.items():
+        if all(instances.get((book_id, serial + offset)) == (word_id, sentence) for word_id, offset in phrase_words):
+            occurrences.append((book_id, serial))
+    return sorted(occurrences)
+
+
+def match(index, connection, phrase_words):
+    """:returns sorted (book_id, word_serial) of the occurrences PhraseIndex.match finds"""
+    book_ids, serials = index.match(connection, phrase_words)
+    return sorted(zip(book_ids.tolist(), serials.tolist()))
+
+
+def build(connection):
+    """:returns a PhraseIndex built from the connection's rows, as Database.build_phrase_index builds it"""
+    index = PhraseIndex()
+    index.load(connection, index.start_build())
+    index.end_build()
+    return index
+
+
+@unittest.skipIf(np is None, "the PhraseIndex requires numpy")
+class TestPhraseIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.rand = random.Random(SEED)
+        self.connection = FakeConnection()
+        for book_id in range(1, BOOKS + 1):
+            self.connection.add_book(book_id, random_book(self.rand))
+
+    def assert_matches(self, index):
+        for _ in range(PHRASES):
+            phrase_words = random_phrase(self.rand, self.connection)
+            with self.subTest(phrase_words=phrase_words):
+                self.assertEqual(match(index, self.connection, phrase_words),
+                                 brute_force(self.connection, phrase_words))
+
+    def test_build(self):
+        self.assert_matches(build(self.connection))
+
+    def test_sync_inserted_books(self):
+        index = build(self.connection)
+        for book_id in range(BOOKS + 1, BOOKS + 4):
+            self.connection.add_book(book_id, random_book(self.rand))
+        self.assert_matches(index)
+        self.assertEqual(len(index.segments), 4)  # a segment per book inserted since the index was built
+
+    def test_sync_removed_books(self):
+        index = build(self.connection)
+        self.connection.add_book(BOOKS + 1, random_book(self.rand))
+        self.assert_matches(index)
+        self.connection.remove_book(2)  # held by the segment of several books, thus skipped by match
+        self.connection.remove_book(BOOKS + 1)  # held by a segment of its own, which is removed
+        self.assert_matches(index)
+        self.assertEqual(index.removed, {2})
+        self.assertEqual(len(index.segments), 1)
+
+    def test_book_start(self):
+        # the last word of book 1 lies right before book 2 once positions are keys (book_id << SERIAL_BITS | serial),
+        # thus a word at the start of book 2, shifted back by its offset, mustn't be matched against book 1
+        connection = FakeConnection()
+        connection.instances = [(1, 1, SERIAL_MASK, 1), (2, 2, 1, 1), (1, 2, 2, 1), (2, 2, 3, 1)]
+        connection.books = {1, 2}
+        index = build(connection)
+        for phrase_words in ([(1, 0), (2, 1)], [(1, 0), (2, 2)], [(2, 0)]):
+            with self.subTest(phrase_words=phrase_words):
+                self.assertEqual(match(index, connection, phrase_words), brute_force(connection, phrase_words))
+        self.assertEqual(match(index, connection, [(1, 0), (2, 1)]), [(2, 2)])
+
+    def test_invalidated_build(self):
+        index = PhraseIndex()
+        generation = index.start_build()
+        index.invalidate()  # e.g. the DB was reset while the index was being built
+        index.load(self.connection, generation)
+        index.end_build()
+        self.assertFalse(index.loaded)
+        self.assertIsNone(index.match(self.connection, [(1, 0)]))
+
+    def test_phrase_without_first_word(self):
+        self.assertIsNone(build(self.connection).match(self.connection, [(1, 1), (2, 2)]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+""" checks that the tokenizer engine (txt_parser.read_word_batches) yields the same words as the per-line generator it
+    replaced (see reference_tokenizer.py), on the test books and on random edge-case files, at any block size.
+    run from the repo's root: python -m unittest discover tests """
+import locale, os, random, sys, tempfile, unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'gui'))  # for msg_box
+from utils import txt_parser
+from tests import reference_tokenizer
+
+BOOKS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'test input', 'books')
+BOOK_BLOCK_SIZES = [7, 4096, txt_parser.BLOCK_SIZE]  # block sizes the test books are read at
+SMALL_BOOK_SIZE = pow(2, 16)  # books up to this size are also read a byte at a time
+BLOCK_SIZES = [1, 2, 3, 5, 16, 64, 4096, txt_parser.BLOCK_SIZE]  # block sizes the random files are read at
+RANDOM_FILES = 300  # number of random edge-case files
+SEED = 6  # seed of the random files, thus a failure can be reproduced
+# pieces the random files are made of: words, punctuation, white spaces and every kind of line ending
+ASCII_PIECES = ['word', 'Word', 'WORD', 'a', 'x_y', '_', '42', 'it\'s', ' ', '  ', '\t', '.', '!', '?', '...', '?!',
+                ',', ';', '-', '"', '(', ')', '\n', '\n\n', '\r\n', '\r', '\r\n\r\n', ' \n', '.\n']
+# non ascii pieces: a character lowered to 2 characters, combining marks, nbsp, non ascii digits, letters and symbols
+UNICODE_PIECES = ['İ', 'İ', 'é', 'café', ' ', '٣٤', '²', 'ÉtÉ',
+                  'ß', 'Σσ', '’', '—', '“', '…', '中文', ' ', '\u0085']
+
+
+def reference_words(path):
+    """:returns words of the file as yielded by the replaced generator"""
+    return list(reference_tokenizer.read_words(path))
+
+
+def engine_words(path, block_size):
+    """:returns words of the file as yielded by the engine, a tuple per word"""
+    words = []
+    for batch in txt_parser.read_word_batches(path, block_size):
+        words.extend(zip(*batch))
+    return words
+
+
+def random_text(rand):
+    """:returns random text made of the edge-case pieces"""
+    pieces = ASCII_PIECES
+    if locale.getpreferredencoding(False).lower().replace('-', '') == 'utf8':  # files are read in the locale's encoding
+        pieces = pieces + UNICODE_PIECES
+    return ''.join(rand.choice(pieces) for _ in range(rand.randint(0, 200)))
+
+
+class TestReadWordBatches(unittest.TestCase):
+
+    def assert_same_words(self, path, block_sizes):
+        expected = reference_words(path)
+        for block_size in block_sizes:
+            with self.subTest(path=path, block_size=block_size):
+                self.assertEqual(engine_words(path, block_size), expected)
+
+    def test_books(self):
+        books = [os.path.join(BOOKS_DIR, name) for name in sorted(os.listdir(BOOKS_DIR))]
+        self.assertTrue(books)
+        for path in books:
+            block_sizes = BOOK_BLOCK_SIZES
+            if os.path.getsize(path) <= SMALL_BOOK_SIZE:
+                block_sizes = [1] + block_sizes
+            self.assert_same_words(path, block_sizes)
+
+    def test_random_files(self):
+        rand = random.Random(SEED)
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'book.txt')
+            for _ in range(RANDOM_FILES):
+                with open(path, 'w', newline='') as file:  # keeps line endings as written
+                    file.write(random_text(rand))
+                self.assert_same_words(path, BLOCK_SIZES)
+
+    def test_edge_cases(self):
+        texts = ['', '\n', '\n\n\n', 'word', 'word\n', '.', '...\n', 'a.b', 'a. b.\n\nc', '\r\nA\rB\r\n\r\nC.',
+                 'end without new line.', ' \n \n', '\n\nword\n\n\n\nword']
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'book.txt')
+            for text in texts:
+                with open(path, 'w', newline='') as file:
+                    file.write(text)
+                self.assert_same_words(path, BLOCK_SIZES)
+
+    def test_tokenize_book(self):
+        path = os.path.join(BOOKS_DIR, 'test_book.txt')
+        _, vocab, (word_indices, sentences, lines, offsets, paragraphs), _ = txt_parser.tokenize_book(path)
+        words = [(vocab[index], wrd_cnt, sent_cnt, line_cnt, line_offset, par_cnt) for wrd_cnt, (
+            index, sent_cnt, line_cnt, line_offset, par_cnt) in enumerate(
+            zip(word_indices, sentences, lines, offsets, paragraphs), start=1)]
+        self.assertEqual(words, reference_words(path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,322 @@
+""" Book ingest pipeline: tokenizes a book once and streams its word instances into the database """
+import hashlib, json, os, tempfile, time
+from itertools import islice, repeat
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from utils import txt_parser
+from utils.Exceptions import Abort
+
+WAVE_FACTOR = 2  # books tokenized per wave, relative to the number of worker processes
+LOAD_THREADS = 8  # max number of books loaded at once, each over its own pooled connection (see POOL_SIZE)
+PROGRESS_ROWS = 5000  # number of rows streamed between calls to ingest_book's progress callback
+CHECKPOINT_FILE = '.library_import.json'  # saved within an imported folder to keep track of the import's progress
+STORE_CONTENT = True  # whether books' text is kept within the DB as well (see book_chunk), thus they're previewed
+# and opened even if their files are moved or unreachable
+# states of a book's file in relation to the DB, see find_source:
+SOURCE_NEW, SOURCE_UNCHANGED, SOURCE_DUPLICATE, SOURCE_EDITED = range(4)
+
+
+def add_book(db, book_details, progress=None, words_db=None):
+    """inserts a book and its word instances within db's current transaction, which the caller commits (see
+       Database.transaction), unless its file is already in the DB (see find_source). a book whose file was edited
+       since it was inserted is replaced within the same transaction.
+       :param progress, words_db: see ingest_book
+       :returns book details + book_id, number of words inserted, words per second and whether a previous version
+        of the book was replaced, or None if the book is already in the DB."""
+    status, book_id = find_source(db, book_details[4])
+    if status in (SOURCE_UNCHANGED, SOURCE_DUPLICATE):
+        return None
+    if status == SOURCE_EDITED:
+        db.del_book_rows(book_id, commit=False)
+    new_book_id = db.insert_book(book_details, commit=False)
+    if not new_book_id:  # another book of the same title and author
+        db.connection.rollback()
+        return None
+    words_cnt, rate = ingest_book(db, new_book_id[0], book_details[4], progress, words_db)
+    if status == SOURCE_EDITED:  # words of the previous version that the new one doesn't contain
+        db.sweep_words(commit=False)
+    return book_details + new_book_id, words_cnt, rate, status == SOURCE_EDITED
+
+
+def find_source(db, path):
+    """looks a book's file up among the files books were read from, by its path, size and modification time.
+       thus an unchanged file costs a single stat and an indexed lookup rather than being read.
+       the file's content is hashed beforehand only if the DB holds a book of the same size.
+       :returns one of SOURCE_* and the id of the book the file matched (None if SOURCE_NEW)"""
+    stat = os.stat(path)
+    source = db.get_book_source(path)
+    if source and tuple(source[1:]) == (stat.st_size, stat.st_mtime):
+        return SOURCE_UNCHANGED, source[0]
+    books_of_size = db.get_book_hashes(stat.st_size)
+    if books_of_size:
+        content_hash = txt_parser.get_content_hash(path)
+        for book_id, book_hash in books_of_size:
+            if book_hash == content_hash:
+                if source and source[0] == book_id:  # file was touched rather than edited
+                    db.update_book_source(book_id, stat.st_size, stat.st_mtime)
+                    return SOURCE_UNCHANGED, book_id
+                return SOURCE_DUPLICATE, book_id
+    if source:
+        return SOURCE_EDITED, source[0]
+    return SOURCE_NEW, None
+
+
+def ingest_book(db, book_id, path, progress=None, words_db=None):
+    """reads the words of a book in a single pass and streams their instances into the database.
+       the distinct words of each batch are resolved to word_ids with set-based queries,
+       rather than querying the DB per word. the book's content is hashed along the way, and its source
+       (see find_source), derived rows (see Database.insert_book_derived) and file rows (see insert_file_rows) are
+       inserted alongside its instances, within db's current transaction, which the caller commits
+       (see Database.transaction).
+       :param progress: callback(bytes read, words inserted, words per second), returns False to cancel the ingest,
+        in which case Abort is raised before the instances are committed.
+       :param words_db: Database through which words are resolved. new words are committed as soon as they're
+        inserted, thus a separate connection lets db keep the book within a single transaction. defaults to db.
+       :returns number of words inserted and the rate of insertion in words per second."""
+    start = time.perf_counter()
+    stat = os.stat(path)
+    content_hash = hashlib.sha256()
+    words_cnt = db.insert_mult_word_instance(get_instances(words_db or db, book_id, path, content_hash, progress),
+                                             commit=False)
+    insert_file_rows(db, book_id, path)  # ahead of the derived rows, which lock the rows of words shared by books
+    db.insert_book_derived(book_id, commit=False)
+    db.insert_book_source(book_id, path, content_hash.hexdigest(), stat.st_size, stat.st_mtime, commit=False)
+    elapsed = time.perf_counter() - start
+    return words_cnt, (words_cnt / elapsed if elapsed else 0)
+
+
+def get_instances(db, book_id, path, content_hash, progress=None):
+    """generator of the book's word_instance rows. only a single batch of words is held in memory at a time.
+       :param content_hash: hash object, updated with the book's content as it's read.
+       :param progress: see ingest_book. called every PROGRESS_ROWS rows."""
+    start, bytes_read, words_cnt = time.perf_counter(), 0, 0
+
+    def on_read(block, position):
+        nonlocal bytes_read
+        bytes_read = position
+        content_hash.update(block.encode())
+
+    for words, wrd_cnts, sentences, lines, offsets, paragraphs in txt_parser.read_word_batches(path,
+                                                                                              on_read=on_read):
+        word_ids = db.get_word_ids(words, insert_missing=True)
+        rows = zip(map(word_ids.__getitem__, words), wrd_cnts, repeat(book_id), sentences, lines, offsets, paragraphs)
+        if not progress:
+            yield from rows
+            continue
+        for i in range(0, len(words), PROGRESS_ROWS):
+            yield from islice(rows, PROGRESS_ROWS)
+            words_cnt += min(PROGRESS_ROWS, len(words) - i)
+            elapsed = time.perf_counter() - start
+            if not progress(bytes_read, words_cnt, words_cnt / elapsed if elapsed else 0):
+                raise Abort()
+
+
+def ingest_books(db, books, workers=None):
+    """inserts several books at once. books are tokenized in parallel by a pool of processes, in waves.
+       the vocabulary of each wave is merged against table word once, then every book is loaded over its own pooled
+       connection, while the next wave is being tokenized. a book's row is committed alongside its instances (see
+       load_book), thus a book that fails to load leaves nothing behind.
+       :param books: book details, as returned by txt_parser.get_book_details.
+       :returns list of (book details + book_id, number of words inserted) of every book inserted,
+        the overall rate of insertion in words per second, and paths of books that couldn't be read (e.g. files
+        that can't be decoded). books already in the DB are skipped."""
+    start = time.perf_counter()
+    workers = workers or os.cpu_count()
+    existing = set(db.get_book_titles_authors())
+    pending_books = {}  # path -> book details
+    for book_details in books:
+        if tuple(book_details[:2]) not in existing:  # checked again once the book is inserted, see load_book
+            pending_books[book_details[4]] = book_details
+
+    paths = list(pending_books)
+    wave_size = workers * WAVE_FACTOR
+    waves = [paths[i:i + wave_size] for i in range(0, len(paths), wave_size)]
+    results, unreadable = [], []
+    with ProcessPoolExecutor(workers) as processes, ThreadPoolExecutor(min(workers, LOAD_THREADS)) as threads:
+        pending = [processes.submit(txt_parser.tokenize_book, path) for path in waves[0]] if waves else []
+        for wave_no in range(len(waves)):
+            tokenized = []
+            for path, future in zip(waves[wave_no], pending):
+                try:
+                    tokenized.append(future.result())
+                except (IOError, ValueError) as error:  # book couldn't be read or decoded, thus it's skipped
+                    print("failed to read book {} ({})".format(path, error))
+                    unreadable.append(path)
+            if wave_no + 1 < len(waves):  # next wave is tokenized while the current one is being loaded
+                pending = [processes.submit(txt_parser.tokenize_book, path) for path in waves[wave_no + 1]]
+
+            word_ids = resolve_vocabulary(db, tokenized)
+            loads = [threads.submit(load_book, db, pending_books[path], vocab, columns, source, word_ids)
+                     for path, vocab, columns, source in tokenized]
+            for load in loads:
+                result = load.result()
+                if result:
+                    results.append(result)
+
+    elapsed = time.perf_counter() - start
+    words_cnt = sum(book_words for _, book_words in results)
+    return results, (words_cnt / elapsed if elapsed else 0), unreadable
+
+
+def resolve_vocabulary(db, tokenized):
+    """ingest_books helper function. merges the vocabularies of tokenized books and resolves them against the DB.
+       :returns a dictionary of word_txt -> word_id"""
+    return db.get_word_ids(set().union(*(vocab for _, vocab, _, _ in tokenized)), insert_missing=True)
+
+
+def load_book(db, book_details, vocab, columns, source, word_ids):
+    """ingest_books helper function, run by a worker thread. inserts a tokenized book and loads its instances over a
+       pooled connection, and commits them alongside the book's source, derived rows and file rows (see
+       insert_file_rows). nothing is committed if any of them fails.
+       :returns book details + book_id and number of instances inserted, or None if the DB already holds a book of
+        the same title and author"""
+    path = book_details[4]
+    with db.session() as worker_db, worker_db.transaction():
+        book_id = worker_db.insert_book(book_details, commit=False)
+        if not book_id:
+            return None
+        words_cnt = worker_db.insert_mult_word_instance(get_book_instances(book_id[0], vocab, columns, word_ids),
+                                                        commit=False)
+        insert_file_rows(worker_db, book_id[0], path)  # see ingest_book
+        worker_db.insert_book_derived(book_id[0], commit=False)
+        worker_db.insert_book_source(book_id[0], path, *source, commit=False)
+        return book_details + book_id, words_cnt
+
+
+def insert_file_rows(db, book_id, path):
+    """inserts the rows read from a book's file, within the current transaction: its layout (see read_book_lines),
+       and if STORE_CONTENT, its text as compressed chunks (see txt_parser.get_chunks)"""
+    db.insert_book_layout(book_id, txt_parser.get_line_starts(path), commit=False)
+    if STORE_CONTENT:
+        db.insert_mult_book_chunk(((book_id, chunk_no, first_line, content) for chunk_no, (first_line, content)
+                                   in enumerate(txt_parser.get_chunks(path))), commit=False)
+
+
+def get_book_instances(book_id, vocab, columns, word_ids):
+    """generator of word_instance rows of a book tokenized by txt_parser.tokenize_book"""
+    ids = [word_ids[word] for word in vocab]
+    for wrd_cnt, (word_index, sent_cnt, line_cnt, line_offset, par_cnt) in enumerate(zip(*columns), start=1):
+        yield ids[word_index], wrd_cnt, book_id, sent_cnt, line_cnt, line_offset, par_cnt
+
+
+def import_folder(db, folder, progress=None):
+    """imports every Gutenberg book (.txt file) within folder and its sub-folders.
+       books already in the DB are skipped without being tokenized: unchanged files are identified by their source
+       (see find_source), without being read, and other books by title and author. a book whose file was edited
+       since it was inserted is replaced.
+       the rest are inserted in waves, and a checkpoint file within the folder is updated after every wave,
+       thus a crashed or canceled import resumes from the next unfinished book rather than restarting.
+       files that can't be read or decoded are skipped, and aren't read again once the import is resumed.
+       :param progress: callback(books handled, overall books), returns False to cancel the import.
+       :returns number of books inserted, and paths of the files skipped since they couldn't be read"""
+    paths = sorted(os.path.join(root, file_name) for root, _, files in os.walk(folder)
+                   for file_name in files if file_name.lower().endswith('.txt'))
+    checkpoint_path = os.path.join(folder, CHECKPOINT_FILE)
+    done, unfinished = load_checkpoint(checkpoint_path)
+    for path in unfinished:  # books of the wave interrupted last time may have been partially inserted
+        remove_book_of(db, path)
+
+    existing = set(db.get_book_titles_authors())
+    pending, skipped = [], []
+    for path in paths:
+        if path in done:
+            continue
+        try:
+            status, book_id = find_source(db, path)
+            if status in (SOURCE_UNCHANGED, SOURCE_DUPLICATE):
+                done.add(path)
+                continue
+            book_details = txt_parser.read_book_details(path)
+        except (IOError, ValueError) as error:  # e.g. a file that isn't encoded as text
+            print("skipped unreadable file {} ({})".format(path, error))
+            skipped.append(path)
+            done.add(path)
+            continue
+        if status == SOURCE_EDITED:  # the edited file is inserted instead of the book previously read from it
+            db.del_book_rows(book_id)
+            db.sweep_words()
+            existing = set(db.get_book_titles_authors())
+        if book_details and book_details[:2] not in existing:
+            pending.append(book_details)
+        else:  # not a Gutenberg book or already in the DB
+            done.add(path)
+
+    handled, inserted = len(paths) - len(pending), 0
+    wave_size = os.cpu_count() * WAVE_FACTOR
+    for i in range(0, len(pending), wave_size):
+        if progress and not progress(handled, len(paths)):
+            break
+        wave_paths = [book_details[4] for book_details in pending[i:i + wave_size]]
+        save_checkpoint(checkpoint_path, done, wave_paths)
+        results, _, unreadable = ingest_books(db, pending[i:i + wave_size])
+        skipped.extend(unreadable)
+        inserted += len(results)
+        handled += len(wave_paths)
+        done.update(wave_paths)
+        save_checkpoint(checkpoint_path, done, [])
+    else:  # import completed, checkpoint is no longer required
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+    if progress:
+        progress(handled, len(paths))
+    return inserted, skipped
+
+
+def load_checkpoint(checkpoint_path):
+    """:returns paths of books a previous import of the folder has finished with, and paths of books
+        it was in the middle of inserting. both are empty if there's no previous import to resume."""
+    try:
+        with open(checkpoint_path, 'r') as file:
+            checkpoint = json.load(file)
+        return set(checkpoint['done']), checkpoint['unfinished']
+    except (IOError, ValueError, KeyError):
+        return set(), []
+
+
+def save_checkpoint(checkpoint_path, done, unfinished):
+    try:
+        with open(checkpoint_path, 'w') as file:
+            json.dump({'done': sorted(done), 'unfinished': unfinished}, file)
+    except IOError:  # e.g. read-only folder. import proceeds, though it won't be resumable.
+        print("failed to save import checkpoint {}".format(checkpoint_path))
+
+
+def remove_book_of(db, path):
+    """removes the book read from the given file from the DB, in case it's there"""
+    try:
+        book_details = txt_parser.read_book_details(path)
+    except (IOError, ValueError):  # the file was skipped, thus no book was read from it
+        return
+    if book_details and db.get_book_id(book_details[0], book_details[1]):
+        db.del_book(book_details[0], book_details[1])
+
+
+def read_book_lines(db, title, author, start, count):
+    """:returns up to count lines of a book, starting at line number start (zero based). they're decompressed from
+        the chunk of the book's text that holds them, if its text is kept (see STORE_CONTENT). otherwise the book's
+        file is seeked to the line by the book's layout (see Database.get_line_start), rather than read from its
+        beginning. books that have no layout (e.g. books imported from JSON, see DERIVED_TABLES) have it kept along
+        the way. raises IOError if the file can't be read."""
+    book_id = db.get_book_id(title, author)[0]
+    chunks = db.get_book_chunks(book_id, start, start + count)
+    if chunks:
+        return txt_parser.read_chunk_lines(chunks, start, count)
+    path, offset, has_layout = db.get_line_start(book_id, start)
+    if not has_layout:
+        line_starts = txt_parser.get_line_starts(path)
+        db.insert_book_layout(book_id, line_starts)
+        offset = line_starts[start] if start < len(line_starts) else None
+    return txt_parser.read_lines(path, start, count, offset)
+
+
+def restore_book_file(db, title, author):
+    """writes the text kept for a book (see STORE_CONTENT) to a temporary file, e.g. once the book's own file
+       can't be opened. :returns path of the file, or None if the book's text isn't kept"""
+    book_id = db.get_book_id(title, author)[0]
+    chunks = db.get_book_chunks(book_id)
+    if not chunks:
+        return None
+    path = os.path.join(tempfile.gettempdir(), f"library_book_{book_id}.txt")
+    with open(path, 'w') as file:
+        for _, content in chunks:
+            file.write(txt_parser.decompress_chunk(content))
+    return path
@@ -1,31 +1,65 @@
 from msg_box import MsgIcon, display_msg
-import re, os
+import hashlib, io, re, os, zlib
+from array import array
+from itertools import chain, islice, repeat
+from functools import partial
+from operator import add
+
+BLOCK_SIZE = pow(2, 20)  # number of characters read by the tokenizer at once
+# translation of the bytes of a block: [!?.] become '.', other ascii characters that aren't part of words (\w) become
+# spaces, and new lines and bytes of non ascii characters are kept.
+CHAR_CLASSES = bytes(char if chr(char).isalnum() or chr(char) in '_\n' or char >= 128
+                     else ord('.') if chr(char) in '!?.' else ord(' ') for char in range(256))
+WORD_PATTERN = re.compile(r'\w+')  # a word as found by the tokenizer, within a line that wasn't translated
+NEW_LINE = re.compile(b'\n')
+CHUNK_SIZE = pow(2, 16)  # approximate number of characters of a book's text compressed as a single chunk
+LINE_START_TYPE = 'I'  # typecode of the array of line starts (see get_line_starts), i.e. files of up to 4GB
 
 
 def get_book_details(path):
-    """ returns book's title, author, release date, size and absolute file path """
-    size = str(round((os.stat(path).st_size / pow(2, 20)), 2)) + "MB"
+    """ returns book's title, author, release date, size (in bytes) and absolute file path """
+    try:
+        return read_book_details(path)
+    except IOError:
+        display_msg(MsgIcon.WARNING, "Warning", "failed to open book. could not find / open file")
+    except ValueError:  # e.g. a file that isn't encoded as text
+        display_msg(MsgIcon.WARNING, "Warning", "failed to read book. the file's text couldn't be decoded")
+
+
+def read_book_details(path):
+    """get_book_details without notifying user, e.g. for a folder import run on a worker thread.
+       :returns see get_book_details, or None if it isn't a Gutenberg book.
+       raises IOError if the file can't be opened, and ValueError (UnicodeDecodeError) if it can't be decoded"""
+    size = os.stat(path).st_size
     title, author, date = [None for _ in range(3)]
     author_pattern = re.compile(r'(Author: )([^\n]+)')
     title_pattern = re.compile(r'(Title: )([^\n]+)')  # second group represents max occurrences of not (^) '\n'
     date_pattern = re.compile(r'(Release Date: )(\w+ \d\d?, \d{4})')
 
-    try:
-        with open(path, 'r') as file:
-            for line in file:
-                if not author:
-                    author = author_pattern.search(line)
-                if not title:
-                    title = title_pattern.search(line)
-                if not date:
-                    date = date_pattern.search(line)
-                if title and author and date:  # and date and size:
-                    # return title, author, size
-                    return title.group(2), author.group(2), date_format(date.group(2)), size, path
+    with open(path, 'r') as file:
+        for line in file:
+            if not author:
+                author = author_pattern.search(line)
+            if not title:
+                title = title_pattern.search(line)
+            if not date:
+                date = date_pattern.search(line)
+            if title and author and date:  # and date and size:
+                # return title, author, size
+                return title.group(2), author.group(2), date_format(date.group(2)), size, path
 
-    except IOError:
-        display_msg(MsgIcon.WARNING, "Warning", "failed to open book. could not find / open file")
-        return
+
+def size_to_bytes(size):
+    """:returns size in bytes of a size given either in bytes, or as a string in megabytes, e.g. '1.23MB'
+        (the format book sizes were kept in before, e.g. within older exports)"""
+    if isinstance(size, str):
+        return round(float(size.upper().replace('MB', '')) * pow(2, 20))
+    return size
+
+
+def format_size(size):
+    """:returns size in bytes as a string in megabytes, e.g. '1.23MB'"""
+    return f"{size / pow(2, 20):.2f}MB"
 
 
 def months_to_num(month):
@@ -60,28 +94,198 @@ def get_next_word(path):
         char_cnt = number of characters in a word.
         """
     try:
-        line_with_txt = - 1  # marks the last non empty line encountered
-        wrd_cnt = 0
-        par_cnt = 1
-        sent_cnt = 1
-        with open(path, 'r') as file:
-            for line_cnt, line in enumerate(file, start=1):
-                line_offset = -1  # initial val = -1 so index of word within line will be zero based
-                if line != '\n':
-                    line_with_txt = line_cnt
-                elif line_cnt == line_with_txt + 1:  # current line == '\n' and last line wasn't
-                    par_cnt += 1
-                sentences = list(filter(None, re.split(r'[!?.]', line)))  # filter removes empty elements
-                for i in range(len(sentences)):
-                    if i > 0:  # if text appears after [!?.] it is considered a new sentence.
-                        sent_cnt += 1
-                    words_in_sent = re.findall(r'\w+', sentences[i])
-                    for word in words_in_sent:
-                        if word:
-                            line_offset += 1
-                            wrd_cnt += 1
-                            yield word.lower(), wrd_cnt, sent_cnt, line_cnt, line_offset, par_cnt
-
+        yield from read_words(path)
     except IOError:
         display_msg(MsgIcon.WARNING, "Warning", "failed to open book. could not find / open file")
         return
+
+
+def read_words(path):
+    """get_next_word's generator, which leaves handling IOError to the caller (e.g. when running in a worker process,
+        where no message can be displayed to user)."""
+    for batch in read_word_batches(path):
+        yield from zip(*batch)
+
+
+def read_word_batches(path, block_size=BLOCK_SIZE, on_read=None):
+    """the tokenizer engine. reads the file in large blocks of whole lines and yields the words of each block as a batch
+        of parallel columns: a list of words and arrays of wrd_cnt, sent_cnt, line_cnt, line_offset, par_cnt
+        (see get_next_word), rather than a tuple per word.
+        a block is translated at once to CHAR_CLASSES, thus words are found by splitting its lines on white spaces,
+        and only lines that contain [!?.] are split into sentences.
+        a line is a new paragraph if it's empty and the line before it isn't.
+        text that appears after [!?.] within a line is considered a new sentence.
+        :param on_read: optional callback, called with each block read and the number of bytes read so far."""
+    prev_line_has_txt = False
+    wrd_cnt, sent_cnt, line_cnt, par_cnt = 0, 1, 0, 1
+    remainder = ''
+    with open(path, 'r') as file:
+        while True:
+            block = file.read(block_size)
+            if on_read:
+                on_read(block, file.buffer.tell())
+            if block:
+                text = remainder + block
+                last_new_line = text.rfind('\n')
+                if last_new_line < 0:  # block doesn't complete a line yet
+                    remainder = text
+                    continue
+                text, remainder = text[:last_new_line], text[last_new_line + 1:]
+            elif remainder:  # last line of the file, which doesn't end with a new line
+                text, remainder = remainder, ''
+            else:
+                break
+
+            lowered = text.lower()
+            # lowering the block at once is valid unless it changes its length (e.g. 'İ' is lowered to 2 characters),
+            # which might split words. otherwise, each word is lowered separately.
+            lowered_at_once = len(lowered) == len(text)
+            if lowered_at_once:
+                text = lowered
+            if not text.isascii():  # non ascii characters that aren't part of words are turned to spaces
+                for char in set(text):
+                    if not char.isascii() and not char.isalnum():
+                        text = text.replace(char, ' ')
+
+            segments_words, segments_sentences, segments_lines, segments_paragraphs, segments_offsets = \
+                [], [], [], [], []
+            for line_cnt, line in enumerate(text.encode().translate(CHAR_CLASSES).split(b'\n'), start=line_cnt + 1):
+                if line:
+                    prev_line_has_txt = True
+                elif prev_line_has_txt:
+                    par_cnt += 1
+                    prev_line_has_txt = False
+                # the words of a segment (a line, or a sentence within it) share its sent_cnt, line_cnt and par_cnt,
+                # thus columns are appended per segment rather than per word.
+                if b'.' in line:
+                    line_offset, prev_fragment = 0, b''
+                    for fragment in line.split(b'.'):
+                        if prev_fragment:  # [!?.] that follow text within the line end a sentence
+                            sent_cnt += 1
+                        fragment_words = fragment.split()
+                        if fragment_words:
+                            segments_words.append(fragment_words)
+                            segments_sentences.append(sent_cnt)
+                            segments_lines.append(line_cnt)
+                            segments_paragraphs.append(par_cnt)
+                            segments_offsets.append(line_offset)
+                            line_offset += len(fragment_words)
+                        prev_fragment = fragment
+                else:
+                    line_words = line.split()
+                    if line_words:
+                        segments_words.append(line_words)
+                        segments_sentences.append(sent_cnt)
+                        segments_lines.append(line_cnt)
+                        segments_paragraphs.append(par_cnt)
+                        segments_offsets.append(0)
+
+            counts = list(map(len, segments_words))
+            words = list(chain.from_iterable(segments_words))
+            words = b' '.join(words).decode().split(' ') if words else []  # decodes all of the words at once
+            if not lowered_at_once:
+                words = [word.lower() for word in words]
+            yield words, array('i', range(wrd_cnt + 1, wrd_cnt + len(words) + 1)), \
+                get_column(map(repeat, segments_sentences, counts)), get_column(map(repeat, segments_lines, counts)), \
+                get_column(map(range, segments_offsets, map(add, segments_offsets, counts))), \
+                get_column(map(repeat, segments_paragraphs, counts))
+            wrd_cnt += len(words)
+
+
+def get_column(segments):
+    """read_word_batches helper function. :returns array of the values of all segments"""
+    return array('i', list(chain.from_iterable(segments)))
+
+
+def tokenize_book(path):
+    """tokenizes a whole book into compact arrays rather than a tuple per word,
+        thus it's cheap to send back from a worker process (see ingest.ingest_books).
+        :returns path, the book's vocabulary, the following parallel arrays, holding for each word of the book:
+        index of the word within vocabulary, sent_cnt, line_cnt, line_offset, par_cnt,
+        and the book's source: hash of its content, size and modification time of its file.
+        wrd_cnt of each word is implied by its index within the arrays (plus one)."""
+    stat = os.stat(path)
+    content_hash = hashlib.sha256()
+    vocab_index = {}
+    word_indices, sentences, lines, offsets, paragraphs = [array('i') for _ in range(5)]
+    for words, _, batch_sentences, batch_lines, batch_offsets, batch_paragraphs in read_word_batches(
+            path, on_read=lambda block, _: content_hash.update(block.encode())):
+        word_indices.extend([vocab_index.setdefault(word, len(vocab_index)) for word in words])
+        sentences.extend(batch_sentences)
+        lines.extend(batch_lines)
+        offsets.extend(batch_offsets)
+        paragraphs.extend(batch_paragraphs)
+    return path, list(vocab_index), (word_indices, sentences, lines, offsets, paragraphs), \
+        (content_hash.hexdigest(), stat.st_size, stat.st_mtime)
+
+
+def get_content_hash(path):
+    """:returns hash of the book's text, the same as the one computed by the tokenizer while reading it."""
+    content_hash = hashlib.sha256()
+    with open(path, 'r') as file:
+        for block in iter(partial(file.read, BLOCK_SIZE), ''):
+            content_hash.update(block.encode())
+    return content_hash.hexdigest()
+
+
+def get_line_starts(path):
+    """:returns array of the byte offset at which each line of the file starts (the first line starts at 0),
+        thus a line is reached by a single seek (see read_lines) rather than by reading every line before it."""
+    line_starts, position = array(LINE_START_TYPE, [0]), 0
+    with open(path, 'rb') as file:
+        for block in iter(partial(file.read, BLOCK_SIZE), b''):
+            line_starts.extend([position + match.end() for match in NEW_LINE.finditer(block)])
+            position += len(block)
+    return line_starts
+
+
+def read_lines(path, start, count, offset=None):
+    """:returns up to count lines of the file, starting at line number start (zero based), decoded the same as
+        open(path, 'r') decodes them.
+        :param offset: byte offset at which line start begins (see get_line_starts), to which the file is seeked.
+         otherwise the lines before it are read and skipped."""
+    with open(path, 'rb') as file:
+        if offset is not None:
+            file.seek(offset)
+            start = 0
+        return list(islice(io.TextIOWrapper(file), start, start + count))
+
+
+def get_word_offset(line, line_offset):
+    """:returns index of the first character of the line's word at line_offset (see read_word_batches),
+        or 0 if the line has fewer words"""
+    match = next(islice(WORD_PATTERN.finditer(line), line_offset, None), None)
+    return match.start() if match else 0
+
+
+def get_chunks(path, chunk_size=CHUNK_SIZE):
+    """generator of a book's text, split into chunks of whole lines that are compressed on their own, thus a few lines
+        are read by decompressing a single chunk rather than the whole text (see read_chunk_lines).
+        lines are decoded the same as open(path, 'r') decodes them.
+        :returns (yields) number of the chunk's first line (zero based), compressed text of the chunk"""
+    first_line, chunk_lines, chunk_len = 0, [], 0
+    with open(path, 'r') as file:
+        for line in file:
+            chunk_lines.append(line)
+            chunk_len += len(line)
+            if chunk_len >= chunk_size:
+                yield first_line, zlib.compress(''.join(chunk_lines).encode())
+                first_line, chunk_lines, chunk_len = first_line + len(chunk_lines), [], 0
+    if chunk_lines:
+        yield first_line, zlib.compress(''.join(chunk_lines).encode())
+
+
+def decompress_chunk(content):
+    """:returns text of a chunk compressed by get_chunks"""
+    return zlib.decompress(content).decode()
+
+
+def read_chunk_lines(chunks, start, count):
+    """:returns up to count lines of a book, starting at line number start (zero based).
+        :param chunks: (number of first line, compressed text) of the consecutive chunks that hold the lines,
+         see get_chunks"""
+    lines = []
+    for first_line, content in chunks:
+        chunk_lines = list(io.StringIO(decompress_chunk(content)))
+        lines.extend(chunk_lines[max(start - first_line, 0):max(start + count - first_line, 0)])
+    return lines[:count]